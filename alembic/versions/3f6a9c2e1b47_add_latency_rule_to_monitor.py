@@ -0,0 +1,36 @@
+"""add latency_rule to monitor model
+
+Revision ID: 3f6a9c2e1b47
+Revises: 7e21c4a9b0d3
+Create Date: 2026-10-18 17:42:10.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6a9c2e1b47'
+down_revision: Union[str, Sequence[str], None] = '7e21c4a9b0d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'monitors',
+        sa.Column('latency_rule', sa.String(length=16), server_default='threshold', nullable=False),
+    )
+    op.create_check_constraint(
+        'check_latency_rule', 'monitors',
+        "latency_rule IN ('threshold', 'baseline', 'both')",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('check_latency_rule', 'monitors', type_='check')
+    op.drop_column('monitors', 'latency_rule')
@@ -0,0 +1,28 @@
+"""add force_cold_connection field to monitor model
+
+Revision ID: 5c3e9a1d7f20
+Revises: b21e780537de
+Create Date: 2026-10-18 09:12:04.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c3e9a1d7f20'
+down_revision: Union[str, Sequence[str], None] = 'b21e780537de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('monitors', sa.Column('force_cold_connection', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('monitors', 'force_cold_connection')
@@ -0,0 +1,35 @@
+"""add alert threshold fields to monitor model
+
+Revision ID: 7e21c4a9b0d3
+Revises: d4f1b8c2a905
+Create Date: 2026-10-18 16:05:41.220913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e21c4a9b0d3'
+down_revision: Union[str, Sequence[str], None] = 'd4f1b8c2a905'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('monitors', sa.Column('alert_threshold', sa.Integer(), nullable=True))
+    op.add_column('monitors', sa.Column('alert_window', sa.Integer(), nullable=True))
+    op.create_check_constraint(
+        'check_alert_window_range', 'monitors',
+        'alert_window IS NULL OR alert_window BETWEEN 1 AND 64',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('check_alert_window_range', 'monitors', type_='check')
+    op.drop_column('monitors', 'alert_window')
+    op.drop_column('monitors', 'alert_threshold')
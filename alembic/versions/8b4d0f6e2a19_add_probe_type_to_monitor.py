@@ -0,0 +1,42 @@
+"""add probe_type and probe_config to monitor model
+
+Revision ID: 8b4d0f6e2a19
+Revises: 3f6a9c2e1b47
+Create Date: 2026-10-18 19:05:37.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4d0f6e2a19'
+down_revision: Union[str, Sequence[str], None] = '3f6a9c2e1b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'monitors',
+        sa.Column('probe_type', sa.String(length=16), server_default='http', nullable=False),
+    )
+    op.add_column(
+        'monitors',
+        sa.Column('probe_config', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    )
+    op.create_check_constraint(
+        'check_probe_type', 'monitors',
+        "probe_type IN ('http', 'tcp', 'dns', 'tls_expiry')",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('check_probe_type', 'monitors', type_='check')
+    op.drop_column('monitors', 'probe_config')
+    op.drop_column('monitors', 'probe_type')
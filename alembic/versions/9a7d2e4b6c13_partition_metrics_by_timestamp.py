@@ -0,0 +1,108 @@
+"""partition metrics table by timestamp
+
+Revision ID: 9a7d2e4b6c13
+Revises: 5c3e9a1d7f20
+Create Date: 2026-10-18 10:02:41.377114
+
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a7d2e4b6c13'
+down_revision: Union[str, Sequence[str], None] = '5c3e9a1d7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, monitor_id, timestamp, response_ms, status_code, is_up, error"
+
+# Frozen copy of the partition DDL at this revision (app.services.partitions may change later)
+INTERVAL = os.environ.get("METRICS_PARTITION_INTERVAL", "day")
+AHEAD = int(os.environ.get("METRICS_PARTITIONS_AHEAD", 7))
+
+
+def _partition_start(moment: datetime) -> datetime:
+    day = datetime(moment.year, moment.month, moment.day)
+    return day - timedelta(days=day.weekday()) if INTERVAL == "week" else day
+
+
+def _create_partitions(since: datetime | None):
+    """Partitions from `since` (default: now) up to AHEAD intervals into the future."""
+    now = datetime.utcnow()
+    step = timedelta(weeks=1) if INTERVAL == "week" else timedelta(days=1)
+    start = _partition_start(since or now)
+    end = _partition_start(now) + step * (AHEAD + 1)
+    while start < end:
+        upper = start + step
+        op.execute(
+            f'CREATE TABLE IF NOT EXISTS "metrics_p{start:%Y%m%d}" PARTITION OF metrics '
+            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{upper.isoformat(sep=' ')}')"
+        )
+        start = upper
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+
+    # Move the existing table out of the way
+    op.rename_table('metrics', 'metrics_legacy')
+    op.execute('ALTER TABLE metrics_legacy RENAME CONSTRAINT metrics_pkey TO metrics_legacy_pkey')
+    op.execute('ALTER INDEX idx_metric_monitor_timestamp RENAME TO idx_metric_monitor_timestamp_legacy')
+    op.execute('ALTER INDEX ix_metrics_monitor_id RENAME TO ix_metrics_legacy_monitor_id')
+
+    op.execute("""
+        CREATE TABLE metrics (
+            id UUID NOT NULL,
+            monitor_id UUID NOT NULL REFERENCES monitors (id) ON DELETE CASCADE,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            response_ms INTEGER,
+            status_code INTEGER,
+            is_up BOOLEAN NOT NULL,
+            error TEXT,
+            CONSTRAINT metrics_pkey PRIMARY KEY (id, timestamp),
+            CONSTRAINT check_response_ms_positive CHECK (response_ms IS NULL OR response_ms >= 0)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.create_index('idx_metric_monitor_timestamp', 'metrics', ['monitor_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_metrics_monitor_id'), 'metrics', ['monitor_id'], unique=False)
+
+    # Partitions for the existing data plus the configured look-ahead. No DEFAULT
+    # partition: rows in it would block creating the partition for their range.
+    oldest = conn.execute(sa.text('SELECT min(timestamp) FROM metrics_legacy')).scalar()
+    _create_partitions(oldest)
+
+    op.execute(f'INSERT INTO metrics ({COLUMNS}) SELECT {COLUMNS} FROM metrics_legacy')
+    op.drop_table('metrics_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('metrics', 'metrics_partitioned')
+    op.execute('ALTER TABLE metrics_partitioned RENAME CONSTRAINT metrics_pkey TO metrics_partitioned_pkey')
+    op.execute('ALTER INDEX idx_metric_monitor_timestamp RENAME TO idx_metric_monitor_timestamp_partitioned')
+    op.execute('ALTER INDEX ix_metrics_monitor_id RENAME TO ix_metrics_partitioned_monitor_id')
+
+    op.create_table(
+        'metrics',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('monitor_id', sa.UUID(), nullable=False),
+        sa.Column('timestamp', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.Column('response_ms', sa.Integer(), nullable=True),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('is_up', sa.Boolean(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.CheckConstraint('response_ms IS NULL OR response_ms >= 0', name='check_response_ms_positive'),
+        sa.ForeignKeyConstraint(['monitor_id'], ['monitors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_metric_monitor_timestamp', 'metrics', ['monitor_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_metrics_monitor_id'), 'metrics', ['monitor_id'], unique=False)
+
+    op.execute(f'INSERT INTO metrics ({COLUMNS}) SELECT {COLUMNS} FROM metrics_partitioned')
+    op.drop_table('metrics_partitioned')
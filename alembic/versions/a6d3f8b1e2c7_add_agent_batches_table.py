@@ -0,0 +1,35 @@
+"""add agent_batches table
+
+Revision ID: a6d3f8b1e2c7
+Revises: f1a4c8e2d6b5
+Create Date: 2026-10-19 14:02:51.774190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d3f8b1e2c7'
+down_revision: Union[str, Sequence[str], None] = 'f1a4c8e2d6b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'agent_batches',
+        sa.Column('region', sa.String(length=32), nullable=False),
+        sa.Column('batch_id', sa.String(length=128), nullable=False),
+        sa.Column('results', sa.Integer(), nullable=False),
+        sa.Column('received_at', sa.TIMESTAMP(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+        sa.PrimaryKeyConstraint('region', 'batch_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('agent_batches')
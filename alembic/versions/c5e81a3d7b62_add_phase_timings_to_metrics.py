@@ -0,0 +1,38 @@
+"""add per-phase latency columns to metrics and rollups
+
+Revision ID: c5e81a3d7b62
+Revises: 8b4d0f6e2a19
+Create Date: 2026-10-18 20:12:48.107365
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e81a3d7b62'
+down_revision: Union[str, Sequence[str], None] = '8b4d0f6e2a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PHASE_COLUMNS = ('dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'download_ms')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without defaults: a metadata-only change, also on the existing partitions
+    for column in PHASE_COLUMNS:
+        op.add_column('metrics', sa.Column(column, sa.Integer(), nullable=True))
+    op.add_column('metric_rollups', sa.Column('phase_sum', postgresql.ARRAY(sa.BigInteger()), nullable=True))
+    op.add_column('metric_rollups', sa.Column('phase_count', postgresql.ARRAY(sa.Integer()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('metric_rollups', 'phase_count')
+    op.drop_column('metric_rollups', 'phase_sum')
+    for column in reversed(PHASE_COLUMNS):
+        op.drop_column('metrics', column)
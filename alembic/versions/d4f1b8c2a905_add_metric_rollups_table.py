@@ -0,0 +1,42 @@
+"""add metric_rollups table
+
+Revision ID: d4f1b8c2a905
+Revises: 9a7d2e4b6c13
+Create Date: 2026-10-18 11:20:15.904112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1b8c2a905'
+down_revision: Union[str, Sequence[str], None] = '9a7d2e4b6c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'metric_rollups',
+        sa.Column('monitor_id', sa.UUID(), nullable=False),
+        sa.Column('bucket_seconds', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.TIMESTAMP(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('up_count', sa.Integer(), nullable=False),
+        sa.Column('latency_count', sa.Integer(), nullable=False),
+        sa.Column('latency_min', sa.Integer(), nullable=True),
+        sa.Column('latency_max', sa.Integer(), nullable=True),
+        sa.Column('latency_sum', sa.BigInteger(), nullable=False),
+        sa.Column('latency_sketch', sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(['monitor_id'], ['monitors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('monitor_id', 'bucket_seconds', 'bucket_start'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('metric_rollups')
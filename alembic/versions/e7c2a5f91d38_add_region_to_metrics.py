@@ -0,0 +1,29 @@
+"""add probe agent region to metrics
+
+Revision ID: e7c2a5f91d38
+Revises: c5e81a3d7b62
+Create Date: 2026-10-18 22:41:05.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2a5f91d38'
+down_revision: Union[str, Sequence[str], None] = 'c5e81a3d7b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: metadata-only, existing rows are the central workers' checks
+    op.add_column('metrics', sa.Column('region', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('metrics', 'region')
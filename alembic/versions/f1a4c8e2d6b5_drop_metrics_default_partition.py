@@ -0,0 +1,70 @@
+"""move rows out of the metrics default partition and drop it
+
+Revision ID: f1a4c8e2d6b5
+Revises: e7c2a5f91d38
+Create Date: 2026-10-19 09:14:27.560913
+
+"""
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a4c8e2d6b5'
+down_revision: Union[str, Sequence[str], None] = 'e7c2a5f91d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INTERVAL = os.environ.get("METRICS_PARTITION_INTERVAL", "day")
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _ranges(conn) -> list[tuple[datetime, datetime]]:
+    bounds = conn.execute(sa.text(
+        """
+        SELECT pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'metrics'
+        """
+    )).scalars()
+    return [
+        tuple(datetime.fromisoformat(v) for v in match.groups())
+        for match in map(_BOUND_RE.search, bounds) if match
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases partitioned at 9a7d2e4b6c13 before it stopped creating the DEFAULT partition
+    conn = op.get_bind()
+    if conn.execute(sa.text("SELECT to_regclass('metrics_default')")).scalar() is None:
+        return
+
+    op.execute('ALTER TABLE metrics DETACH PARTITION metrics_default')
+    step = timedelta(weeks=1) if INTERVAL == "week" else timedelta(days=1)
+    covered = _ranges(conn)
+    starts = conn.execute(sa.text(
+        f"SELECT DISTINCT date_trunc('{'week' if INTERVAL == 'week' else 'day'}', timestamp) FROM metrics_default"
+    )).scalars()
+    for start in starts:
+        upper = start + step
+        if not any(lo < upper and start < hi for lo, hi in covered):
+            op.execute(
+                f'CREATE TABLE "metrics_p{start:%Y%m%d}" PARTITION OF metrics '
+                f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{upper.isoformat(sep=' ')}')"
+            )
+            covered.append((start, upper))
+    op.execute('INSERT INTO metrics SELECT * FROM metrics_default')
+    op.drop_table('metrics_default')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('CREATE TABLE IF NOT EXISTS metrics_default PARTITION OF metrics DEFAULT')
@@ -0,0 +1,10 @@
+"""
+Standalone probe agent: checks monitors from another region and uploads
+the results to the API (`python -m app.agent --help`).
+
+It only needs the probe code (httpx, dnspython, ijson, pydantic); no
+database, Redis, Celery or server settings.
+"""
+from app.agent.agent import AgentConfig, ProbeAgent
+
+__all__ = ["AgentConfig", "ProbeAgent"]
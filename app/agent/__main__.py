@@ -0,0 +1,67 @@
+"""
+Run a probe agent:
+
+    AGENT_API_KEY=... python -m app.agent --api http://localhost:8000 --region eu-west
+
+Every option can also be set through the environment variable shown in --help.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import signal
+
+from app.agent.agent import AgentConfig, ProbeAgent
+from app.schemas.agent import CENTRAL_REGION, REGION_PATTERN
+
+
+def parse_args() -> AgentConfig:
+    env = os.environ.get
+    parser = argparse.ArgumentParser(prog="python -m app.agent", description="Regional probe agent")
+    parser.add_argument("--api", default=env("AGENT_API_URL", "http://localhost:8000"), help="API base URL (AGENT_API_URL)")
+    parser.add_argument("--key", default=env("AGENT_API_KEY"), help="Shared agent key (AGENT_API_KEY)")
+    parser.add_argument("--region", default=env("AGENT_REGION"), help="Region name, e.g. eu-west (AGENT_REGION)")
+    parser.add_argument("--buffer", default=env("AGENT_BUFFER_PATH"), help="SQLite buffer file (AGENT_BUFFER_PATH, default probe-agent-<region>.db)")
+    parser.add_argument("--shard", type=int, default=int(env("AGENT_SHARD", 0)), help="Index of this agent in its region (AGENT_SHARD)")
+    parser.add_argument("--shards", type=int, default=int(env("AGENT_SHARDS", 1)), help="Agents splitting the region's monitors (AGENT_SHARDS)")
+    parser.add_argument("--concurrency", type=int, default=int(env("AGENT_CONCURRENCY", 200)), help="Max in-flight probes (AGENT_CONCURRENCY)")
+    parser.add_argument("--upload-interval", type=float, default=float(env("AGENT_UPLOAD_INTERVAL_SEC", 5.0)), help="Seconds between uploads (AGENT_UPLOAD_INTERVAL_SEC)")
+    parser.add_argument("--batch-size", type=int, default=int(env("AGENT_UPLOAD_BATCH_SIZE", 5000)), help="Results per upload (AGENT_UPLOAD_BATCH_SIZE)")
+    parser.add_argument("--max-buffered", type=int, default=int(env("AGENT_MAX_BUFFERED", 1_000_000)), help="Oldest results are dropped above this (AGENT_MAX_BUFFERED)")
+    parser.add_argument("--refresh", type=float, default=float(env("AGENT_ASSIGNMENT_REFRESH_SEC", 60.0)), help="Seconds between assignment refreshes (AGENT_ASSIGNMENT_REFRESH_SEC)")
+    args = parser.parse_args()
+
+    if not args.key:
+        parser.error("--key (or AGENT_API_KEY) is required")
+    if not args.region or not re.match(REGION_PATTERN, args.region) or args.region == CENTRAL_REGION:
+        parser.error(f"--region must match {REGION_PATTERN} and not be '{CENTRAL_REGION}'")
+    if not 0 <= args.shard < args.shards:
+        parser.error("--shard must be between 0 and --shards - 1")
+
+    return AgentConfig(
+        api_url=args.api,
+        api_key=args.key,
+        region=args.region,
+        buffer_path=args.buffer or f"probe-agent-{args.region}.db",
+        shard=args.shard,
+        shards=args.shards,
+        concurrency=args.concurrency,
+        assignment_refresh_sec=args.refresh,
+        upload_interval_sec=args.upload_interval,
+        upload_batch_size=args.batch_size,
+        max_buffered_results=args.max_buffered,
+    )
+
+
+async def main():
+    agent = ProbeAgent(parse_args())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, agent.stop)
+    await agent.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
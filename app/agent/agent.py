@@ -0,0 +1,226 @@
+import asyncio
+import gzip
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Optional
+
+import httpx
+
+from app.agent.buffer import ResultBuffer
+from app.core.http_clients import ClientRegistry
+from app.core.schedule import MonitorSchedule, next_slot
+from app.services.probes import probe_monitor
+
+logger = logging.getLogger(__name__)
+
+# Upload responses that will never succeed for this batch: drop it instead of retrying forever.
+# Anything else (401, 404 while agents are disabled, 5xx...) is retried, so the results stay buffered.
+_REJECTED = {400, 422}
+
+
+@dataclass
+class AgentConfig:
+    api_url: str
+    api_key: str
+    region: str
+    buffer_path: str
+    shard: int = 0
+    shards: int = 1
+    concurrency: int = 200
+    jitter_sec: float = 2.0
+    assignment_refresh_sec: float = 60.0
+    upload_interval_sec: float = 5.0
+    upload_batch_size: int = 5000
+    max_buffered_results: int = 1_000_000
+    max_backoff_sec: float = 300.0
+
+
+class ProbeAgent:
+    """
+    Standalone probe agent for one region.
+
+    Pulls its monitor assignment from the API, probes the monitors on its
+    own event loop with the same probe code as the workers, appends every
+    result to a local SQLite buffer and uploads the buffer in gzip
+    batches. Probing never waits on the API: while it is unreachable the
+    agent keeps checking from its last known assignment (also kept in the
+    buffer file, so restarts work offline) and the backlog is drained
+    batch after batch once the API is back.
+    """
+
+    def __init__(self, config: AgentConfig):
+        self.config = config
+        self.buffer = ResultBuffer(config.buffer_path, config.max_buffered_results)
+        self.schedule = MonitorSchedule(config.jitter_sec)
+        self.clients = ClientRegistry()
+        self.monitors: dict[str, SimpleNamespace] = {}
+        self._pending: list[str] = []  # serialized results not yet in the buffer
+        self._probes: set[asyncio.Task] = set()
+        self._stop = asyncio.Event()
+        self._etag: Optional[str] = None
+
+        # Totals, logged on shutdown
+        self.checks = 0
+        self.uploaded = 0
+        self.dropped = 0
+
+    def stop(self):
+        self._stop.set()
+
+    async def run(self):
+        self._restore_assignment()
+        headers = {"X-Agent-Key": self.config.api_key, "X-Agent-Region": self.config.region}
+        async with httpx.AsyncClient(base_url=self.config.api_url, headers=headers, timeout=30.0) as api:
+            loops = [
+                asyncio.create_task(self._assignment_loop(api)),
+                asyncio.create_task(self._probe_loop()),
+                asyncio.create_task(self._flush_loop()),
+                asyncio.create_task(self._upload_loop(api)),
+            ]
+            logger.info(
+                f"🛰️ Probe agent started (region={self.config.region}, buffer={self.config.buffer_path}, "
+                f"{len(self.buffer)} results waiting)"
+            )
+            await self._stop.wait()
+            for task in loops:
+                task.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+
+        # Let running probes finish so their results are buffered, not lost
+        if self._probes:
+            await asyncio.wait(self._probes, timeout=30)
+        self._flush()
+        await self.clients.aclose()
+        self.buffer.close()
+        logger.info(f"🛑 Probe agent stopped ({self.checks} checks, {self.uploaded} results uploaded, {self.dropped} dropped)")
+
+    # --- assignment ---
+
+    def apply_assignment(self, monitors: list[dict]):
+        """Schedule the assigned monitors; unassigned ones are dropped."""
+        now = time.time()
+        assigned = {}
+        for data in monitors:
+            monitor = SimpleNamespace(**data)
+            current = self.schedule.get(monitor.id)
+            if current is None or current[1] != monitor.frequency_sec:
+                self.schedule.upsert(monitor.id, monitor.frequency_sec, next_slot(monitor.id, monitor.frequency_sec, now))
+            assigned[monitor.id] = monitor
+        for monitor_id in set(self.monitors) - set(assigned):
+            self.schedule.remove(monitor_id)
+        self.monitors = assigned
+
+    def _restore_assignment(self):
+        cached = self.buffer.get_state("assignment")
+        if cached:
+            self.apply_assignment(json.loads(cached)["monitors"])
+            self._etag = self.buffer.get_state("assignment_etag")
+            logger.info(f"Restored the last assignment ({len(self.monitors)} monitors)")
+
+    async def _assignment_loop(self, api: httpx.AsyncClient):
+        params = {"shard": self.config.shard, "shards": self.config.shards}
+        while True:
+            try:
+                response = await api.get(
+                    "/agents/assignment", params=params,
+                    headers={"If-None-Match": self._etag} if self._etag else None,
+                )
+                if response.status_code == 200:
+                    self.apply_assignment(response.json()["monitors"])
+                    self._etag = response.headers.get("ETag")
+                    self.buffer.set_state("assignment", response.text)
+                    self.buffer.set_state("assignment_etag", self._etag or "")
+                    logger.info(f"📋 Assignment updated: {len(self.monitors)} monitors")
+                elif response.status_code != 304:
+                    logger.warning(f"Assignment request failed: HTTP {response.status_code} {response.text[:200]}")
+            except httpx.HTTPError as exc:
+                logger.warning(f"API unreachable for the assignment ({exc!r}); keeping {len(self.monitors)} monitors")
+            await asyncio.sleep(self.config.assignment_refresh_sec)
+
+    # --- probing ---
+
+    async def _probe_loop(self):
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        while True:
+            for monitor_id, _ in self.schedule.pop_due(time.time()):
+                monitor = self.monitors.get(monitor_id)
+                if monitor is not None:
+                    task = asyncio.create_task(self._check(monitor, semaphore))
+                    self._probes.add(task)
+                    task.add_done_callback(self._probes.discard)
+            await self.clients.close_evicted()
+            next_due = self.schedule.next_due()
+            await asyncio.sleep(1.0 if next_due is None else min(1.0, max(0.0, next_due - time.time())))
+
+    async def _check(self, monitor, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            result = await probe_monitor(monitor, self.clients)
+        self.checks += 1
+        row = result.to_row()  # the API tags the batch with the agent's region
+        row.update(monitor_id=str(row["monitor_id"]), timestamp=result.timestamp.isoformat())
+        self._pending.append(json.dumps(row))
+
+    # --- buffering & upload ---
+
+    def _flush(self):
+        bodies, self._pending = self._pending, []
+        dropped = self.buffer.append(bodies)
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Result buffer full: dropped the {dropped} oldest results")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(1.0)
+            self._flush()
+
+    async def _upload_loop(self, api: httpx.AsyncClient):
+        batch_size = self.config.upload_batch_size
+        backoff = self.config.upload_interval_sec
+        while True:
+            batch = self.buffer.next_batch(batch_size)
+            if batch is None:
+                await asyncio.sleep(self.config.upload_interval_sec)
+                continue
+            batch_id, last_seq, bodies = batch
+            body = gzip.compress(('{"results":[' + ",".join(bodies) + "]}").encode(), compresslevel=6)
+            try:
+                response = await api.post(
+                    "/agents/ingest", content=body,
+                    headers={"Content-Encoding": "gzip", "Content-Type": "application/json", "X-Batch-Id": batch_id},
+                )
+            except httpx.HTTPError as exc:
+                response = None
+                logger.warning(f"Upload of {len(bodies)} results failed ({exc!r}); {len(self.buffer)} buffered")
+
+            if response is not None and response.is_success:
+                self.buffer.ack(last_seq)
+                self.uploaded += len(bodies)
+                backoff = self.config.upload_interval_sec
+                logger.info(f"📤 Uploaded {len(bodies)} results ({len(body)} bytes gzip), {len(self.buffer)} left")
+                if len(bodies) >= batch_size:
+                    continue  # draining a backlog
+                await asyncio.sleep(self.config.upload_interval_sec)
+                continue
+
+            if response is not None and response.status_code == 413 and len(bodies) > 1:
+                batch_size = max(1, len(bodies) // 2)
+                self.buffer.abandon()
+                logger.warning(f"Upload too large; retrying with batches of {batch_size}")
+                continue
+            if response is not None and response.status_code in _REJECTED:
+                self.buffer.ack(last_seq)
+                self.dropped += len(bodies)
+                logger.error(
+                    f"Upload of {len(bodies)} results rejected (HTTP {response.status_code}: "
+                    f"{response.text[:200]}); dropped them"
+                )
+                continue
+            if response is not None:
+                logger.warning(f"Upload failed: HTTP {response.status_code}; {len(self.buffer)} buffered")
+            await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            backoff = min(backoff * 2, self.config.max_backoff_sec)
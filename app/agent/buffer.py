@@ -0,0 +1,106 @@
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+
+class ResultBuffer:
+    """
+    Append-only SQLite queue of results waiting to be uploaded.
+
+    Rows are JSON documents keyed by an increasing sequence number and
+    only deleted once the API has acknowledged them, so results survive
+    network partitions and agent restarts. The batch being uploaded is
+    recorded too: a retry re-sends exactly the same rows under the same
+    batch id, which is what lets the API drop the duplicate when only the
+    acknowledgement was lost. `max_rows` bounds the disk used during a
+    long partition by dropping the oldest results.
+    """
+
+    def __init__(self, path: str, max_rows: int = 1_000_000):
+        self.path = path
+        self.max_rows = max_rows
+        self._db = sqlite3.connect(path, isolation_level=None)  # autocommit; explicit transactions below
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; a power cut may lose the last commits
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Batch ids are <epoch>-<first seq>-<last seq>; a new buffer file gets a new epoch
+        self.epoch = self.get_state("epoch")
+        if self.epoch is None:
+            self.epoch = uuid.uuid4().hex[:12]
+            self.set_state("epoch", self.epoch)
+
+    def __len__(self) -> int:
+        # Rows are only deleted from the head, so the sequence range is dense
+        first, last = self._db.execute("SELECT MIN(seq), MAX(seq) FROM results").fetchone()
+        return 0 if first is None else last - first + 1
+
+    def append(self, bodies: list[str]) -> int:
+        """Store serialized results; returns how many old rows were dropped to stay under `max_rows`."""
+        if not bodies:
+            return 0
+        with self._transaction():
+            self._db.executemany("INSERT INTO results (body) VALUES (?)", ((b,) for b in bodies))
+            excess = len(self) - self.max_rows
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM results WHERE seq < (SELECT MIN(seq) FROM results) + ?", (excess,)
+                )
+        return max(excess, 0)
+
+    def next_batch(self, limit: int) -> Optional[tuple[str, int, list[str]]]:
+        """
+        (batch id, last seq, bodies) of the oldest results, or None when
+        empty. Until `ack` or `abandon`, the same batch is returned again.
+        """
+        inflight = self.get_state("inflight")
+        if inflight:
+            first, last = map(int, inflight.split("-"))
+            rows = self._db.execute(
+                "SELECT seq, body FROM results WHERE seq BETWEEN ? AND ? ORDER BY seq", (first, last)
+            ).fetchall()
+            if rows:
+                return f"{self.epoch}-{first}-{last}", last, [body for _, body in rows]
+            # Dropped by `max_rows` meanwhile; start over with the oldest rows
+
+        rows = self._db.execute("SELECT seq, body FROM results ORDER BY seq LIMIT ?", (limit,)).fetchall()
+        if not rows:
+            self.clear_state("inflight")
+            return None
+        first, last = rows[0][0], rows[-1][0]
+        self.set_state("inflight", f"{first}-{last}")
+        return f"{self.epoch}-{first}-{last}", last, [body for _, body in rows]
+
+    def ack(self, last_seq: int):
+        """Delete an uploaded batch (and anything older)."""
+        with self._transaction():
+            self._db.execute("DELETE FROM results WHERE seq <= ?", (last_seq,))
+            self.clear_state("inflight")
+
+    def abandon(self):
+        """Forget the in-flight batch without deleting it, e.g. to re-send it in smaller batches."""
+        self.clear_state("inflight")
+
+    def get_state(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def clear_state(self, key: str):
+        self._db.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def close(self):
+        self._db.close()
+
+    @contextmanager
+    def _transaction(self):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
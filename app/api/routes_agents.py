@@ -0,0 +1,119 @@
+import hashlib
+import hmac
+import json
+import logging
+import zlib
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.instrumentation import AGENT_RESULTS
+from app.db import get_async_db
+from app.models.monitor import Monitor
+from app.schemas.agent import CENTRAL_REGION, REGION_PATTERN, AgentAssignment, AgentMonitor, IngestResult
+from app.services.agent_ingest import UploadTooLarge, decode_upload, to_rows, write_batch
+
+logger = logging.getLogger(__name__)
+
+
+def verify_agent(x_agent_key: Optional[str] = Header(None)):
+    """Probe agents authenticate with the shared AGENT_API_KEY."""
+    if not settings.AGENT_API_KEY:
+        raise HTTPException(status_code=404, detail="Probe agents are not enabled")
+    if not x_agent_key or not hmac.compare_digest(x_agent_key, settings.AGENT_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid agent key")
+
+
+router = APIRouter(prefix="/agents", tags=["Agents"], dependencies=[Depends(verify_agent)])
+
+
+@router.get("/assignment", response_model=AgentAssignment)
+async def get_assignment(
+    db: AsyncSession = Depends(get_async_db),
+    region: str = Header(..., alias="X-Agent-Region", pattern=REGION_PATTERN),
+    if_none_match: Optional[str] = Header(None),
+    shard: int = Query(0, ge=0, description="This agent's index among the region's agents"),
+    shards: int = Query(1, ge=1, le=1024, description="Number of agents splitting the region's monitors"),
+):
+    """
+    Active monitors for an agent to check. Agents of one region can split
+    the monitors with `shard`/`shards`. Answers 304 when the assignment
+    is unchanged since the ETag the agent sent back.
+    """
+    if shard >= shards:
+        raise HTTPException(status_code=400, detail="'shard' must be lower than 'shards'")
+
+    rows = await db.execute(
+        select(
+            Monitor.id, Monitor.url, Monitor.frequency_sec, Monitor.probe_type,
+            Monitor.probe_config, Monitor.force_cold_connection,
+        )
+        .where(Monitor.is_active.is_(True))
+        .order_by(Monitor.id)
+    )
+    monitors = [
+        AgentMonitor.model_validate(row).model_dump(mode="json")
+        for row in rows
+        if zlib.crc32(str(row.id).encode()) % shards == shard
+    ]
+    body = json.dumps({"region": region, "monitors": monitors}).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+@router.post("/ingest", response_model=IngestResult)
+async def ingest_results(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    region: str = Header(..., alias="X-Agent-Region", pattern=REGION_PATTERN),
+    batch_id: str = Header(..., alias="X-Batch-Id", pattern=r"^[\w.:-]{1,128}$"),
+    content_encoding: Optional[str] = Header(None),
+):
+    """
+    Store a batch of an agent's results (gzip JSON `{"results": [...]}`).
+    The batch is written, together with its id, before this returns; a
+    batch id already stored is acknowledged again without writing anything.
+    """
+    if region == CENTRAL_REGION:
+        raise HTTPException(status_code=400, detail=f"Region '{CENTRAL_REGION}' is reserved for the central workers")
+    body = await request.body()
+    try:
+        results = decode_upload(body, content_encoding, settings.AGENT_INGEST_MAX_BYTES)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False)[:20])
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if len(results) > settings.AGENT_INGEST_MAX_RESULTS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.AGENT_INGEST_MAX_RESULTS} results per upload"
+        )
+
+    try:
+        ids = {r.monitor_id for r in results}
+        known = set((await db.scalars(select(Monitor.id).where(Monitor.id.in_(ids)))).all()) if ids else set()
+        rows = to_rows(
+            results, region, known, settings.METRICS_RETENTION_DAYS, settings.AGENT_MAX_CLOCK_SKEW_SEC
+        )
+        written = await run_in_threadpool(write_batch, rows, region, batch_id)
+    except Exception as exc:
+        logger.error(f"Failed to ingest agent batch {region}/{batch_id} ({len(results)} results): {exc}")
+        raise HTTPException(status_code=503, detail="Could not store the batch, retry later")
+    if not written:
+        AGENT_RESULTS.labels(region, "duplicate").inc(len(results))
+        return IngestResult(accepted=0, duplicate=True)
+
+    dropped = len(results) - len(rows)
+    AGENT_RESULTS.labels(region, "accepted").inc(len(rows))
+    if dropped:
+        AGENT_RESULTS.labels(region, "dropped").inc(dropped)
+    logger.info(f"📥 Ingested {len(rows)} results from region {region} (batch {batch_id}, {dropped} dropped)")
+    return IngestResult(accepted=len(rows), dropped=dropped)
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from typing import List, Optional
 from uuid import UUID
 
-from app.db import get_db
+from app.db import get_async_db
 from app.models import Alert, Monitor
 from app.schemas import AlertRead
 from app.models.user import User
@@ -14,8 +14,8 @@ router = APIRouter(prefix="/alerts", tags=["Alerts"])
 
 
 @router.get("/", response_model=List[AlertRead])
-def list_alerts(
-    db: Session = Depends(get_db),
+async def list_alerts(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User =Depends(get_current_user),
     monitor_id: Optional[UUID] = Query(None, description="Filter by monitor ID"),
     channel: Optional[str] = Query(None, description="Filter by channel (email, sms)"),
@@ -23,22 +23,23 @@ def list_alerts(
 ):
     """Get alerts for the current user (optionally filtered by monitor_id/channel)."""
     query = (
-        db.query(Alert)
+        select(Alert)
         .join(Monitor, Monitor.id == Alert.monitor_id)
-        .filter(Monitor.user_id == current_user.id)
+        .where(Monitor.user_id == current_user.id)
     )
 
     if monitor_id:
-        query = query.filter(Alert.monitor_id == monitor_id)
+        query = query.where(Alert.monitor_id == monitor_id)
     if channel:
-        query = query.filter(Alert.channel == channel)
+        query = query.where(Alert.channel == channel)
 
-    return query.order_by(Alert.triggered_at.desc()).limit(limit).all()
+    result = await db.scalars(query.order_by(Alert.triggered_at.desc()).limit(limit))
+    return result.all()
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
-def delete_alerts(
-    db: Session = Depends(get_db),
+async def delete_alerts(
+    db: AsyncSession = Depends(get_async_db),
     current_user=Depends(get_current_user),
     alert_id: Optional[UUID] = Query(None, description="Delete specific alerts by ID"),
     monitor_id: Optional[UUID] = Query(None, description="Delete all alerts for a monitor"),
@@ -66,8 +67,8 @@ def delete_alerts(
 
     # Perform a DELETE statement explicitly
     stmt = delete(Alert).where(*filters)
-    result = db.execute(stmt)
-    db.commit()
+    result = await db.execute(stmt)
+    await db.commit()
 
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="No alerts found matching criteria")
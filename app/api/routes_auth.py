@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi.concurrency import run_in_threadpool
 # from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import get_async_db
 from app.models.user import User
 from app.schemas import UserCreate, UserLogin, UserRead, Token
+from app.services.auth_cache import get_auth_cache
 from app.utils.auth import (
     create_access_token,
     create_refresh_token,
@@ -17,25 +20,29 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
-    existing_user = db.query(User).filter(User.email == user_in.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_in.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    user = User(email=user_in.email, hashed_password=hash_password(user_in.password))
+    # bcrypt is CPU-bound; keep it off the event loop
+    hashed = await run_in_threadpool(hash_password, user_in.password)
+    user = User(email=user_in.email, hashed_password=hashed)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: UserLogin, db: Session = Depends(get_db)):
+async def login(form_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Authenticate user and return JWT tokens."""
-    user = db.query(User).filter(User.email == form_data.email).first()
+    user = await db.scalar(select(User).where(User.email == form_data.email))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await run_in_threadpool(
+        verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token = create_access_token({"sub": str(user.id)})
@@ -49,7 +56,7 @@ def login(form_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(refresh_token: str = Body(..., embed=True)):
+async def refresh_token(refresh_token: str = Body(..., embed=True)):
     """Exchange a refresh token for a new access token."""
     payload = decode_token(refresh_token)
 
@@ -71,6 +78,22 @@ def refresh_token(refresh_token: str = Body(..., embed=True)):
 
 
 @router.get("/me", response_model=UserRead)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user)):
     """Get current logged-in user profile."""
     return current_user
+
+
+@router.post("/deactivate", response_model=UserRead)
+async def deactivate_me(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Deactivate the current account; its tokens stop working immediately."""
+    user = await db.get(User, current_user.id)
+    user.is_active = False
+    await db.commit()
+
+    cache = get_auth_cache()
+    if cache:
+        await cache.invalidate_user(user.id)
+    return user
@@ -1,16 +1,44 @@
 from fastapi import APIRouter
 
+from app.config import settings
 from app.core.celery_app import celery_app
-from app.tasks.monitor import check_single_monitor_task
+from app.db import SessionLocal
+from app.models.monitor import Monitor
+from app.services.auth_cache import get_auth_cache
+from app.services.ring_buffer import get_ring_buffer
+from app.tasks.monitor import check_monitor_batch_task
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 @router.post("/trigger-checks")
-async def trigger_monitor_checks():
-    check_single_monitor_task.delay()  # Runs in Celery worker
-    return {"message": "Monitor checks triggered"}
+def trigger_monitor_checks():
+    db = SessionLocal()
+    try:
+        monitor_ids = [
+            str(row.id)
+            for row in db.query(Monitor.id).filter(Monitor.is_active == True)
+        ]
+    finally:
+        db.close()
+
+    # One batch task per PROBE_BATCH_SIZE monitors, run in Celery workers
+    size = settings.PROBE_BATCH_SIZE
+    for i in range(0, len(monitor_ids), size):
+        check_monitor_batch_task.delay(monitor_ids[i:i + size])
+    return {"message": "Monitor checks triggered", "monitors": len(monitor_ids)}
 
 @router.get("/celery-health")
 async def celery_health():
     result = celery_app.control.ping()
     return {"workers": result}
+
+@router.get("/ring-buffer")
+async def ring_buffer_stats():
+    """Occupancy and memory of this API process's recent metrics buffer."""
+    return get_ring_buffer().stats() if settings.RING_BUFFER_ENABLED else {"enabled": False}
+
+@router.get("/auth-cache")
+async def auth_cache_stats():
+    """Hit/miss counters of this API process's auth cache."""
+    cache = get_auth_cache()
+    return cache.stats() if cache else {"enabled": False}
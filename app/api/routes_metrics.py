@@ -1,59 +1,234 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from app.db import get_db
+from app.db import get_async_db
 from app.models.metric import Metric
-from app.schemas.metric import MetricRead
+from app.schemas.agent import CENTRAL_REGION
+from app.schemas.metric import MetricRead, MetricSummary, RecentMetrics
+from app.schemas.monitor import LatencyAnomaly
+from app.config import settings
 from app.models import User, Monitor
 from app.utils.auth import get_current_user
+from app.services.rollups import merge_rows, summary_from_aggregate, summary_statement, to_naive_utc
+from app.services.metric_export import csv_stream, iter_metric_chunks, ndjson_stream
+from app.services.analytics import (
+    analyze_latency,
+    anomaly_reports,
+    latency_matrix,
+    recent_means_from_buffer,
+    rollup_window_statement,
+    window_bounds,
+)
+from app.services.ring_buffer import get_ring_buffer
+from app.utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/metrics", tags=["Metrics"])
 
 
 @router.get("/", response_model=List[MetricRead])
-def list_metrics(
-    db: Session = Depends(get_db),
+async def list_metrics(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     monitor_id: Optional[UUID] = Query(None, description="Filter by monitor ID"),
     is_up: Optional[bool] = Query(None, description="Filter by uptime status"),
+    region: Optional[str] = Query(None, description="Filter by probe agent region ('central' for the workers)"),
     since: Optional[datetime] = Query(None, description="Only return metrics after this timestamp"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     limit: int = Query(100, le=1000, description="Max number of results to return"),
 ):
-    """List metrics with optional filters."""
+    """
+    List metrics with optional filters, newest first.
+    Pages are keyed on (timestamp, id): pass the `X-Next-Cursor` response
+    header back as `cursor` to fetch the next page.
+    """
     query = (
-        db.query(Metric)
+        select(Metric)
         .join(Monitor, Monitor.id == Metric.monitor_id)
-        .filter(Monitor.user_id == current_user.id)
+        .where(Monitor.user_id == current_user.id)
     )
 
     if monitor_id:
-        query = query.filter(Metric.monitor_id == monitor_id)
+        query = query.where(Metric.monitor_id == monitor_id)
     if is_up is not None:
-        query = query.filter(Metric.is_up == is_up)
+        query = query.where(Metric.is_up == is_up)
+    if region:
+        query = query.where(Metric.region.is_(None) if region == CENTRAL_REGION else Metric.region == region)
     if since:
-        query = query.filter(Metric.timestamp >= since)
+        query = query.where(Metric.timestamp >= to_naive_utc(since))
+    if cursor:
+        query = query.where(tuple_(Metric.timestamp, Metric.id) < decode_cursor(cursor))
 
-    metrics = query.order_by(Metric.timestamp.desc()).limit(limit).all()
+    result = await db.scalars(
+        query.order_by(Metric.timestamp.desc(), Metric.id.desc()).limit(limit)
+    )
+    metrics = result.all()
+    if len(metrics) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(metrics[-1].timestamp, metrics[-1].id)
     return metrics
 
 
+@router.get("/export")
+async def export_metrics(
+    current_user: User = Depends(get_current_user),
+    monitor_id: Optional[UUID] = Query(None, description="Filter by monitor ID"),
+    start: Optional[datetime] = Query(None, description="Range start (inclusive)"),
+    end: Optional[datetime] = Query(None, description="Range end (exclusive)"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+):
+    """Stream any range of metrics as NDJSON or CSV, oldest first."""
+    chunks = iter_metric_chunks(current_user.id, monitor_id, start, end)
+    if format == "csv":
+        return StreamingResponse(
+            csv_stream(chunks),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="metrics.csv"'},
+        )
+    return StreamingResponse(ndjson_stream(chunks), media_type="application/x-ndjson")
+
+
+@router.get("/summary", response_model=MetricSummary)
+async def metrics_summary(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    monitor_id: UUID = Query(..., description="Monitor to summarize"),
+    start: Optional[datetime] = Query(None, description="Range start (default: 24h before end)"),
+    end: Optional[datetime] = Query(None, description="Range end (default: now)"),
+):
+    """Uptime % and p50/p95/p99 latency for any range, served from the rollups."""
+    monitor = await db.scalar(
+        select(Monitor).where(Monitor.id == monitor_id, Monitor.user_id == current_user.id)
+    )
+    if not monitor:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+
+    # Naive UTC throughout, so offset-aware query params compare with the defaults
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'start' must be before 'end'")
+
+    stmt = summary_statement(monitor_id, start, end)
+    rows = (await db.scalars(stmt)).all() if stmt is not None else []
+    return summary_from_aggregate(monitor_id, start, end, merge_rows(rows))
+
+
+@router.get("/recent", response_model=RecentMetrics)
+async def recent_metrics(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    monitor_id: UUID = Query(..., description="Monitor to read"),
+    limit: Optional[int] = Query(None, gt=0, le=settings.RING_BUFFER_CAPACITY, description="Last N checks"),
+    minutes: Optional[float] = Query(None, gt=0, le=24 * 60, description="Checks from the last N minutes"),
+):
+    """
+    Last N checks and/or last N minutes of a monitor, served from this
+    process's in-memory ring buffer when it holds the whole window, and
+    otherwise from the metrics table (only the needed columns).
+    """
+    if limit is None and minutes is None:
+        limit = 60
+    owned = await db.scalar(select(Monitor.id).where(Monitor.id == monitor_id, Monitor.user_id == current_user.id))
+    if not owned:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+
+    since = datetime.utcnow() - timedelta(minutes=minutes) if minutes else None
+    since_ms = int((since - datetime(1970, 1, 1)).total_seconds() * 1000) if since else None
+    buffer = get_ring_buffer() if settings.RING_BUFFER_ENABLED else None
+    if buffer is not None and buffer.covers(monitor_id, n=limit, since_ms=since_ms):
+        samples = buffer.read(monitor_id, n=limit, since_ms=since_ms)
+        return RecentMetrics(
+            monitor_id=monitor_id,
+            source="buffer",
+            timestamps_ms=samples.timestamps_ms.tolist(),
+            response_ms=[None if v != v else v for v in samples.response_ms.tolist()],  # NaN → null
+            status_code=[v or None for v in samples.status_code.tolist()],
+            is_up=samples.is_up.tolist(),
+        )
+
+    query = select(Metric.timestamp, Metric.response_ms, Metric.status_code, Metric.is_up).where(
+        Metric.monitor_id == monitor_id, Metric.region.is_(None)  # the buffer holds central checks only
+    )
+    if since:
+        query = query.where(Metric.timestamp >= since)
+    if limit:
+        query = query.limit(limit)
+    rows = list(reversed((await db.execute(query.order_by(Metric.timestamp.desc()))).all()))
+    epoch = datetime(1970, 1, 1)
+    return RecentMetrics(
+        monitor_id=monitor_id,
+        source="db",
+        timestamps_ms=[int((r.timestamp - epoch).total_seconds() * 1000) for r in rows],
+        response_ms=[r.response_ms for r in rows],
+        status_code=[r.status_code for r in rows],
+        is_up=[r.is_up for r in rows],
+    )
+
+
+@router.get("/anomalies", response_model=List[LatencyAnomaly])
+async def latency_anomalies(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    monitor_id: Optional[UUID] = Query(None, description="Only analyze this monitor"),
+    baseline_hours: float = Query(settings.ANOMALY_BASELINE_HOURS, gt=0, le=24 * 90),
+    recent_minutes: float = Query(settings.ANOMALY_RECENT_MINUTES, gt=0, le=24 * 60),
+    bucket_sec: int = Query(settings.ANOMALY_BUCKET_SEC, ge=60, multiple_of=60),
+    z_threshold: float = Query(settings.ANOMALY_Z_THRESHOLD, gt=0),
+    include_all: bool = Query(False, alias="all", description="Return statistics for every monitor, not only anomalies"),
+):
+    """
+    Latency of each monitor's recent window against its own baseline
+    (robust z-score, EWMA, baseline p50/p95 and the largest mean shift),
+    computed over the rollups for all of the user's active monitors at once.
+    """
+    query = select(Monitor.id).where(Monitor.user_id == current_user.id, Monitor.is_active == True)
+    if monitor_id:
+        query = query.where(Monitor.id == monitor_id)
+    ids = (await db.scalars(query)).all()
+    if not ids:
+        return []
+
+    start, end, buckets, recent = window_bounds(datetime.utcnow(), baseline_hours, recent_minutes, bucket_sec)
+    rows = (await db.execute(rollup_window_statement(ids, start, end, bucket_sec))).all()
+
+    def analyze():
+        matrix = latency_matrix(ids, rows, start, bucket_sec, buckets)
+        analysis = analyze_latency(
+            matrix,
+            recent,
+            z_threshold=z_threshold,
+            min_samples=settings.ANOMALY_MIN_SAMPLES,
+            alpha=settings.ANOMALY_EWMA_ALPHA,
+            recent_ms=recent_means_from_buffer(
+                ids, end - timedelta(seconds=recent * bucket_sec), bucket_sec, recent,
+                settings.ANOMALY_BUFFER_MIN_PER_BUCKET,
+            ),
+        )
+        return anomaly_reports(ids, analysis, start, bucket_sec, only_anomalies=not include_all)
+
+    return await run_in_threadpool(analyze)  # CPU-bound; keep it off the event loop
+
+
 @router.get("/{metric_id}", response_model=MetricRead)
-def get_metric(metric_id: UUID, db: Session = Depends(get_db)):
+async def get_metric(metric_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Fetch a single metric by ID."""
-    metric = db.query(Metric).filter(Metric.id == metric_id).first()
+    metric = await db.scalar(select(Metric).where(Metric.id == metric_id))
     if not metric:
         raise HTTPException(status_code=404, detail="Metric not found")
     return metric
 
 
 @router.delete("/", status_code=204)
-def delete_metrics(
+async def delete_metrics(
     metric_id: UUID | None = Query(None, description="Delete a specific metric by ID"),
     monitor_id: UUID | None = Query(None, description="Delete all metrics for a specific monitor"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Delete metrics. Either `metric_id` OR `monitor_id` must be provided.
@@ -67,16 +242,16 @@ def delete_metrics(
         )
 
     if metric_id:
-        metric = db.query(Metric).filter(Metric.id == metric_id).first()
+        metric = await db.scalar(select(Metric).where(Metric.id == metric_id))
         if not metric:
             raise HTTPException(status_code=404, detail="Metric not found")
-        db.delete(metric)
-        db.commit()
+        await db.delete(metric)
+        await db.commit()
         return None
 
     if monitor_id:
-        deleted_count = db.query(Metric).filter(Metric.monitor_id == monitor_id).delete()
-        db.commit()
-        if deleted_count == 0:
+        result = await db.execute(delete(Metric).where(Metric.monitor_id == monitor_id))
+        await db.commit()
+        if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="No metrics found for this monitor")
         return None
@@ -1,123 +1,400 @@
-# import threading
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from types import SimpleNamespace
 from typing import List
 from uuid import UUID
-from celery.result import AsyncResult
 
-from app.db import get_db
+from app.db import get_async_db
 from app.models.monitor import Monitor
-from app.schemas.monitor import MonitorCreate, MonitorUpdate, MonitorRead
+from app.schemas.probe import validate_probe
+from app.schemas.monitor import (
+    BulkItemResult,
+    BulkResult,
+    MonitorBulkIds,
+    MonitorBulkItems,
+    MonitorBulkUpdate,
+    MonitorCreate,
+    MonitorUpdate,
+    MonitorRead,
+    MonitorStatus,
+)
 from app.utils.auth import get_current_user
 from app.models.user import User
-from app.tasks.monitor import check_single_monitor_task
-# from app.core.scheduler import schedule_task_async
+from app.core.scheduler import schedule_monitor, schedule_monitors, unschedule_monitor, unschedule_monitors
+from app.services.alert_state import forget_monitor, forget_monitors
+from app.services.status_cache import (
+    forget_monitor_status,
+    forget_monitor_statuses,
+    latest_status_from_db,
+    read_latest_status,
+)
+from app.services.live_status import get_status_hub, stream_status
+from app.config import settings
+from app.core.redis_client import get_async_redis
 
 router = APIRouter(prefix="/monitors", tags=["Monitors"])
 
 
+async def _get_user_monitor(db: AsyncSession, monitor_id: UUID, user: User) -> Monitor:
+    monitor = await db.scalar(
+        select(Monitor).where(Monitor.id == monitor_id, Monitor.user_id == user.id)
+    )
+    if not monitor:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+    return monitor
+
+
 @router.get("/", response_model=List[MonitorRead])
-def list_monitors(
-    db: Session = Depends(get_db),
+async def list_monitors(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """List all monitors for the current user."""
-    return (
-        db.query(Monitor)
-        .filter(Monitor.user_id == current_user.id)
+    result = await db.scalars(
+        select(Monitor)
+        .where(Monitor.user_id == current_user.id)
         .order_by(Monitor.created_at.desc())
-        .all()
+    )
+    return result.all()
+
+
+def _status_redis():
+    return get_async_redis() if settings.STATUS_CACHE_ENABLED else None
+
+
+@router.get("/status", response_model=List[MonitorStatus])
+async def monitor_statuses(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Current status of all the user's monitors in one call: one Redis read
+    for the cached statuses, plus a single DISTINCT ON query over metrics
+    for any monitor missing from the cache.
+    """
+    monitors = (
+        await db.execute(
+            select(Monitor.id, Monitor.name, Monitor.url, Monitor.is_active, Monitor.last_checked_at)
+            .where(Monitor.user_id == current_user.id)
+            .order_by(Monitor.created_at.desc())
+        )
+    ).all()
+
+    statuses = await read_latest_status(_status_redis(), current_user.id, [str(m.id) for m in monitors])
+    cached = set(statuses)
+    missing = [m for m in monitors if str(m.id) not in cached]
+    if missing:
+        statuses.update(await latest_status_from_db(db, missing))
+
+    return [
+        MonitorStatus(
+            monitor_id=m.id,
+            name=m.name,
+            url=m.url,
+            is_active=m.is_active,
+            cached=str(m.id) in cached,
+            **statuses.get(str(m.id), {}),
+        )
+        for m in monitors
+    ]
+
+
+@router.get("/stream")
+async def monitor_stream(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Server-sent events for the user's monitors: a `snapshot` of the cached
+    statuses, then a `status` event with every new result as probes
+    finish (coalesced per monitor for slow readers).
+    """
+    if not settings.STATUS_CACHE_ENABLED:
+        raise HTTPException(status_code=503, detail="Live status is disabled")
+
+    monitor_ids = (await db.scalars(select(Monitor.id).where(Monitor.user_id == current_user.id))).all()
+    statuses = await read_latest_status(_status_redis(), current_user.id, [str(m) for m in monitor_ids])
+    await db.close()  # don't hold a pooled connection for the life of the stream
+
+    snapshot = [{"monitor_id": m, **s} for m, s in statuses.items()]
+    return StreamingResponse(
+        stream_status(request, get_status_hub(), current_user.id, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.post("/", response_model=MonitorRead, status_code=status.HTTP_201_CREATED)
-def create_monitor(
+async def create_monitor(
     payload: MonitorCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Create a new monitor for the current user."""
     monitor = Monitor(**payload.dict(), user_id=current_user.id)
     db.add(monitor)
-    db.commit()
-    db.refresh(monitor)
+    await db.commit()
+    await db.refresh(monitor)
+
+    # Register with the scheduler service; the first check runs at the monitor's next
+    # phase slot (see scheduler.initial_due), up to one frequency_sec from now
+    await run_in_threadpool(schedule_monitor, monitor)
+
+    return monitor
+
+
+# --- Bulk management (declared before the /{monitor_id} routes) ---
+
+_NOT_NULL_FIELDS = {c.name for c in Monitor.__table__.columns if not c.nullable}
 
-    # Schedule first check right after creation
-    task = check_single_monitor_task.apply_async(
-        args=[str(monitor.id)], countdown=monitor.frequency_sec
+
+def _check_bulk_size(count: int):
+    if count > settings.MONITOR_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.MONITOR_BULK_MAX_ITEMS} items per request"
+        )
+
+
+def _validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'item'}: {e['msg']}" for e in exc.errors()
     )
-    monitor.celery_task_id = task.id
 
-    db.commit()
-    db.refresh(monitor)
 
-    return monitor
+def _bulk_result(results: List[BulkItemResult]) -> BulkResult:
+    results.sort(key=lambda r: r.index)
+    failed = sum(r.status in ("invalid", "not_found") for r in results)
+    return BulkResult(succeeded=len(results) - failed, failed=failed, results=results)
+
+
+def _id_results(ids: List[UUID], done: set, status: str) -> BulkResult:
+    return _bulk_result([
+        BulkItemResult(index=index, id=monitor_id, status=status if monitor_id in done else "not_found")
+        for index, monitor_id in enumerate(ids)
+    ])
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_monitors(
+    payload: MonitorBulkItems,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Create many monitors (`MonitorCreate` items). Valid items are written
+    with multi-row INSERTs in one transaction and registered with the
+    scheduler in one round trip; invalid items are reported and skipped.
+    """
+    _check_bulk_size(len(payload.items))
+    results, indexes, rows = [], [], []
+    for index, item in enumerate(payload.items):
+        try:
+            data = MonitorCreate(**item).dict()
+        except ValidationError as exc:
+            results.append(BulkItemResult(index=index, status="invalid", error=_validation_error(exc)))
+            continue
+        data.update(user_id=current_user.id, is_active=data["is_active"] is not False)
+        indexes.append(index)
+        rows.append(data)
+
+    if rows:
+        # insertmanyvalues: batches of rows per INSERT ... VALUES statement
+        ids = (
+            await db.scalars(insert(Monitor).returning(Monitor.id, sort_by_parameter_order=True), rows)
+        ).all()
+        await db.commit()
+        await run_in_threadpool(
+            schedule_monitors, [SimpleNamespace(id=monitor_id, **data) for monitor_id, data in zip(ids, rows)]
+        )
+        results += [
+            BulkItemResult(index=index, id=monitor_id, status="created") for index, monitor_id in zip(indexes, ids)
+        ]
+    return _bulk_result(results)
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_monitors(
+    payload: MonitorBulkItems,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Partially update many monitors (`MonitorBulkUpdate` items: `id` plus the
+    fields to change; `is_active` pauses or resumes). Items changing the
+    probe type, URL or probe config are checked against the monitor's other
+    stored probe fields. Updates go out as one executemany UPDATE per
+    distinct set of changed fields.
+    """
+    _check_bulk_size(len(payload.items))
+    results, updates = [], {}
+    for index, item in enumerate(payload.items):
+        try:
+            values = MonitorBulkUpdate(**item).dict(exclude_unset=True)
+        except ValidationError as exc:
+            results.append(BulkItemResult(index=index, status="invalid", error=_validation_error(exc)))
+            continue
+        updates[index] = {k: v for k, v in values.items() if v is not None or k not in _NOT_NULL_FIELDS}
+
+    requested = {values["id"] for values in updates.values()}
+    owned = {
+        row.id: row
+        for row in await db.execute(
+            select(Monitor.id, Monitor.probe_type, Monitor.url, Monitor.probe_config)
+            .where(Monitor.id.in_(requested), Monitor.user_id == current_user.id)
+        )
+    } if requested else {}
+
+    params = []
+    for index, values in updates.items():
+        current = owned.get(values["id"])
+        if current is None:
+            results.append(BulkItemResult(index=index, id=values["id"], status="not_found"))
+            continue
+        if values.keys() & {"probe_type", "url", "probe_config"}:
+            try:
+                validate_probe(
+                    values.get("probe_type", current.probe_type),
+                    values.get("url", current.url),
+                    values.get("probe_config", current.probe_config),
+                )
+            except ValueError as exc:
+                results.append(BulkItemResult(index=index, id=values["id"], status="invalid", error=str(exc)))
+                continue
+        results.append(BulkItemResult(index=index, id=values["id"], status="updated"))
+        if len(values) > 1:
+            params.append(values)
+
+    if params:
+        await db.execute(update(Monitor), params)  # ORM bulk UPDATE by primary key
+        changed = (
+            await db.execute(
+                select(Monitor.id, Monitor.is_active, Monitor.frequency_sec, Monitor.url)
+                .where(Monitor.id.in_({values["id"] for values in params}))
+            )
+        ).all()
+        await db.commit()
+        await run_in_threadpool(schedule_monitors, changed)
+    return _bulk_result(results)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_monitors(
+    payload: MonitorBulkIds,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Delete many monitors with a single DELETE ... RETURNING."""
+    _check_bulk_size(len(payload.ids))
+    deleted = set(
+        (
+            await db.scalars(
+                delete(Monitor)
+                .where(Monitor.id.in_(payload.ids), Monitor.user_id == current_user.id)
+                .returning(Monitor.id)
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+    )
+    await db.commit()
+
+    if deleted:
+        await run_in_threadpool(unschedule_monitors, deleted)
+        await run_in_threadpool(forget_monitors, deleted)
+        await forget_monitor_statuses(_status_redis(), current_user.id, deleted)
+    return _id_results(payload.ids, deleted, "deleted")
+
+
+async def _set_active(db: AsyncSession, user: User, ids: List[UUID], active: bool) -> set:
+    rows = (
+        await db.execute(
+            update(Monitor)
+            .where(Monitor.id.in_(ids), Monitor.user_id == user.id)
+            .values(is_active=active)
+            .returning(Monitor.id, Monitor.is_active, Monitor.frequency_sec, Monitor.url)
+            .execution_options(synchronize_session=False)
+        )
+    ).all()
+    await db.commit()
+    await run_in_threadpool(schedule_monitors, rows)
+    return {row.id for row in rows}
+
+
+@router.post("/bulk/pause", response_model=BulkResult)
+async def bulk_pause_monitors(
+    payload: MonitorBulkIds,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Pause many monitors with a single UPDATE and drop their schedule entries."""
+    _check_bulk_size(len(payload.ids))
+    paused = await _set_active(db, current_user, payload.ids, False)
+    return _id_results(payload.ids, paused, "paused")
+
+
+@router.post("/bulk/resume", response_model=BulkResult)
+async def bulk_resume_monitors(
+    payload: MonitorBulkIds,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Resume many paused monitors with a single UPDATE and schedule them again."""
+    _check_bulk_size(len(payload.ids))
+    resumed = await _set_active(db, current_user, payload.ids, True)
+    return _id_results(payload.ids, resumed, "resumed")
 
 
 @router.get("/{monitor_id}", response_model=MonitorRead)
-def get_monitor(
+async def get_monitor(
     monitor_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get a single monitor by ID for the current user."""
-    monitor = (
-        db.query(Monitor)
-        .filter(Monitor.id == monitor_id, Monitor.user_id == current_user.id)
-        .first()
-    )
-    if not monitor:
-        raise HTTPException(status_code=404, detail="Monitor not found")
-    return monitor
+    return await _get_user_monitor(db, monitor_id, current_user)
 
 
 @router.put("/{monitor_id}", response_model=MonitorRead)
-def update_monitor(
+async def update_monitor(
     monitor_id: UUID,
     payload: MonitorUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Update an existing monitor for the current user."""
-    monitor = (
-        db.query(Monitor)
-        .filter(Monitor.id == monitor_id, Monitor.user_id == current_user.id)
-        .first()
-    )
-    if not monitor:
-        raise HTTPException(status_code=404, detail="Monitor not found")
+    monitor = await _get_user_monitor(db, monitor_id, current_user)
 
     for key, value in payload.dict(exclude_unset=True).items():
         setattr(monitor, key, value)
+    try:
+        validate_probe(monitor.probe_type, monitor.url, monitor.probe_config)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
 
-    # schedule a new one with updated frequency
-    # threading.Thread(target=schedule_task_async, args=(monitor,)).start()
-    task = check_single_monitor_task.apply_async(
-        args=[str(monitor.id)],
-        countdown=monitor.frequency_sec
-    )
-    monitor.celery_task_id = task.id
+    await db.commit()
+    await db.refresh(monitor)
 
-    db.commit()
-    db.refresh(monitor)
+    # Replaces the monitor's single schedule entry (or drops it if paused)
+    await run_in_threadpool(schedule_monitor, monitor)
     return monitor
 
 
 @router.delete("/{monitor_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_monitor(
+async def delete_monitor(
     monitor_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Delete a monitor for the current user."""
-    monitor = (
-        db.query(Monitor)
-        .filter(Monitor.id == monitor_id, Monitor.user_id == current_user.id)
-        .first()
-    )
-    if not monitor:
-        raise HTTPException(status_code=404, detail="Monitor not found")
+    monitor = await _get_user_monitor(db, monitor_id, current_user)
 
-    db.delete(monitor)
-    db.commit()
+    await db.delete(monitor)
+    await db.commit()
+    await run_in_threadpool(unschedule_monitor, monitor_id)
+    await run_in_threadpool(forget_monitor, monitor_id)
+    await forget_monitor_status(_status_redis(), current_user.id, monitor_id)
     return None
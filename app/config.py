@@ -20,20 +20,135 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = Field(..., env="DATABASE_URL")
+    ASYNC_DATABASE_URL: str | None = Field(None, env="ASYNC_DATABASE_URL")  # defaults to DATABASE_URL via asyncpg
 
     # Logging
     LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
 
+    # Prometheus
+    PROMETHEUS_MAX_MONITOR_LABELS: int = Field(100, env="PROMETHEUS_MAX_MONITOR_LABELS")  # per process; rest → "other"
+    WORKER_METRICS_PORT: int = Field(9101, env="WORKER_METRICS_PORT")  # Celery worker exporter; 0 disables
+
+    # Check-path profiling (opt-in)
+    PROFILE_SAMPLE_RATE: float = Field(0.0, env="PROFILE_SAMPLE_RATE")  # fraction of check tasks profiled
+    PROFILE_MODE: str = Field("sampler", env="PROFILE_MODE")  # sampler (all threads) | cprofile (task thread)
+    PROFILE_INTERVAL_SEC: float = Field(0.005, env="PROFILE_INTERVAL_SEC")  # sampler period
+    PROFILE_TOP_N: int = Field(25, env="PROFILE_TOP_N")
+    PROFILE_DIR: str | None = Field(None, env="PROFILE_DIR")  # also dump full profiles here
+
     # Optional External Services
     REDIS_URL: str | None = Field(None, env="REDIS_URL")
     SENTRY_DSN: str | None = Field(None, env="SENTRY_DSN")
 
+    # Probe engine
+    PROBE_CONCURRENCY: int = Field(200, env="PROBE_CONCURRENCY")  # max in-flight probes per worker
+    PROBE_BATCH_SIZE: int = Field(500, env="PROBE_BATCH_SIZE")  # monitors per batch task
+    PROBE_MAX_CONNECTIONS_PER_HOST: int = Field(10, env="PROBE_MAX_CONNECTIONS_PER_HOST")
+    PROBE_MAX_KEEPALIVE_PER_HOST: int = Field(5, env="PROBE_MAX_KEEPALIVE_PER_HOST")
+    PROBE_KEEPALIVE_EXPIRY_SEC: float = Field(60.0, env="PROBE_KEEPALIVE_EXPIRY_SEC")
+    PROBE_HTTP2: bool = Field(False, env="PROBE_HTTP2")  # needs the `h2` package
+    CHECK_LEASE_ENABLED: bool = Field(True, env="CHECK_LEASE_ENABLED")  # at most one check per monitor in flight
+    CHECK_LEASE_GRACE_SEC: float = Field(5.0, env="CHECK_LEASE_GRACE_SEC")  # lease TTL = frequency_sec + this
+
+    # Metric sink (write-behind buffer for the metrics table)
+    METRIC_SINK_BATCH_SIZE: int = Field(1000, env="METRIC_SINK_BATCH_SIZE")  # rows per INSERT/COPY
+    METRIC_SINK_FLUSH_SEC: float = Field(1.0, env="METRIC_SINK_FLUSH_SEC")
+    METRIC_SINK_MAX_BUFFER: int = Field(50_000, env="METRIC_SINK_MAX_BUFFER")  # back-pressure above this
+    METRIC_SINK_PUT_TIMEOUT: float = Field(30.0, env="METRIC_SINK_PUT_TIMEOUT")
+    METRIC_SINK_USE_COPY: bool = Field(False, env="METRIC_SINK_USE_COPY")
+    METRIC_SINK_MAX_ATTEMPTS: int = Field(10, env="METRIC_SINK_MAX_ATTEMPTS")  # failed writes before a batch is dropped
+
+    # Metrics partitioning & retention
+    METRICS_PARTITION_INTERVAL: str = Field("day", env="METRICS_PARTITION_INTERVAL")  # day | week
+    METRICS_PARTITIONS_AHEAD: int = Field(7, env="METRICS_PARTITIONS_AHEAD")  # future partitions to keep ready
+    METRICS_RETENTION_DAYS: int = Field(90, env="METRICS_RETENTION_DAYS")  # 0 keeps everything
+
+    # Rollups (1m / 1h / 1d aggregates maintained on ingest)
+    ROLLUPS_ENABLED: bool = Field(True, env="ROLLUPS_ENABLED")
+    ROLLUP_MINUTE_RETENTION_DAYS: int = Field(7, env="ROLLUP_MINUTE_RETENTION_DAYS")
+    ROLLUP_HOUR_RETENTION_DAYS: int = Field(90, env="ROLLUP_HOUR_RETENTION_DAYS")  # daily rollups are kept
+
+    # Scheduler service
+    SCHEDULER_TICK_SEC: float = Field(1.0, env="SCHEDULER_TICK_SEC")  # max sleep between ticks
+    SCHEDULER_RESYNC_SEC: float = Field(300.0, env="SCHEDULER_RESYNC_SEC")  # full reload from DB
+    SCHEDULER_JITTER_SEC: float = Field(2.0, env="SCHEDULER_JITTER_SEC")  # capped at 10% of the frequency
+    SCHEDULER_MAX_DISPATCH_PER_SEC: float = Field(0, env="SCHEDULER_MAX_DISPATCH_PER_SEC")  # 0 = unlimited
+    SCHEDULER_MODE: str = Field("single", env="SCHEDULER_MODE")  # single | sharded (python -m app.core.sharding)
+
+    # Sharded probing (consistent-hash ring over nodes heartbeating in Redis)
+    SHARD_KEY: str = Field("monitor", env="SHARD_KEY")  # monitor | host (same-host checks share connections)
+    SHARD_NODE_ID: str | None = Field(None, env="SHARD_NODE_ID")  # defaults to hostname:pid
+    SHARD_HEARTBEAT_SEC: float = Field(5.0, env="SHARD_HEARTBEAT_SEC")
+    SHARD_NODE_TTL_SEC: float = Field(15.0, env="SHARD_NODE_TTL_SEC")  # missed heartbeats → node leaves the ring
+    SHARD_VNODES: int = Field(128, env="SHARD_VNODES")  # virtual points per node
+    SHARD_BATCH_WORKERS: int = Field(2, env="SHARD_BATCH_WORKERS")  # batches probed concurrently per node
+
+    # Auth cache (decoded tokens + user records for get_current_user)
+    AUTH_CACHE_ENABLED: bool = Field(True, env="AUTH_CACHE_ENABLED")
+    AUTH_CACHE_MAX_ENTRIES: int = Field(10_000, env="AUTH_CACHE_MAX_ENTRIES")  # per process, per cache
+    AUTH_CACHE_LOCAL_TTL_SEC: float = Field(30.0, env="AUTH_CACHE_LOCAL_TTL_SEC")  # bounds cross-process staleness
+    AUTH_CACHE_REDIS_TTL_SEC: float = Field(300.0, env="AUTH_CACHE_REDIS_TTL_SEC")
+    AUTH_CACHE_USE_REDIS: bool = Field(False, env="AUTH_CACHE_USE_REDIS")  # shared second tier for user records
+
+    # Dashboard status cache (latest result per monitor, one Redis hash per user)
+    STATUS_CACHE_ENABLED: bool = Field(True, env="STATUS_CACHE_ENABLED")
+    STATUS_CACHE_TTL_SEC: int = Field(86_400, env="STATUS_CACHE_TTL_SEC")  # refreshed on every write
+    STATUS_STREAM_KEEPALIVE_SEC: float = Field(15.0, env="STATUS_STREAM_KEEPALIVE_SEC")  # SSE comment when idle
+
+    # Bulk monitor API
+    MONITOR_BULK_MAX_ITEMS: int = Field(10_000, env="MONITOR_BULK_MAX_ITEMS")  # per request
+
+    # Probe agents (python -m app.agent): regional checks uploaded to /agents/ingest
+    AGENT_API_KEY: str | None = Field(None, env="AGENT_API_KEY")  # shared secret; the /agents endpoints are off without it
+    AGENT_INGEST_MAX_BYTES: int = Field(32 * 2**20, env="AGENT_INGEST_MAX_BYTES")  # per upload, after decompression
+    AGENT_INGEST_MAX_RESULTS: int = Field(50_000, env="AGENT_INGEST_MAX_RESULTS")  # per upload
+    AGENT_BATCH_DEDUPE_TTL_SEC: int = Field(86_400, env="AGENT_BATCH_DEDUPE_TTL_SEC")  # batch ids kept this long; re-sends are ignored
+    AGENT_MAX_CLOCK_SKEW_SEC: float = Field(300.0, env="AGENT_MAX_CLOCK_SKEW_SEC")  # later timestamps are dropped
+
+    # Recent metrics ring buffer (per process, 14.125 bytes per sample)
+    RING_BUFFER_ENABLED: bool = Field(True, env="RING_BUFFER_ENABLED")
+    RING_BUFFER_CAPACITY: int = Field(360, env="RING_BUFFER_CAPACITY")  # samples kept per monitor
+    RING_BUFFER_MEMORY_MB: float = Field(64.0, env="RING_BUFFER_MEMORY_MB")  # fixed budget; sets the monitor count
+
+    # Alerting (state machine: UP / DEGRADED / DOWN)
+    ALERT_FAILURE_THRESHOLD: int = Field(3, env="ALERT_FAILURE_THRESHOLD")  # N failed checks ...
+    ALERT_WINDOW: int = Field(5, env="ALERT_WINDOW")  # ... out of the last M; per-monitor overrides exist
+    ALERT_RECOVERY_CHECKS: int = Field(2, env="ALERT_RECOVERY_CHECKS")  # consecutive OK checks to recover
+    ALERT_FLAP_WINDOW: int = Field(20, env="ALERT_FLAP_WINDOW")
+    ALERT_FLAP_HIGH: float = Field(0.5, env="ALERT_FLAP_HIGH")  # share of state changes that starts flapping
+    ALERT_FLAP_LOW: float = Field(0.25, env="ALERT_FLAP_LOW")  # ... and that ends it
+    ALERT_REMINDER_SEC: int = Field(3600, env="ALERT_REMINDER_SEC")  # 0 disables reminders
+    ALERT_STATE_BACKEND: str = Field("redis", env="ALERT_STATE_BACKEND")  # redis | memory (single process only)
+
+    # Latency anomaly detection (monitors with latency_rule = baseline | both)
+    ANOMALY_CHECK_INTERVAL_SEC: float = Field(300.0, env="ANOMALY_CHECK_INTERVAL_SEC")  # beat schedule
+    ANOMALY_BASELINE_HOURS: float = Field(24.0, env="ANOMALY_BASELINE_HOURS")
+    ANOMALY_RECENT_MINUTES: float = Field(15.0, env="ANOMALY_RECENT_MINUTES")  # window compared to the baseline
+    ANOMALY_BUCKET_SEC: int = Field(300, env="ANOMALY_BUCKET_SEC")  # multiple of 60 (3600 multiples read 1h rollups)
+    ANOMALY_Z_THRESHOLD: float = Field(4.0, env="ANOMALY_Z_THRESHOLD")  # robust z-score
+    ANOMALY_MIN_SAMPLES: int = Field(24, env="ANOMALY_MIN_SAMPLES")  # baseline buckets with data
+    ANOMALY_EWMA_ALPHA: float = Field(0.3, env="ANOMALY_EWMA_ALPHA")
+    ANOMALY_BUFFER_MIN_PER_BUCKET: int = Field(1, env="ANOMALY_BUFFER_MIN_PER_BUCKET")  # ring-buffer samples per recent bucket, else rollups
+    ANOMALY_CHUNK_SIZE: int = Field(2000, env="ANOMALY_CHUNK_SIZE")  # monitors per matrix in the periodic task
+
     # Email
     SMTP_SERVER: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USERNAME: EmailStr
     SMTP_PASSWORD: str
     EMAIL_FROM: EmailStr = "smart-monitor-alerts@noreply.com"
+    SMTP_STARTTLS: bool = Field(True, env="SMTP_STARTTLS")  # off for local test servers (e.g. aiosmtpd)
+    SMTP_POOL_SIZE: int = Field(2, env="SMTP_POOL_SIZE")  # open SMTP sessions per worker process
+    SMTP_TIMEOUT_SEC: float = Field(30.0, env="SMTP_TIMEOUT_SEC")
+    SMTP_MAX_IDLE_SEC: float = Field(60.0, env="SMTP_MAX_IDLE_SEC")  # reconnect instead of reusing older sessions
+
+    # Mail dispatch (batching & digests)
+    MAIL_BATCH_WINDOW_SEC: float = Field(2.0, env="MAIL_BATCH_WINDOW_SEC")  # collect alerts this long before sending
+    MAIL_DIGEST_THRESHOLD: int = Field(5, env="MAIL_DIGEST_THRESHOLD")  # alerts per recipient per batch → one digest
+    MAIL_MAX_QUEUE: int = Field(10_000, env="MAIL_MAX_QUEUE")
+    MAIL_MAX_RETRIES: int = Field(3, env="MAIL_MAX_RETRIES")
+    MAIL_BATCH_MAX: int = Field(1000, env="MAIL_BATCH_MAX")  # queued alerts sent per batch
+    MAIL_CLAIM_TIMEOUT_SEC: float = Field(300.0, env="MAIL_CLAIM_TIMEOUT_SEC")  # a batch not sent by then is re-queued
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -42,6 +157,48 @@ class Settings(BaseSettings):
     )
 
     # Extra validation
+    @field_validator("METRICS_PARTITION_INTERVAL")
+    def validate_partition_interval(cls, v: str) -> str:
+        if v not in {"day", "week"}:
+            raise ValueError("METRICS_PARTITION_INTERVAL must be 'day' or 'week'")
+        return v
+
+    @field_validator("SCHEDULER_MODE")
+    def validate_scheduler_mode(cls, v: str) -> str:
+        if v not in {"single", "sharded"}:
+            raise ValueError("SCHEDULER_MODE must be 'single' or 'sharded'")
+        return v
+
+    @field_validator("SHARD_KEY")
+    def validate_shard_key(cls, v: str) -> str:
+        if v not in {"monitor", "host"}:
+            raise ValueError("SHARD_KEY must be 'monitor' or 'host'")
+        return v
+
+    @field_validator("ALERT_STATE_BACKEND")
+    def validate_alert_state_backend(cls, v: str) -> str:
+        if v not in {"redis", "memory"}:
+            raise ValueError("ALERT_STATE_BACKEND must be 'redis' or 'memory'")
+        return v
+
+    @field_validator("ANOMALY_BUCKET_SEC")
+    def validate_anomaly_bucket(cls, v: int) -> int:
+        if v <= 0 or v % 60:
+            raise ValueError("ANOMALY_BUCKET_SEC must be a positive multiple of 60")
+        return v
+
+    @field_validator("ALERT_WINDOW", "ALERT_FLAP_WINDOW")
+    def validate_alert_window(cls, v: int) -> int:
+        if not 1 <= v <= 64:
+            raise ValueError("Alert windows must be between 1 and 64 checks")
+        return v
+
+    @field_validator("PROFILE_MODE")
+    def validate_profile_mode(cls, v: str) -> str:
+        if v not in {"sampler", "cprofile"}:
+            raise ValueError("PROFILE_MODE must be 'sampler' or 'cprofile'")
+        return v
+
     @field_validator("ENVIRONMENT")
     def validate_env(cls, v: str) -> str:
         allowed = {"development", "staging", "production"}
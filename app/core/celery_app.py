@@ -9,15 +9,35 @@ celery_app = Celery(
 
 celery_app.conf.task_routes = {
     "app.tasks.monitor.check_single_monitor": {"queue": "monitoring"},
+    "app.tasks.monitor.check_monitor_batch": {"queue": "monitoring"},
     "app.tasks.alerts.send_alert": {"queue": "alerts"},
+    "app.tasks.alerts.send_alert_emails": {"queue": "alerts"},
+    "app.tasks.maintenance.*": {"queue": "monitoring"},
+    "app.tasks.analytics.*": {"queue": "monitoring"},
 }
 
-# celery_app.conf.beat_schedule = {
-#     "check-monitors-every-minute": {
-#         "task": "app.tasks.monitor.check_monitors",
-#         "schedule": 60.0,  # run every 60 seconds
-#     },
-# }
+celery_app.conf.beat_schedule = {
+    "manage-metric-partitions-hourly": {
+        "task": "app.tasks.maintenance.manage_metric_partitions",
+        "schedule": 3600.0,  # run every hour
+    },
+    "prune-metric-rollups-daily": {
+        "task": "app.tasks.maintenance.prune_metric_rollups",
+        "schedule": 86400.0,  # run once a day
+    },
+    "send-alert-emails": {
+        "task": "app.tasks.alerts.send_alert_emails",
+        "schedule": 60.0,  # safety net; alert tasks schedule a run themselves
+    },
+    "prune-agent-batches-hourly": {
+        "task": "app.tasks.maintenance.prune_agent_batches",
+        "schedule": 3600.0,  # run every hour
+    },
+    "detect-latency-anomalies": {
+        "task": "app.tasks.analytics.detect_latency_anomalies",
+        "schedule": settings.ANOMALY_CHECK_INTERVAL_SEC,
+    },
+}
 
 celery_app.conf.timezone = "UTC"
 
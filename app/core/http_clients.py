@@ -0,0 +1,115 @@
+import logging
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+
+import httpx
+
+from app.core.phase_timing import TimedNetworkBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """
+    Pooled httpx.AsyncClient instances keyed by scheme + host + port.
+
+    Reusing a client keeps its connections alive between probes, so a
+    check measures the endpoint rather than DNS, TCP and TLS setup.
+    Clients are bound to the event loop they were created on; keep one
+    registry per loop (the probe engine owns one). Their transports time
+    the DNS lookup of each new connection (see `TimedNetworkBackend`).
+
+    A client pushed out of the LRU may still be running requests for
+    other batches on the same loop, so probes borrow clients with `use()`
+    and evicted clients are only closed once nothing is using them.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 10,
+        max_keepalive_per_host: int = 5,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        max_clients: int = 1024,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[tuple, httpx.AsyncClient]" = OrderedDict()
+        self._evicted: list[httpx.AsyncClient] = []
+        self._in_use: Counter = Counter()  # client -> probes currently using it
+
+    @staticmethod
+    def key_for(url: str) -> tuple:
+        parsed = httpx.URL(url)
+        return parsed.scheme, parsed.host, parsed.port
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the URL's origin, creating it if needed."""
+        key = self.key_for(url)
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            self._clients.move_to_end(key)
+            return client
+
+        client = httpx.AsyncClient(transport=self._transport(self.limits))
+        self._clients[key] = client
+        if len(self._clients) > self.max_clients:
+            # Probes may still be using it; close it on the next batch
+            _, evicted = self._clients.popitem(last=False)
+            self._evicted.append(evicted)
+        return client
+
+    @asynccontextmanager
+    async def use(self, url: str):
+        """Borrow the pooled client for the URL's origin for one exchange."""
+        client = self.get(url)
+        self._in_use[client] += 1
+        try:
+            yield client
+        finally:
+            self._in_use[client] -= 1
+            if not self._in_use[client]:
+                del self._in_use[client]
+
+    async def close_evicted(self):
+        """Close clients pushed out of the LRU that no probe is using anymore."""
+        busy = []
+        while self._evicted:
+            client = self._evicted.pop()
+            if self._in_use[client]:
+                busy.append(client)  # retried on a later call
+            else:
+                await client.aclose()
+        self._evicted = busy
+
+    def _transport(self, limits: httpx.Limits) -> httpx.AsyncHTTPTransport:
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=self.http2)
+        # httpx doesn't take a network backend; swap it on the underlying httpcore pool
+        transport._pool._network_backend = TimedNetworkBackend(transport._pool._network_backend)
+        return transport
+
+    def cold_client(self) -> httpx.AsyncClient:
+        """A throwaway client with no keep-alive, for handshake measurements."""
+        return httpx.AsyncClient(
+            transport=self._transport(httpx.Limits(max_connections=1, max_keepalive_connections=0))
+        )
+
+    async def aclose(self):
+        """Close every pooled connection (called on worker shutdown)."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await self.close_evicted()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as exc:
+                logger.warning(f"Failed to close HTTP client: {exc}")
+        logger.info(f"Closed {len(clients)} pooled HTTP clients")
+
+    def __len__(self):
+        return len(self._clients)
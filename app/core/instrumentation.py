@@ -0,0 +1,210 @@
+"""
+Prometheus metrics for the API, probe workers and alert pipeline.
+
+Every metric is defined here so names and labels stay consistent. Label
+values are bounded: routes are labelled by their template, and only the
+first `PROMETHEUS_MAX_MONITOR_LABELS` monitors seen by a process get
+their own `monitor` label (the rest share "other").
+
+Celery prefork workers should run with PROMETHEUS_MULTIPROC_DIR set so
+all child processes are aggregated by the exporter in the main process.
+"""
+import logging
+import os
+import threading
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, start_http_server
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+OTHER = "other"
+
+PROBE_LATENCY = Histogram(
+    "probe_response_seconds",
+    "Response time of successful HTTP probes",
+    ["monitor"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+PROBE_CHECKS = Counter(
+    "probe_checks_total",
+    "Monitor checks by outcome",
+    ["monitor", "outcome"],
+)
+PROBE_SKIPPED = Counter(
+    "probe_skipped_total",
+    "Checks dropped before probing",
+    ["reason"],  # superseded (a newer run already checked it) | in_flight (lease held elsewhere)
+)
+AGENT_RESULTS = Counter(
+    "agent_results_total",
+    "Probe agent results received by the ingest endpoint",
+    ["region", "outcome"],  # accepted | dropped (unknown monitor, timestamp out of range) | duplicate
+)
+CHECK_PHASE_SECONDS = Histogram(
+    "check_phase_seconds",
+    "Wall time of each phase of a check task",
+    ["task", "phase"],  # phase: queue_lag | db_load | probe | metric_enqueue | status_cache | db_update | alerts
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+QUEUE_LAG = Histogram(
+    "celery_queue_lag_seconds",
+    "Time between a task's scheduled run time and when a worker started it",
+    ["task"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+SINK_FLUSH_ROWS = Histogram(
+    "metric_sink_flush_rows",
+    "Rows written per metric sink flush",
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+SINK_FLUSH_SECONDS = Histogram(
+    "metric_sink_flush_seconds",
+    "Duration of one metric sink flush (insert + rollups + commit)",
+)
+SINK_FLUSH_FAILURES = Counter(
+    "metric_sink_flush_failures_total",
+    "Metric sink flushes that failed and were kept for retry",
+)
+SINK_DROPPED_ROWS = Counter(
+    "metric_sink_dropped_rows_total",
+    "Metric rows that were never written",
+    ["reason"],  # invalid (rejected by the database) | retries_exhausted | buffer_full
+)
+SINK_DEPTH = Gauge(
+    "metric_sink_buffer_rows",
+    "Rows waiting in the metric sink buffer",
+    multiprocess_mode="livesum",
+)
+ALERT_SEND_LATENCY = Histogram(
+    "alert_email_latency_seconds",
+    "Time from queuing an alert email to the SMTP server accepting it",
+    ["kind"],  # single | digest
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+ALERT_EMAILS = Counter(
+    "alert_emails_total",
+    "Alert emails by result",
+    ["result"],  # sent | failed | dropped
+)
+MAIL_QUEUE_DEPTH = Gauge(
+    "mail_queue_depth",
+    "Alert emails waiting in the mail dispatcher queue",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool",
+    ["pool"],  # sync | async
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+
+class _MonitorLabels:
+    """Hands out `monitor` label values, capped at `limit` distinct monitors per process."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._known: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, monitor_id) -> str:
+        monitor_id = str(monitor_id)
+        if monitor_id in self._known:
+            return monitor_id
+        with self._lock:
+            if len(self._known) < self.limit:
+                self._known.add(monitor_id)
+                return monitor_id
+        return OTHER
+
+
+monitor_label = _MonitorLabels(settings.PROMETHEUS_MAX_MONITOR_LABELS)
+
+
+def probe_outcome(result) -> str:
+    if result.is_up:
+        return "up"
+    if result.status_code is not None:
+        return "http_error"
+    if result.error and result.error.startswith("Request timed out"):
+        return "timeout"
+    return "error"
+
+
+def observe_probes(results):
+    for result in results:
+        label = monitor_label(result.monitor_id)
+        PROBE_CHECKS.labels(label, probe_outcome(result)).inc()
+        if result.response_ms is not None:
+            PROBE_LATENCY.labels(label).observe(result.response_ms / 1000)
+
+
+def observe_queue_lag(task: str, scheduled_for: float | None):
+    if scheduled_for is not None:
+        QUEUE_LAG.labels(task).observe(max(0.0, time.time() - scheduled_for))
+
+
+# --- DB pool checkout wait ---
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    _pool_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self._pool_label).observe(time.perf_counter() - start)
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    _pool_label = "async"
+
+
+# --- Exposition ---
+
+def instrument_app(app):
+    """Per-route request metrics and the /metrics/prometheus scrape endpoint."""
+    from prometheus_fastapi_instrumentator import Instrumentator
+
+    Instrumentator(
+        should_group_status_codes=True,
+        should_group_untemplated=True,  # unknown paths collapse into one label
+        excluded_handlers=["/metrics/prometheus"],
+    ).instrument(app).expose(app, endpoint="/metrics/prometheus", include_in_schema=False)
+
+
+def start_worker_exporter(port: int = settings.WORKER_METRICS_PORT):
+    """
+    Serve worker metrics over HTTP. Called once in the Celery main process;
+    with PROMETHEUS_MULTIPROC_DIR set it aggregates every child process.
+    """
+    if not port:
+        return
+    registry = None
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    try:
+        if registry is None:
+            start_http_server(port)
+        else:
+            start_http_server(port, registry=registry)
+        logger.info(f"📈 Worker metrics exporter listening on :{port}")
+    except OSError as e:
+        logger.warning(f"Worker metrics exporter not started on :{port}: {e}")
+
+
+def mark_process_dead(pid: int):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
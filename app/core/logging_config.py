@@ -0,0 +1,24 @@
+import logging
+import sys
+
+import structlog
+
+from app.config import settings
+
+
+def configure_logging():
+    """stdlib logging + structlog JSON output, shared by the API and the Celery workers."""
+    logging.basicConfig(
+        format="%(message)s",
+        stream=sys.stdout,
+        level=settings.LOG_LEVEL,
+    )
+
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+    )
@@ -0,0 +1,136 @@
+"""
+Per-phase timings of a probe: DNS, connect, TLS, TTFB and download.
+
+HTTP probes get them from httpcore trace events (`PhaseTimer.trace`) plus
+the name lookup done by `TimedNetworkBackend`, which resolves the host
+itself so DNS is not folded into the connect time. Socket-level probes
+(TCP, TLS expiry) measure the same phases directly.
+"""
+import asyncio
+import socket
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from typing import Optional
+
+import httpcore
+
+# The probe running in the current task, so the network backend can record its DNS time
+current_timer: ContextVar[Optional["PhaseTimer"]] = ContextVar("current_timer", default=None)
+
+
+@dataclass
+class PhaseTimings:
+    """
+    Duration (ms) of each phase of one probe. A phase that did not happen
+    is None, e.g. DNS/connect/TLS when a pooled connection was reused.
+    """
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None  # request sent -> response headers received
+    download_ms: Optional[float] = None  # response headers -> body read (or abandoned)
+
+    def as_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+class PhaseTimer:
+    """Collects the phase timings of one probe."""
+
+    def __init__(self):
+        self.timings = PhaseTimings()
+        self.started = time.perf_counter()
+        self._marks: dict[str, float] = {}
+        self._headers_at: Optional[float] = None
+
+    @contextmanager
+    def measure(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self.timings, phase, _ms(time.perf_counter() - start))
+
+    @contextmanager
+    def active(self):
+        """Make this the current task's timer (for `TimedNetworkBackend`)."""
+        token = current_timer.set(self)
+        try:
+            yield self
+        finally:
+            current_timer.reset(token)
+
+    async def trace(self, event: str, info: dict):
+        """httpcore trace hook (`extensions={"trace": timer.trace}`)."""
+        now = time.perf_counter()
+        name, _, stage = event.rpartition(".")
+        step = name.rpartition(".")[2]  # connect_tcp, start_tls, send_request_headers, ...
+        if stage == "started":
+            self._marks[step] = now
+            return
+        if stage != "complete" or step not in self._marks:
+            return
+        elapsed = now - self._marks[step]
+        if step == "connect_tcp":
+            # The backend's name lookup happens inside connect_tcp
+            self.timings.connect_ms = round(max(0.0, _ms(elapsed) - (self.timings.dns_ms or 0.0)), 3)
+        elif step == "start_tls":
+            self.timings.tls_ms = _ms(elapsed)
+        elif step == "receive_response_headers" and "send_request_headers" in self._marks:
+            self.timings.ttfb_ms = _ms(now - self._marks["send_request_headers"])
+            self._headers_at = now
+
+    def finish(self) -> float:
+        """Close the download phase; returns the total time in ms."""
+        now = time.perf_counter()
+        if self._headers_at is not None:
+            self.timings.download_ms = _ms(now - self._headers_at)
+        return _ms(now - self.started)
+
+
+async def resolve(host: str, port: int, timer: Optional[PhaseTimer] = None) -> list[str]:
+    """Addresses of `host`, recording the lookup as the timer's DNS phase."""
+    start = time.perf_counter()
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if timer is not None:
+        timer.timings.dns_ms = _ms(time.perf_counter() - start)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class TimedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Wraps httpcore's backend to resolve host names separately (timed as
+    the DNS phase), then connects to the resolved addresses in order.
+    TLS still uses the original host name for SNI and verification.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self._backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await asyncio.wait_for(resolve(host, port, current_timer.get()), timeout)
+        except asyncio.TimeoutError as exc:
+            raise httpcore.ConnectTimeout(f"DNS lookup of {host} timed out") from exc
+        except OSError as exc:
+            raise httpcore.ConnectError(f"DNS lookup of {host} failed: {exc}") from exc
+
+        error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as exc:
+                error = exc
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
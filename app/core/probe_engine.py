@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from app.config import settings
+from app.core.http_clients import ClientRegistry
+from app.services.probes import ProbeResult, probe_monitor
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeEngine:
+    """
+    Long-lived asyncio loop that runs monitor probes concurrently.
+
+    One engine lives in each worker process. The loop runs in a daemon
+    thread so synchronous Celery tasks can hand it whole batches of
+    monitors and block until every probe in the batch has finished.
+    """
+
+    def __init__(self, concurrency: int, batch_size: int, clients: ClientRegistry | None = None):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.clients = clients or ClientRegistry()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+
+        # Throughput counters
+        self.checks = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the event loop thread (idempotent)."""
+        with self._lock:
+            if self.running:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._thread = threading.Thread(
+                target=self._run_loop, name="probe-engine", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Probe engine started (concurrency={self.concurrency})")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the event loop and wait for its thread to exit."""
+        with self._lock:
+            if not self.running:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self.clients.aclose(), self._loop
+                ).result(timeout)
+            except Exception as exc:
+                logger.warning(f"Failed to close pooled HTTP clients: {exc}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._loop.close()
+            self._thread = None
+            logger.info(f"Probe engine stopped | {self.stats()}")
+
+    def submit(self, coro, timeout: float | None = None):
+        """Run a coroutine on the engine loop and wait for its result."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def run_batch(self, monitors: list) -> list[ProbeResult]:
+        """Probe all monitors concurrently, in chunks of `batch_size`."""
+        results: list[ProbeResult] = []
+        for i in range(0, len(monitors), self.batch_size):
+            chunk = monitors[i:i + self.batch_size]
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            results.extend(self.submit(self._probe_all(chunk)))
+            self._record(len(chunk), wall_start, cpu_start)
+        return results
+
+    async def _probe_all(self, monitors: list) -> list[ProbeResult]:
+        await self.clients.close_evicted()
+        return await asyncio.gather(*(self._probe(m) for m in monitors))
+
+    async def _probe(self, monitor) -> ProbeResult:
+        async with self._semaphore:
+            return await probe_monitor(monitor, self.clients)
+
+    def _record(self, count: int, wall_start: float, cpu_start: float):
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        self.checks += count
+        self.wall_seconds += wall
+        self.cpu_seconds += cpu
+        logger.info(
+            f"Probe batch of {count} done in {wall:.3f}s "
+            f"({count / wall if wall else 0:.1f} checks/s, "
+            f"{count / cpu if cpu else 0:.1f} checks/s per core)"
+        )
+
+    def stats(self) -> dict:
+        """Cumulative throughput since the engine was created."""
+        return {
+            "checks": self.checks,
+            "checks_per_sec": self.checks / self.wall_seconds if self.wall_seconds else 0.0,
+            "checks_per_sec_per_core": self.checks / self.cpu_seconds if self.cpu_seconds else 0.0,
+        }
+
+
+@lru_cache()
+def get_probe_engine() -> ProbeEngine:
+    return ProbeEngine(
+        concurrency=settings.PROBE_CONCURRENCY,
+        batch_size=settings.PROBE_BATCH_SIZE,
+        clients=ClientRegistry(
+            max_connections_per_host=settings.PROBE_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_per_host=settings.PROBE_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=settings.PROBE_KEEPALIVE_EXPIRY_SEC,
+            http2=settings.PROBE_HTTP2,
+        ),
+    )
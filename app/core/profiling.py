@@ -0,0 +1,163 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import structlog
+
+from app.config import settings
+from app.core.instrumentation import CHECK_PHASE_SECONDS
+
+log = structlog.get_logger("app.checks")
+
+
+class CheckTimer:
+    """
+    Wall-time spans for the phases of one check task.
+
+    Each span is observed in the `check_phase_seconds{task,phase}`
+    histogram; `emit()` logs all phases of the task as one structlog event.
+    """
+
+    def __init__(self, task: str, **context):
+        self.task = task
+        self.context = context
+        self.phases: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def span(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        CHECK_PHASE_SECONDS.labels(self.task, phase).observe(seconds)
+
+    def emit(self, **extra):
+        log.info(
+            "check_timing",
+            task=self.task,
+            total_ms=round((time.perf_counter() - self._started) * 1000, 2),
+            **{f"{phase}_ms": round(seconds * 1000, 2) for phase, seconds in self.phases.items()},
+            **self.context,
+            **extra,
+        )
+
+
+@contextmanager
+def null_span(phase: str):
+    yield
+
+
+def span(timer: CheckTimer | None, phase: str):
+    """`timer.span(phase)`, or a no-op when the caller passed no timer."""
+    return timer.span(phase) if timer is not None else null_span(phase)
+
+
+class StackSampler:
+    """
+    Statistical profiler: samples the stacks of all threads every
+    `interval` seconds. Unlike cProfile it also sees the probe engine's
+    event loop thread, where the HTTP work of a check actually runs.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()  # "outer;...;inner" -> samples
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def top(self, n: int = 20) -> list[tuple[str, int]]:
+        """Functions by number of samples in which they were on top of a stack (self time)."""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rpartition(";")[2]] += count
+        return leaves.most_common(n)
+
+    def dump(self, path: str):
+        """Collapsed stacks, one per line (flamegraph.pl / speedscope format)."""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def maybe_profile(task: str, **context):
+    """
+    Profile this task with probability PROFILE_SAMPLE_RATE. The summary
+    goes to the log; with PROFILE_DIR set, the full profile is written
+    there (.prof for cProfile, collapsed stacks for the sampler).
+    """
+    if settings.PROFILE_SAMPLE_RATE <= 0 or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        yield
+        return
+
+    path = None
+    if settings.PROFILE_DIR:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, f"{task}-{os.getpid()}-{int(time.time() * 1000)}")
+
+    if settings.PROFILE_MODE == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(settings.PROFILE_TOP_N)
+            log.info("check_profile", task=task, mode="cprofile", stats=out.getvalue(), **context)
+            if path:
+                profiler.dump_stats(f"{path}.prof")
+    else:
+        sampler = StackSampler(interval=settings.PROFILE_INTERVAL_SEC)
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            log.info(
+                "check_profile",
+                task=task,
+                mode="sampler",
+                samples=sampler.samples,
+                top=sampler.top(settings.PROFILE_TOP_N),
+                **context,
+            )
+            if path:
+                sampler.dump(f"{path}.collapsed")
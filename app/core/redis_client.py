@@ -0,0 +1,19 @@
+from functools import lru_cache
+
+import redis
+
+from app.config import settings
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """Process-wide Redis client (the connection pool is shared)."""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+@lru_cache()
+def get_async_redis() -> "redis.asyncio.Redis":
+    """asyncio Redis client for the API's event loop."""
+    import redis.asyncio
+
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
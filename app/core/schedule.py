@@ -0,0 +1,113 @@
+"""
+Per-monitor run schedule shared by the scheduler service and probe agents.
+
+Pure in-memory bookkeeping (no settings, Redis or database), so the
+standalone probe agent can reuse it.
+"""
+import heapq
+import itertools
+import math
+import random
+import zlib
+
+
+def phase_offset(monitor_id: str, frequency_sec: int) -> float:
+    """Deterministic offset in [0, frequency_sec) for a monitor, stable across restarts."""
+    window_ms = max(1, int(frequency_sec * 1000))
+    return (zlib.crc32(str(monitor_id).encode()) % window_ms) / 1000
+
+
+def next_slot(monitor_id: str, frequency_sec: int, after: float) -> float:
+    """First slot strictly after `after` on the monitor's grid (phase + k * frequency)."""
+    phase = phase_offset(monitor_id, frequency_sec)
+    return phase + (math.floor((after - phase) / frequency_sec) + 1) * frequency_sec
+
+
+class MonitorSchedule:
+    """
+    Min-heap of monitors keyed by next due time.
+
+    Each monitor has exactly one live entry however often it is updated:
+    updates and removals mark the old heap entry as dead (lazy deletion)
+    and push a new one, so insert/update/delete are all O(log n).
+
+    Monitors run on their own slot grid (see `next_slot`), so checks of
+    monitors sharing a frequency are spread across the whole window.
+    Each run is delayed by a random jitter of at most `jitter_sec`
+    (and never more than 10% of the frequency).
+    """
+
+    _REMOVED = None
+
+    def __init__(self, jitter_sec: float = 0.0):
+        self.jitter_sec = jitter_sec
+        self._heap: list[list] = []  # [due_at, seq, monitor_id, frequency_sec]
+        self._entries: dict[str, list] = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, monitor_id: str):
+        return monitor_id in self._entries
+
+    def ids(self) -> list[str]:
+        return list(self._entries)
+
+    def upsert(self, monitor_id: str, frequency_sec: int, due_at: float):
+        """Insert or replace the single schedule entry for a monitor."""
+        self.remove(monitor_id)
+        entry = [due_at, next(self._counter), monitor_id, frequency_sec]
+        self._entries[monitor_id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, monitor_id: str):
+        entry = self._entries.pop(monitor_id, None)
+        if entry is not None:
+            entry[2] = self._REMOVED
+            self._maybe_compact()
+
+    def get(self, monitor_id: str) -> tuple[float, int] | None:
+        """(due_at, frequency_sec) for a monitor, if scheduled."""
+        entry = self._entries.get(monitor_id)
+        return (entry[0], entry[3]) if entry else None
+
+    def next_due(self) -> float | None:
+        self._drop_dead_head()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, limit: int | None = None) -> list[tuple[str, float]]:
+        """
+        Pop up to `limit` monitors due at or before `now` and re-arm each
+        one for its next slot. Returns (monitor_id, due_at) pairs.
+        """
+        due = []
+        while self._heap and (limit is None or len(due) < limit):
+            self._drop_dead_head()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            due_at, _, monitor_id, frequency_sec = heapq.heappop(self._heap)
+            del self._entries[monitor_id]
+            due.append((monitor_id, due_at))
+
+            # Keep the monitor's phase; skip missed slots instead of bursting
+            self.upsert(
+                monitor_id,
+                frequency_sec,
+                next_slot(monitor_id, frequency_sec, now) + self.jitter(frequency_sec),
+            )
+        return due
+
+    def jitter(self, frequency_sec: int) -> float:
+        bound = min(self.jitter_sec, frequency_sec * 0.1)
+        return random.uniform(0, bound) if bound > 0 else 0.0
+
+    def _drop_dead_head(self):
+        while self._heap and self._heap[0][2] is self._REMOVED:
+            heapq.heappop(self._heap)
+
+    def _maybe_compact(self):
+        # Dead entries are normally popped lazily; rebuild if they dominate
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [e for e in self._heap if e[2] is not self._REMOVED]
+            heapq.heapify(self._heap)
@@ -1,69 +1,265 @@
+import json
 import logging
-from celery.result import AsyncResult
-from sqlalchemy.orm import joinedload
+import time
+from datetime import timezone
 
-from app.core.celery_app import celery_app
+from app.config import settings
+from app.core.schedule import MonitorSchedule, next_slot
+from app.core.redis_client import get_redis
 from app.db import SessionLocal
 from app.models.monitor import Monitor
-from app.tasks.monitor import check_single_monitor_task
+from app.tasks.monitor import check_monitor_batch_task
 
 logger = logging.getLogger(__name__)
 
+EVENTS_KEY = "scheduler:events"
+EVENTS_CHANNEL = "scheduler:events:pubsub"  # sharded mode: every node sees every event
 
-def reschedule_all_monitors():
-    """Reschedule tasks for all active monitors on startup."""
-    db = SessionLocal()
-    try:
-        # Load monitors with their user relationship so we have access for alerts if needed
-        monitors = (
-            db.query(Monitor)
-            .options(joinedload(Monitor.user))
-            .filter(Monitor.is_active == True)
-            .all()
-        )
-
-        if not monitors:
-            logger.info("No active monitors found to reschedule.")
+
+class TokenBucket:
+    """Caps the global dispatch rate at `rate` checks/sec with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = max(1.0, burst or rate)  # a fractional rate must still grant whole tokens
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, wanted: int) -> int:
+        """Take up to `wanted` whole tokens; returns how many were granted."""
+        self._refill()
+        granted = min(wanted, int(self.tokens))
+        self.tokens -= granted
+        return granted
+
+    def refund(self, count: int):
+        self.tokens = min(self.capacity, self.tokens + count)
+
+    def wait_time(self, wanted: int = 1) -> float:
+        self._refill()
+        return max(0.0, (wanted - self.tokens) / self.rate)
+
+
+class SchedulerService:
+    """
+    Dispatches due monitors to the probe workers in batches.
+
+    Runs as a single dedicated process (`python -m app.core.scheduler`);
+    in sharded mode each probe node runs its own (see app.core.sharding).
+    The API notifies it of monitor changes through a Redis list, and it
+    reloads active monitors from the DB every `resync_sec` to reconcile.
+    Dispatch is capped at `max_per_sec` checks/sec when set; monitors held
+    back stay due and go out on the following ticks.
+    """
+
+    def __init__(
+        self,
+        dispatch,
+        batch_size: int = settings.PROBE_BATCH_SIZE,
+        tick_sec: float = settings.SCHEDULER_TICK_SEC,
+        resync_sec: float = settings.SCHEDULER_RESYNC_SEC,
+        jitter_sec: float = settings.SCHEDULER_JITTER_SEC,
+        max_per_sec: float = settings.SCHEDULER_MAX_DISPATCH_PER_SEC,
+    ):
+        self.dispatch = dispatch  # callable(monitor_ids: list[str], scheduled_for: float)
+        self.batch_size = batch_size
+        self.tick_sec = tick_sec
+        self.resync_sec = resync_sec
+        self.schedule = MonitorSchedule(jitter_sec=jitter_sec)
+        self.limiter = TokenBucket(max_per_sec) if max_per_sec > 0 else None
+        self._last_resync = 0.0
+
+    def initial_due(self, monitor_id: str, frequency_sec: int, last_checked_at, now: float) -> float:
+        """
+        First due time for a monitor the scheduler has not seen yet: its
+        next slot, but at least half a period after its last check. After
+        a restart this spreads the whole fleet over the frequency window
+        instead of firing everything at once.
+        """
+        earliest = now
+        if last_checked_at is not None:
+            last = last_checked_at.replace(tzinfo=timezone.utc).timestamp()
+            earliest = max(now, last + frequency_sec / 2)
+        return next_slot(monitor_id, frequency_sec, earliest) + self.schedule.jitter(frequency_sec)
+
+    def owns(self, monitor_id: str, url: str | None = None) -> bool:
+        """Whether this scheduler is responsible for a monitor (always, unless sharded)."""
+        return True
+
+    def upsert(
+        self, monitor_id: str, frequency_sec: int, last_checked_at=None, now: float | None = None, url: str | None = None
+    ):
+        if not self.owns(monitor_id, url):
+            self.schedule.remove(monitor_id)
             return
+        now = time.time() if now is None else now
+        current = self.schedule.get(monitor_id)
+        if current is None:
+            due_at = self.initial_due(monitor_id, frequency_sec, last_checked_at, now)
+        elif current[1] == frequency_sec:
+            return  # unrelated edit; keep the existing slot
+        else:
+            due_at = min(current[0], next_slot(monitor_id, frequency_sec, now))
+        self.schedule.upsert(monitor_id, frequency_sec, due_at)
+
+    def resync(self):
+        """Reconcile the in-memory schedule with the active monitors in the DB."""
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Monitor.id, Monitor.frequency_sec, Monitor.last_checked_at, Monitor.url)
+                .filter(Monitor.is_active == True)
+                .all()
+            )
+        finally:
+            db.close()
+
+        now = time.time()
+        active = set()
+        for row in rows:
+            monitor_id = str(row.id)
+            self.upsert(monitor_id, row.frequency_sec, row.last_checked_at, now, url=row.url)
+            if monitor_id in self.schedule:
+                active.add(monitor_id)
+
+        stale = [m for m in self.schedule.ids() if m not in active]
+        for monitor_id in stale:
+            self.schedule.remove(monitor_id)
+
+        self._last_resync = now
+        logger.info(f"Scheduler resynced: {len(self.schedule)} active monitors ({len(stale)} dropped)")
+
+    def apply_events(self):
+        """Drain monitor change events pushed by the API."""
+        redis = get_redis()
+        pipe = redis.pipeline()
+        pipe.lrange(EVENTS_KEY, 0, -1)
+        pipe.delete(EVENTS_KEY)
+        raw_events, _ = pipe.execute()
+
+        for raw in raw_events:
+            self.apply_event(json.loads(raw))
+
+    def apply_event(self, event: dict):
+        op = event.get("op")
+        if op == "upsert":
+            self.upsert(event["id"], int(event["frequency_sec"]), url=event.get("url"))
+        elif op == "remove":
+            self.schedule.remove(event["id"])
+        elif op == "resync":
+            self.request_resync()
+
+    def request_resync(self):
+        self._last_resync = 0.0  # forces a resync on the next tick
 
-        for monitor in monitors:
-            # Revoke old task if it exists (likely invalid after restart)
-            if monitor.celery_task_id:
-                try:
-                    AsyncResult(monitor.celery_task_id).revoke(terminate=False)
-                    logger.debug(f"Revoked old task {monitor.celery_task_id} for {monitor.url}")
-                except Exception as e:
-                    logger.warning(f"Failed to revoke task {monitor.celery_task_id}: {e}")
+    def housekeeping(self):
+        """Hook run at the start of every loop iteration (e.g. shard heartbeats)."""
 
+    def tick(self, now: float | None = None) -> int:
+        """Dispatch every monitor that is due. Returns the number dispatched."""
+        now = time.time() if now is None else now
+        dispatched = 0
+        while True:
+            limit = self.batch_size
+            if self.limiter is not None:
+                limit = self.limiter.take(limit)
+                if not limit:
+                    break
+            due = self.schedule.pop_due(now, limit=limit)
+            if self.limiter is not None:
+                self.limiter.refund(limit - len(due))
+            if not due:
+                break
+            self.dispatch([m for m, _ in due], max(d for _, d in due))
+            dispatched += len(due)
+        return dispatched
+
+    def run_forever(self):
+        logger.info("Scheduler service started")
+        while True:
             try:
-                # Schedule a new task immediately (countdown = 0)
-                task = check_single_monitor_task.apply_async(
-                    args=[str(monitor.id)], countdown=0
-                )
-                monitor.celery_task_id = task.id
-                logger.info(
-                    f"Rescheduled monitor {monitor.url} "
-                    f"(new task={task.id}) to run in {monitor.frequency_sec}s"
-                )
+                self.housekeeping()
+                self.apply_events()
+                if time.time() - self._last_resync >= self.resync_sec:
+                    self.resync()
+                count = self.tick()
+                if count:
+                    logger.info(f"Dispatched {count} monitor checks")
             except Exception as e:
-                logger.error(f"Failed to schedule monitor {monitor.url}: {e}")
+                logger.error(f"Scheduler tick failed: {e}", exc_info=True)
+
+            next_due = self.schedule.next_due()
+            sleep_for = self.tick_sec if next_due is None else next_due - time.time()
+            if sleep_for <= 0 and self.limiter is not None:
+                # Throttled: wait for roughly a tenth of a second's worth of tokens
+                wanted = max(1, min(self.batch_size, int(self.limiter.rate / 10)))
+                sleep_for = self.limiter.wait_time(wanted)
+            time.sleep(min(max(sleep_for, 0.01), self.tick_sec))
+
 
-        db.commit()
+def dispatch_to_celery(monitor_ids: list[str], scheduled_for: float):
+    check_monitor_batch_task.apply_async(
+        args=[monitor_ids], kwargs={"scheduled_for": scheduled_for}
+    )
 
+
+# --- Change notifications (called from the API) ---
+
+def _push_events(*events: dict):
+    if not events:
+        return
+    try:
+        payloads = [json.dumps(e) for e in events]
+        if settings.SCHEDULER_MODE == "sharded":
+            pipe = get_redis().pipeline(transaction=False)
+            for payload in payloads:
+                pipe.publish(EVENTS_CHANNEL, payload)
+            pipe.execute()
+        else:
+            get_redis().rpush(EVENTS_KEY, *payloads)
     except Exception as e:
-        db.rollback()
-        logger.error(f"Failed to reschedule all monitors: {e}")
-    finally:
-        db.close()
-
-
-# def schedule_task_async(monitor):
-#     db = SessionLocal()
-#     try:
-#         task = check_single_monitor_task.apply_async(
-#             args=[str(monitor.id)], countdown=monitor.frequency_sec
-#         )
-#         monitor.celery_task_id = task.id
-#         db.commit()
-#     except Exception as e:
-#         logger.error(f"Failed to schedule task: {e}")
\ No newline at end of file
+        # The periodic resync picks the change up anyway
+        logger.warning(f"Failed to notify scheduler: {e}")
+
+
+def _schedule_event(monitor) -> dict:
+    if monitor.is_active:
+        return {"op": "upsert", "id": str(monitor.id), "frequency_sec": monitor.frequency_sec, "url": monitor.url}
+    return {"op": "remove", "id": str(monitor.id)}
+
+
+def schedule_monitor(monitor):
+    """Create or update the schedule entry for a monitor (or drop it if paused)."""
+    _push_events(_schedule_event(monitor))
+
+
+def schedule_monitors(monitors):
+    """`schedule_monitor` for many monitors in one Redis round trip."""
+    _push_events(*(_schedule_event(m) for m in monitors))
+
+
+def unschedule_monitor(monitor_id):
+    unschedule_monitors([monitor_id])
+
+
+def unschedule_monitors(monitor_ids):
+    _push_events(*({"op": "remove", "id": str(m)} for m in monitor_ids))
+
+
+def reschedule_all_monitors():
+    """Ask the scheduler to reload every active monitor from the DB."""
+    _push_events({"op": "resync"})
+
+
+def main():
+    logging.basicConfig(format="%(message)s", level=settings.LOG_LEVEL)
+    SchedulerService(dispatch=dispatch_to_celery).run_forever()
+
+
+if __name__ == "__main__":
+    main()
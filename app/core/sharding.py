@@ -0,0 +1,197 @@
+"""
+Consistent-hash sharding of monitors across probe nodes.
+
+Run one node per machine (or process) with `python -m app.core.sharding`.
+Nodes announce themselves with heartbeats in a Redis sorted set; every
+node builds the same hash ring from the live members and schedules and
+probes only the monitors that hash to it, on its own scheduler and probe
+engine. When a node joins or stops heartbeating, the others rebuild the
+ring and resync, and only the monitors on the moved arcs change owner.
+
+Monitors are keyed by id, or by target host with SHARD_KEY=host so every
+check of a host runs on one node and reuses its pooled connections.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from app.config import settings
+from app.core.redis_client import get_redis
+from app.core.scheduler import EVENTS_CHANNEL, SchedulerService
+
+logger = logging.getLogger(__name__)
+
+MEMBERS_KEY = "shards:members"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hash ring with `vnodes` virtual points per node."""
+
+    def __init__(self, nodes=(), vnodes: int = 128):
+        self.vnodes = vnodes
+        self.nodes: tuple[str, ...] = tuple(sorted(set(nodes)))
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_for(self, key: str) -> str | None:
+        if not self._hashes:
+            return None
+        i = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[i]
+
+
+def shard_key(monitor_id: str, url: str | None = None, mode: str = settings.SHARD_KEY) -> str:
+    """Ring key for a monitor: its id, or its target host when sharding by host."""
+    if mode == "host" and url:
+        host = urlsplit(url).hostname
+        if host:
+            return host
+    return str(monitor_id)
+
+
+class Membership:
+    """
+    Node heartbeats in a Redis sorted set (member = node id, score = last
+    heartbeat). Members that have not heartbeated for `ttl` seconds are
+    pruned by whichever node heartbeats next.
+    """
+
+    def __init__(self, redis, node_id: str, ttl: float = 15.0, key: str = MEMBERS_KEY):
+        self.redis = redis
+        self.node_id = node_id
+        self.ttl = ttl
+        self.key = key
+
+    def heartbeat(self, now: float | None = None) -> list[str]:
+        """Refresh this node and return the live members, sorted."""
+        now = time.time() if now is None else now
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.key, {self.node_id: now})
+        pipe.zremrangebyscore(self.key, "-inf", now - self.ttl)
+        pipe.zrange(self.key, 0, -1)
+        return sorted(pipe.execute()[2])
+
+    def leave(self):
+        self.redis.zrem(self.key, self.node_id)
+
+
+class ShardScheduler(SchedulerService):
+    """
+    Scheduler for one shard: heartbeats, follows monitor changes over
+    Redis pub/sub (every node sees every event) and only schedules the
+    monitors the ring assigns to this node.
+    """
+
+    def __init__(
+        self,
+        dispatch,
+        membership: Membership,
+        heartbeat_sec: float = settings.SHARD_HEARTBEAT_SEC,
+        vnodes: int = settings.SHARD_VNODES,
+        key_mode: str = settings.SHARD_KEY,
+        **kwargs,
+    ):
+        super().__init__(dispatch, **kwargs)
+        self.membership = membership
+        self.node_id = membership.node_id
+        self.heartbeat_sec = heartbeat_sec
+        self.vnodes = vnodes
+        self.key_mode = key_mode
+        self.ring = HashRing((), vnodes)
+        self._last_heartbeat = 0.0
+        self._pubsub = None
+
+    def owns(self, monitor_id: str, url: str | None = None) -> bool:
+        return self.ring.node_for(shard_key(monitor_id, url, self.key_mode)) == self.node_id
+
+    def housekeeping(self):
+        now = time.time()
+        if now - self._last_heartbeat < self.heartbeat_sec:
+            return
+        members = self.membership.heartbeat(now)
+        self._last_heartbeat = now
+        if self.node_id not in members:
+            members.append(self.node_id)  # pruned after a long stall; re-added on the next beat
+        if tuple(sorted(members)) != self.ring.nodes:
+            previous = len(self.ring)
+            self.ring = HashRing(members, self.vnodes)
+            logger.info(f"🔀 Shard ring changed: {previous} → {len(self.ring)} nodes; rebalancing")
+            self.request_resync()
+
+    def apply_events(self):
+        if self._pubsub is None:
+            self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(EVENTS_CHANNEL)
+        while True:
+            message = self._pubsub.get_message()
+            if message is None:
+                return
+            self.apply_event(json.loads(message["data"]))
+
+    def leave(self):
+        self.membership.leave()
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+class ShardNode:
+    """One probe node: a `ShardScheduler` feeding batches to the local probe engine."""
+
+    def __init__(self, node_id: str | None = None, redis=None, workers: int = settings.SHARD_BATCH_WORKERS):
+        self.node_id = node_id or settings.SHARD_NODE_ID or f"{socket.gethostname()}:{os.getpid()}"
+        membership = Membership(redis or get_redis(), self.node_id, ttl=settings.SHARD_NODE_TTL_SEC)
+        self.scheduler = ShardScheduler(self.dispatch, membership)
+        # A few batches may be in flight while the scheduler thread keeps ticking
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-batch")
+        self._inflight = threading.BoundedSemaphore(workers * 2)
+
+    def dispatch(self, monitor_ids: list[str], scheduled_for: float):
+        from app.tasks.monitor import run_check_batch
+
+        self._inflight.acquire()  # backpressure: tick waits instead of queueing without bound
+        future = self._executor.submit(run_check_batch, monitor_ids, scheduled_for, "shard_check_batch")
+        future.add_done_callback(lambda _: self._inflight.release())
+
+    def run_forever(self):
+        from app.core.probe_engine import get_probe_engine
+        from app.services.metric_sink import get_metric_sink
+
+        get_probe_engine().start()
+        get_metric_sink().start()
+        logger.info(f"Shard node {self.node_id} started")
+        try:
+            self.scheduler.run_forever()
+        finally:
+            self.scheduler.leave()
+            self._executor.shutdown(wait=True)
+            get_probe_engine().stop()
+            get_metric_sink().stop()
+
+
+def main():
+    from app.core.logging_config import configure_logging
+
+    configure_logging()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # leave the ring cleanly on shutdown
+    ShardNode().run_forever()
+
+
+if __name__ == "__main__":
+    main()
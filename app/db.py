@@ -1,21 +1,42 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.core.instrumentation import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
 DATABASE_URL = settings.DATABASE_URL
+# Same database through asyncpg unless an explicit async URL is configured
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or make_url(DATABASE_URL).set(
+    drivername="postgresql+asyncpg"
+).render_as_string(hide_password=False)
 
 engine = create_engine(
     DATABASE_URL,
     echo=settings.DEBUG,
+    poolclass=InstrumentedQueuePool,  # records checkout wait
     pool_pre_ping=True,
     pool_size=10,          # max number of connections
     max_overflow=20,       # allow temporary overflow
     pool_recycle=1800,     # recycle connections every 30 mins
 )
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.DEBUG,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    pool_recycle=1800,
+)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
 
 def get_db():
@@ -26,6 +47,11 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """FastAPI dependency to get an async DB session (asyncpg)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
     """Initialize database tables"""
     import app.models  # ensures all models are imported
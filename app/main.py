@@ -1,5 +1,5 @@
-import logging
-import sys
+import asyncio
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -8,25 +8,18 @@ import structlog
 
 from app.config import settings
 from app.core.celery_app import celery_app
-from app.db import init_db
+from app.core.instrumentation import instrument_app
+from app.core.logging_config import configure_logging
+from app.db import engine, init_db
 from app.core.scheduler import reschedule_all_monitors
-from app.api import routes_auth, routes_celery, routes_monitor, routes_metrics, routes_alert
+from app.services.partitions import manage_partitions
+from app.services.live_status import get_status_hub
+from app.services.ring_buffer import feed_from_status_events, get_ring_buffer
+from app.core.redis_client import get_async_redis
+from app.api import routes_auth, routes_celery, routes_monitor, routes_metrics, routes_alert, routes_agents
 
 # --- Logging Setup ---
-logging.basicConfig(
-    format="%(message)s",
-    stream=sys.stdout,
-    level=settings.LOG_LEVEL,
-)
-
-structlog.configure(
-    processors=[
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.JSONRenderer(),
-    ],
-    logger_factory=structlog.stdlib.LoggerFactory(),
-)
+configure_logging()
 
 logger = structlog.get_logger()
 
@@ -55,28 +48,44 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],  # keyset pagination cursor of GET /metrics
     )
 
     # --- Security Headers Middleware ---
     app.add_middleware(SecureHeadersMiddleware)
 
+    # --- Prometheus ---
+    # Registered before the routers so /metrics/{metric_id} does not shadow it
+    instrument_app(app)
+
     # --- Include Routers ---
     app.include_router(routes_auth.router)
     app.include_router(routes_celery.router)
     app.include_router(routes_monitor.router)
     app.include_router(routes_metrics.router)
     app.include_router(routes_alert.router)
+    app.include_router(routes_agents.router)
 
     # --- Startup/Shutdown events ---
     @app.on_event("startup")
     async def startup_event():
         logger.info("🚀 Application startup", environment=settings.ENVIRONMENT)
         init_db()  # create all tables
+        manage_partitions(engine)  # metrics needs partitions before the first insert
         reschedule_all_monitors()
+        if settings.RING_BUFFER_ENABLED:
+            # Recent metrics for /metrics/recent, fed by the live status events
+            app.state.ring_buffer_feed = asyncio.create_task(
+                feed_from_status_events(get_ring_buffer(), get_async_redis())
+            )
 
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("🛑 Application shutdown")
+        await get_status_hub().close()
+        feed = getattr(app.state, "ring_buffer_feed", None)
+        if feed is not None:
+            feed.cancel()
 
     return app
 
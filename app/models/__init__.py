@@ -3,5 +3,7 @@ from app.models.user import User
 from app.models.monitor import Monitor
 from app.models.metric import Metric
 from app.models.alert import Alert
+from app.models.rollup import MetricRollup
+from app.models.agent_batch import AgentBatch
 
-__all__ = ["User", "Monitor", "Metric", "Alert"]
+__all__ = ["User", "Monitor", "Metric", "Alert", "MetricRollup", "AgentBatch"]
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, TIMESTAMP, text
+
+from app.db import Base
+
+
+class AgentBatch(Base):
+    """
+    An ingested probe-agent upload. Written in the same transaction as the
+    batch's metrics, so a re-sent batch is recognized exactly when its rows
+    were committed.
+    """
+    __tablename__ = "agent_batches"
+
+    region = Column(String(32), primary_key=True)
+    batch_id = Column(String(128), primary_key=True)
+    results = Column(Integer, nullable=False, default=0)  # rows written
+    received_at = Column(TIMESTAMP, nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+
+    def __repr__(self):
+        return f"<AgentBatch(region={self.region}, batch_id={self.batch_id}, results={self.results})>"
@@ -3,6 +3,7 @@ from sqlalchemy import (
     Column,
     ForeignKey,
     Integer,
+    String,
     Boolean,
     TIMESTAMP,
     Text,
@@ -13,6 +14,9 @@ from sqlalchemy import (
 from sqlalchemy.dialects.postgresql import UUID
 from app.db import Base
 
+# Per-phase latency breakdown (ms), one nullable integer column each; see app.core.phase_timing
+PHASE_COLUMNS = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms")
+
 
 class Metric(Base):
     __tablename__ = "metrics"
@@ -26,6 +30,7 @@ class Metric(Base):
     )
     timestamp = Column(
         TIMESTAMP,
+        primary_key=True,  # partition key must be part of the primary key
         nullable=False,
         server_default=text("CURRENT_TIMESTAMP"),
     )
@@ -33,6 +38,12 @@ class Metric(Base):
     status_code = Column(Integer, nullable=True)  # HTTP status code or None
     is_up = Column(Boolean, nullable=False, default=False)
     error = Column(Text, nullable=True)
+    dns_ms = Column(Integer, nullable=True)  # null when the phase didn't happen (e.g. pooled connection)
+    connect_ms = Column(Integer, nullable=True)
+    tls_ms = Column(Integer, nullable=True)
+    ttfb_ms = Column(Integer, nullable=True)  # request sent -> response headers
+    download_ms = Column(Integer, nullable=True)
+    region = Column(String(32), nullable=True)  # probe agent region; null for the central workers
 
     __table_args__ = (
         CheckConstraint(
@@ -40,6 +51,8 @@ class Metric(Base):
             name="check_response_ms_positive"
         ),
         Index("idx_metric_monitor_timestamp", "monitor_id", "timestamp"),
+        # Range-partitioned by time; see app.services.partitions
+        {"postgresql_partition_by": "RANGE (timestamp)"},
     )
 
     def __repr__(self):
@@ -10,7 +10,7 @@ from sqlalchemy import (
     CheckConstraint,
     Index,
 )
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
 from app.db import Base
@@ -31,6 +31,18 @@ class Monitor(Base):
     frequency_sec = Column(Integer, nullable=False, default=60)
     max_latency_ms = Column(Integer, nullable=True)
     is_active = Column(Boolean, nullable=False, default=True)
+    force_cold_connection = Column(
+        Boolean, nullable=False, default=False, server_default=text("false")
+    )  # skip the connection pool to measure handshake cost
+    alert_threshold = Column(Integer, nullable=True)  # N failed checks ... (default: ALERT_FAILURE_THRESHOLD)
+    alert_window = Column(Integer, nullable=True)  # ... out of the last M (default: ALERT_WINDOW)
+    latency_rule = Column(
+        String(16), nullable=False, default="threshold", server_default="threshold"
+    )  # threshold (max_latency_ms) | baseline (anomaly vs own history) | both
+    probe_type = Column(
+        String(16), nullable=False, default="http", server_default="http"
+    )  # http | tcp | dns | tls_expiry (see app.services.probes)
+    probe_config = Column(JSONB, nullable=True)  # options of the probe type (app.schemas.probe)
     user = relationship("User", back_populates="monitors")
     last_checked_at = Column(TIMESTAMP, nullable=True)
     celery_task_id = Column(String, nullable=True, server_default=None,)  # store scheduled Celery task ID
@@ -46,6 +58,15 @@ class Monitor(Base):
 
     __table_args__ = (
         CheckConstraint("frequency_sec > 0", name="check_frequency_positive"),
+        CheckConstraint(
+            "alert_window IS NULL OR alert_window BETWEEN 1 AND 64", name="check_alert_window_range"
+        ),
+        CheckConstraint(
+            "latency_rule IN ('threshold', 'baseline', 'both')", name="check_latency_rule"
+        ),
+        CheckConstraint(
+            "probe_type IN ('http', 'tcp', 'dns', 'tls_expiry')", name="check_probe_type"
+        ),
         Index("idx_monitor_active", "is_active"),
     )
 
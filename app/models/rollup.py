@@ -0,0 +1,39 @@
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    BigInteger,
+    TIMESTAMP,
+    LargeBinary,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+
+from app.db import Base
+
+
+class MetricRollup(Base):
+    """Per-monitor aggregate of metrics over a fixed time bucket (1m, 1h or 1d)."""
+    __tablename__ = "metric_rollups"
+
+    monitor_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("monitors.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    bucket_seconds = Column(Integer, primary_key=True)  # 60 | 3600 | 86400
+    bucket_start = Column(TIMESTAMP, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    up_count = Column(Integer, nullable=False, default=0)
+    latency_count = Column(Integer, nullable=False, default=0)  # checks with a response time
+    latency_min = Column(Integer, nullable=True)
+    latency_max = Column(Integer, nullable=True)
+    latency_sum = Column(BigInteger, nullable=False, default=0)
+    latency_sketch = Column(LargeBinary, nullable=True)  # serialized LatencySketch
+    phase_sum = Column(ARRAY(BigInteger), nullable=True)  # per phase, in PHASE_COLUMNS order
+    phase_count = Column(ARRAY(Integer), nullable=True)  # checks that went through each phase
+
+    def __repr__(self):
+        return (
+            f"<MetricRollup(monitor_id={self.monitor_id}, bucket={self.bucket_seconds}s@"
+            f"{self.bucket_start}, count={self.count}, up={self.up_count})>"
+        )
@@ -1,12 +1,12 @@
 # app/schemas/__init__.py
 from app.schemas.user import UserLogin, UserCreate, UserRead, Token
 from app.schemas.monitor import MonitorCreate, MonitorUpdate, MonitorRead
-from app.schemas.metric import MetricRead
+from app.schemas.metric import MetricRead, MetricSummary
 from app.schemas.alert import AlertRead
 
 __all__ = [
     "UserLogin", "UserCreate", "UserRead", "Token",
     "MonitorCreate", "MonitorUpdate", "MonitorRead",
-    "MetricRead",
+    "MetricRead", "MetricSummary",
     "AlertRead"
 ]
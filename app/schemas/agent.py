@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field
+from uuid import UUID
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Region names double as a metric label: short, lowercase, no spaces
+REGION_PATTERN = r"^[a-z0-9][a-z0-9-]{0,31}$"
+CENTRAL_REGION = "central"  # the workers' checks (region NULL); reserved
+
+
+class AgentMonitor(BaseModel):
+    """What a probe agent needs to check a monitor."""
+    id: UUID
+    url: str
+    frequency_sec: int
+    probe_type: str = "http"
+    probe_config: Optional[Dict[str, Any]] = None
+    force_cold_connection: bool = False
+
+    class Config:
+        from_attributes = True
+
+
+class AgentAssignment(BaseModel):
+    region: str
+    monitors: List[AgentMonitor]
+
+
+class AgentResult(BaseModel):
+    """One check run by a probe agent (a `metrics` row without id and region)."""
+    monitor_id: UUID
+    timestamp: datetime
+    status_code: Optional[int] = Field(None, ge=100, le=599)
+    is_up: bool
+    response_ms: Optional[int] = Field(None, ge=0)
+    error: Optional[str] = None
+    dns_ms: Optional[int] = Field(None, ge=0)
+    connect_ms: Optional[int] = Field(None, ge=0)
+    tls_ms: Optional[int] = Field(None, ge=0)
+    ttfb_ms: Optional[int] = Field(None, ge=0)
+    download_ms: Optional[int] = Field(None, ge=0)
+
+
+class AgentUpload(BaseModel):
+    results: List[AgentResult]
+
+
+class IngestResult(BaseModel):
+    accepted: int
+    dropped: int = 0  # unknown monitors or timestamps outside the retention window / clock skew
+    duplicate: bool = False  # batch already ingested; nothing was written
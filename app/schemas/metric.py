@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class MetricRead(BaseModel):
@@ -12,6 +12,39 @@ class MetricRead(BaseModel):
     status_code: Optional[int] = None
     is_up: bool
     error: Optional[str] = None
+    region: Optional[str] = None  # probe agent region; null for the central workers
+    dns_ms: Optional[int] = None
+    connect_ms: Optional[int] = None
+    tls_ms: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    download_ms: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+
+class RecentMetrics(BaseModel):
+    """Recent checks of one monitor as parallel columns, oldest first (compact for sparklines)."""
+    monitor_id: UUID
+    source: str  # "buffer" (in-memory ring buffer) or "db"
+    timestamps_ms: List[int]
+    response_ms: List[Optional[float]]
+    status_code: List[Optional[int]]
+    is_up: List[bool]
+
+
+class MetricSummary(BaseModel):
+    """Uptime and latency percentiles for a monitor over a time range."""
+    monitor_id: UUID
+    start: datetime
+    end: datetime
+    checks: int
+    up_checks: int
+    uptime_pct: Optional[float] = None
+    latency_avg_ms: Optional[float] = None
+    latency_min_ms: Optional[int] = None
+    latency_max_ms: Optional[int] = None
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
+    phase_avg_ms: Dict[str, Optional[float]] = {}  # dns/connect/tls/ttfb/download, over checks that had the phase
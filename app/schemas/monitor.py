@@ -1,7 +1,11 @@
-from pydantic import BaseModel, HttpUrl, Field, field_serializer, validator
+from pydantic import AnyUrl, BaseModel, Field, field_serializer, model_validator, validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
+
+from app.schemas.probe import validate_probe
+
+LatencyRule = Literal["threshold", "baseline", "both"]
 
 
 class MonitorBase(BaseModel):
@@ -9,9 +13,9 @@ class MonitorBase(BaseModel):
         ..., min_length=3, max_length=255,
         description="Friendly name for the monitor"
     )
-    url: HttpUrl = Field(
+    url: AnyUrl = Field(
         ..., max_length=2048,
-        description="The URL to be monitored"
+        description="The target: http(s):// for HTTP checks, tcp://host:port, dns://host, or https:// / tls://host:port for certificate expiry"
     )
     frequency_sec: int = Field(
         ..., gt=0,
@@ -22,12 +26,37 @@ class MonitorBase(BaseModel):
         description="Optional max response time (ms) before marking as slow"
     )
     is_active: Optional[bool] = None
+    force_cold_connection: bool = Field(
+        False,
+        description="Open a fresh connection for every check to include DNS/TCP/TLS handshake time"
+    )
+    alert_threshold: Optional[int] = Field(
+        None, gt=0, le=64,
+        description="Failed checks within the alert window that mark the monitor DOWN"
+    )
+    alert_window: Optional[int] = Field(
+        None, gt=0, le=64,
+        description="Number of recent checks the alert threshold is counted over"
+    )
+    latency_rule: LatencyRule = Field(
+        "threshold",
+        description="Latency alerting: fixed max_latency_ms, anomalies against the monitor's own baseline, or both"
+    )
+    probe_type: str = Field("http", description="http, tcp, dns or tls_expiry")
+    probe_config: Optional[Dict[str, Any]] = Field(
+        None, description="Options of the probe type (method, headers, expected_status, keyword, json_path, ...)"
+    )
 
-    # Automatically convert HttpUrl to str before exporting
+    # Automatically convert the URL to str before exporting
     @field_serializer("url")
-    def serialize_url(self, url: HttpUrl, _info):
+    def serialize_url(self, url: AnyUrl, _info):
         return str(url)
 
+    @model_validator(mode="after")
+    def check_probe(self):
+        self.probe_config = validate_probe(self.probe_type, str(self.url), self.probe_config)
+        return self
+
 
 class MonitorCreate(MonitorBase):
     """Schema for creating a new monitor."""
@@ -37,16 +66,92 @@ class MonitorCreate(MonitorBase):
 class MonitorUpdate(BaseModel):
     """Schema for partial updates."""
     name: Optional[str] = Field(None, min_length=3, max_length=255)
-    url: Optional[HttpUrl] = Field(None, max_length=2048)
+    url: Optional[AnyUrl] = Field(None, max_length=2048)
     frequency_sec: Optional[int] = Field(None, gt=0)
     max_latency_ms: Optional[int] = Field(None, gt=0)
     is_active: Optional[bool] = None
+    force_cold_connection: Optional[bool] = None
+    alert_threshold: Optional[int] = Field(None, gt=0, le=64)
+    alert_window: Optional[int] = Field(None, gt=0, le=64)
+    latency_rule: Optional[LatencyRule] = None
+    probe_type: Optional[str] = None
+    probe_config: Optional[Dict[str, Any]] = None
 
-    # Automatically convert HttpUrl to str before exporting
+    # Automatically convert the URL to str before exporting
     @field_serializer("url")
-    def serialize_url(self, url: HttpUrl, _info):
+    def serialize_url(self, url: AnyUrl, _info):
         return str(url)
 
+    @model_validator(mode="after")
+    def check_probe(self):
+        if self.probe_type is not None:
+            url = str(self.url) if self.url is not None else None
+            self.probe_config = validate_probe(self.probe_type, url, self.probe_config)
+        elif self.probe_config is not None:
+            raise ValueError("probe_config can only be changed together with probe_type")
+        return self
+
+
+class MonitorBulkUpdate(MonitorUpdate):
+    """One item of a bulk update: the monitor id plus the fields to change."""
+    id: UUID
+
+
+class MonitorBulkItems(BaseModel):
+    """
+    Items of a bulk create (`MonitorCreate`) or update (`MonitorBulkUpdate`).
+    Each item is validated on its own, so one bad item doesn't reject the batch.
+    """
+    items: List[Dict[str, Any]] = Field(..., min_length=1)
+
+
+class MonitorBulkIds(BaseModel):
+    """Monitors to delete, pause or resume."""
+    ids: List[UUID] = Field(..., min_length=1)
+
+
+class BulkItemResult(BaseModel):
+    index: int  # position in the request
+    id: Optional[UUID] = None
+    status: Literal["created", "updated", "deleted", "paused", "resumed", "invalid", "not_found"]
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+class MonitorStatus(BaseModel):
+    """Current status of a monitor, for dashboards."""
+    monitor_id: UUID
+    name: str
+    url: str
+    is_active: bool
+    is_up: Optional[bool] = None  # None until the first check
+    status_code: Optional[int] = None
+    response_ms: Optional[int] = None
+    error: Optional[str] = None
+    last_checked_at: Optional[datetime] = None
+    up_streak: Optional[int] = None  # consecutive up checks (cached statuses only)
+    down_streak: Optional[int] = None
+    cached: bool = False  # served from the Redis status cache rather than the DB
+
+
+class LatencyAnomaly(BaseModel):
+    """Latency of a monitor's recent window compared with its own baseline."""
+    monitor_id: UUID
+    is_anomaly: bool
+    recent_ms: Optional[float] = None
+    ewma_ms: Optional[float] = None
+    baseline_p50_ms: Optional[float] = None
+    baseline_p95_ms: Optional[float] = None
+    zscore: Optional[float] = None
+    samples: int  # baseline buckets with data
+    change_point_at: Optional[datetime] = None  # start of a significant latency shift, if any
+    change_shift_ms: Optional[float] = None
+
 
 class MonitorRead(MonitorBase):
     """Schema for API responses."""
@@ -68,6 +173,10 @@ class MonitorRead(MonitorBase):
                 "frequency_sec": 60,
                 "max_latency_ms": 500,
                 "is_active": True,
+                "force_cold_connection": False,
+                "alert_threshold": 3,
+                "alert_window": 5,
+                "latency_rule": "threshold",
                 "created_at": "2025-09-10T10:00:00Z",
                 "updated_at": "2025-09-10T10:30:00Z",
             }
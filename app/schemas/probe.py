@@ -0,0 +1,93 @@
+import re
+from urllib.parse import urlsplit
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, field_validator
+
+_STATUS_CLASS = re.compile(r"^[1-5]xx$")
+_JSON_PATH = re.compile(r"^\$((\.[A-Za-z_][\w-]*)|(\[(\d+|\*|'[^']*')\]))*$")
+
+
+class HttpProbeConfig(BaseModel):
+    """HTTP(S) request; the response body is only read when an assertion needs it."""
+    method: Literal["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"] = "GET"
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[str] = Field(None, max_length=65_536, description="Request body, sent as-is")
+    expected_status: List[Union[int, str]] = Field(
+        default_factory=lambda: [200],
+        description='Status codes that count as up; classes like "2xx" are allowed',
+    )
+    keyword: Optional[str] = Field(None, min_length=1, max_length=1024, description="Text the body must contain")
+    json_path: Optional[str] = Field(
+        None, max_length=512,
+        description="JSONPath ($.a.b, $.items[0], $.items[*].id, $['key']) that must match in the JSON body",
+    )
+    json_equals: Optional[Any] = Field(None, description="Value the first json_path match must equal")
+    max_body_bytes: int = Field(
+        10 * 2**20, gt=0, description="Stop reading the body (and fail pending assertions) after this many bytes"
+    )
+
+    @field_validator("expected_status")
+    @classmethod
+    def check_status(cls, value):
+        for code in value:
+            if isinstance(code, int) and not 100 <= code <= 599:
+                raise ValueError(f"{code} is not an HTTP status code")
+            if isinstance(code, str) and not _STATUS_CLASS.match(code):
+                raise ValueError(f'{code!r} is not a status class like "2xx"')
+        return value
+
+    @field_validator("json_path")
+    @classmethod
+    def check_json_path(cls, value):
+        if value is not None and not _JSON_PATH.match(value):
+            raise ValueError("Unsupported JSONPath: use $, .key, ['key'], [index] and [*]")
+        return value
+
+
+class TcpProbeConfig(BaseModel):
+    """Plain TCP connect to the target's host and port."""
+    pass
+
+
+class DnsProbeConfig(BaseModel):
+    """Resolve the target's host name."""
+    record_type: Literal["A", "AAAA", "CNAME", "MX", "NS", "TXT"] = "A"
+    expected: List[str] = Field(default_factory=list, description="Values that must all be in the answer")
+
+
+class TlsExpiryProbeConfig(BaseModel):
+    """TLS handshake with the target; down when the certificate is invalid or about to expire."""
+    min_days_valid: int = Field(14, ge=0, le=365)
+
+
+# Config model and accepted target URL schemes of each probe type
+PROBE_CONFIGS: Dict[str, type[BaseModel]] = {
+    "http": HttpProbeConfig,
+    "tcp": TcpProbeConfig,
+    "dns": DnsProbeConfig,
+    "tls_expiry": TlsExpiryProbeConfig,
+}
+PROBE_SCHEMES: Dict[str, tuple[str, ...]] = {
+    "http": ("http", "https"),
+    "tcp": ("tcp",),
+    "dns": ("dns",),
+    "tls_expiry": ("https", "tls"),
+}
+
+
+def validate_probe(probe_type: str, url: Optional[str], config: Optional[dict]) -> Optional[dict]:
+    """Check a probe type's target URL and config; returns the normalized config."""
+    if probe_type not in PROBE_CONFIGS:
+        raise ValueError(f"Unknown probe type {probe_type!r} (one of {', '.join(PROBE_CONFIGS)})")
+    if url is not None:
+        target = urlsplit(url)
+        if target.scheme not in PROBE_SCHEMES[probe_type]:
+            raise ValueError(
+                f"A {probe_type} probe needs a {' or '.join(s + '://' for s in PROBE_SCHEMES[probe_type])} URL"
+            )
+        if probe_type == "tcp" and target.port is None:
+            raise ValueError("A tcp probe needs a port (tcp://host:port)")
+    if config is None:
+        return None
+    return PROBE_CONFIGS[probe_type].model_validate(config).model_dump(exclude_defaults=True)
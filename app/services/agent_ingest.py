@@ -0,0 +1,134 @@
+"""
+Server side of the probe agents (see app.agent).
+
+Agents upload their buffered results as gzip-compressed JSON batches.
+Every batch carries an id that stays the same when the agent re-sends
+it after a lost response. Results are written straight to `metrics`
+(tagged with the agent's region) in one transaction together with the
+batch id in `agent_batches`, before the upload is acknowledged, since
+the agent deletes its local copy on a 2xx. A batch id is therefore
+known exactly when its rows are stored: a re-send is acknowledged
+without writing twice, and a failed write leaves nothing behind that
+would make the retry look like a duplicate.
+
+Regional results are kept out of the rollups, the status cache and the
+alert state: uptime summaries, anomaly baselines and alerts stay on the
+central workers' checks, and the regions are compared on the raw
+metrics (`GET /metrics?region=...`).
+"""
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from pydantic import TypeAdapter
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.agent_batch import AgentBatch
+from app.models.metric import Metric
+from app.schemas.agent import AgentResult
+
+logger = logging.getLogger(__name__)
+
+_RESULTS = TypeAdapter(list[AgentResult])
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def decode_upload(body: bytes, content_encoding: str | None, max_bytes: int) -> list[AgentResult]:
+    """
+    Decompress (gzip or identity) and validate an upload body
+    (`{"results": [...]}`). Decompression stops at `max_bytes`, so a
+    small body cannot expand into an unbounded one.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "gzip":
+        inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(body, max_bytes + 1)
+        except zlib.error as exc:
+            raise ValueError(f"Invalid gzip body: {exc}") from exc
+        if inflater.unconsumed_tail:
+            raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes uncompressed")
+    elif encoding != "identity":
+        raise ValueError(f"Unsupported Content-Encoding {content_encoding!r} (use gzip)")
+    if len(body) > max_bytes:
+        raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes uncompressed")
+
+    try:
+        payload = json.loads(body)
+    except ValueError as exc:
+        raise ValueError(f"Invalid JSON body: {exc}") from exc
+    if not isinstance(payload, dict) or "results" not in payload:
+        raise ValueError('Body must be a JSON object with a "results" list')
+    return _RESULTS.validate_python(payload["results"])
+
+
+def to_rows(
+    results: list[AgentResult],
+    region: str,
+    known_ids: set,
+    retention_days: int,
+    max_skew_sec: float,
+    now: datetime | None = None,
+) -> list[dict]:
+    """
+    `metrics` rows for the results of known monitors with a timestamp
+    inside the retention window and not ahead of `now` by more than the
+    allowed clock skew. Timestamps are stored as naive UTC.
+    """
+    now = now or datetime.utcnow()
+    oldest = now - timedelta(days=retention_days) if retention_days else None
+    newest = now + timedelta(seconds=max_skew_sec)
+    rows = []
+    for result in results:
+        timestamp = result.timestamp
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        if result.monitor_id not in known_ids or timestamp > newest or (oldest and timestamp < oldest):
+            continue
+        rows.append({**result.model_dump(), "timestamp": timestamp, "region": region})
+    return rows
+
+
+def write_batch(rows: list[dict], region: str, batch_id: str, session_factory=SessionLocal) -> bool:
+    """
+    Record the batch id and write its `metrics` rows in one transaction.
+    Returns False, writing nothing, if the batch was already ingested. A
+    concurrent re-send of the same batch waits on the first one's insert
+    and then sees it as a duplicate (or goes ahead if it rolled back).
+    """
+    db = session_factory()
+    try:
+        recorded = db.execute(
+            pg_insert(AgentBatch)
+            .values(region=region, batch_id=batch_id, results=len(rows))
+            .on_conflict_do_nothing()
+            .returning(AgentBatch.batch_id)
+        ).first()
+        if recorded is None:
+            db.rollback()
+            return False
+        if rows:
+            db.execute(insert(Metric), rows)
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def prune_batches(db: Session, retention_sec: int) -> int:
+    """Forget batch ids older than `retention_sec`; later re-sends of those are written again."""
+    result = db.execute(
+        delete(AgentBatch).where(AgentBatch.received_at < datetime.utcnow() - timedelta(seconds=retention_sec))
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,294 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+UP, DEGRADED, DOWN = "UP", "DEGRADED", "DOWN"
+STATES = (UP, DEGRADED, DOWN)
+
+# Check outcomes
+OK, SLOW, FAIL = 0, 1, 2
+
+# Alert kinds
+ALERT_DOWN = "down"
+ALERT_DEGRADED = "degraded"
+ALERT_RECOVERED = "recovered"
+ALERT_FLAPPING = "flapping"
+ALERT_FLAP_END = "flap_end"
+ALERT_REMINDER = "reminder"
+ALERT_ANOMALY = "anomaly"  # raised by the latency analytics task, not the state machine
+
+HISTORY_BITS = 64
+_HISTORY_MASK = (1 << HISTORY_BITS) - 1
+
+STATE_KEY = "alerts:state"
+
+
+def classify(monitor, result) -> int:
+    """OK, SLOW (up but over max_latency_ms) or FAIL for one probe result."""
+    if not result.is_up:
+        return FAIL
+    if getattr(monitor, "latency_rule", "threshold") == "baseline":
+        return OK  # latency is judged by the anomaly task instead
+    if monitor.max_latency_ms and result.response_ms and result.response_ms > monitor.max_latency_ms:
+        return SLOW
+    return OK
+
+
+@dataclass(frozen=True)
+class AlertPolicy:
+    threshold: int = 3  # bad checks ...
+    window: int = 5  # ... out of the last `window` checks
+    recovery: int = 2  # consecutive OK checks before going back UP
+    flap_window: int = 20
+    flap_high: float = 0.5  # share of up/down changes in the flap window that starts flapping
+    flap_low: float = 0.25  # ... and that ends it
+    reminder_sec: float = 3600  # 0 disables reminders
+
+    @classmethod
+    def from_settings(cls) -> "AlertPolicy":
+        return cls(
+            threshold=settings.ALERT_FAILURE_THRESHOLD,
+            window=settings.ALERT_WINDOW,
+            recovery=settings.ALERT_RECOVERY_CHECKS,
+            flap_window=settings.ALERT_FLAP_WINDOW,
+            flap_high=settings.ALERT_FLAP_HIGH,
+            flap_low=settings.ALERT_FLAP_LOW,
+            reminder_sec=settings.ALERT_REMINDER_SEC,
+        )
+
+    def for_monitor(self, monitor) -> "AlertPolicy":
+        """Apply a monitor's own N-of-M overrides, if it has any."""
+        threshold = getattr(monitor, "alert_threshold", None) or self.threshold
+        window = getattr(monitor, "alert_window", None) or self.window
+        if (threshold, window) == (self.threshold, self.window):
+            return self
+        window = min(max(window, threshold), HISTORY_BITS)
+        return AlertPolicy(
+            threshold, window, self.recovery, self.flap_window,
+            self.flap_high, self.flap_low, self.reminder_sec,
+        )
+
+
+@dataclass
+class AlertEvent:
+    kind: str
+    state: str
+    previous: str
+
+
+@dataclass
+class MonitorState:
+    """
+    Alerting state of one monitor, kept small enough to live in a Redis hash.
+
+    The recent check history is stored as bitmasks (bit 0 = newest check),
+    so N-of-M windows and flap ratios are just popcounts.
+    """
+    state: str = UP
+    notified: str = UP  # last state an alert was sent for
+    fail_bits: int = 0
+    slow_bits: int = 0
+    change_bits: int = 0  # up/down changed compared to the previous check
+    checks: int = 0
+    flapping: bool = False
+    since: int = 0
+    last_alert: int = 0
+
+    def encode(self) -> str:
+        return "|".join((
+            str(STATES.index(self.state)), str(STATES.index(self.notified)),
+            f"{self.fail_bits:x}", f"{self.slow_bits:x}", f"{self.change_bits:x}",
+            str(self.checks), "1" if self.flapping else "0",
+            str(self.since), str(self.last_alert),
+        ))
+
+    @classmethod
+    def decode(cls, raw: Optional[str]) -> "MonitorState":
+        if not raw:
+            return cls()
+        state, notified, fail, slow, change, checks, flapping, since, last_alert = raw.split("|")
+        return cls(
+            state=STATES[int(state)],
+            notified=STATES[int(notified)],
+            fail_bits=int(fail, 16),
+            slow_bits=int(slow, 16),
+            change_bits=int(change, 16),
+            checks=int(checks),
+            flapping=flapping == "1",
+            since=int(since),
+            last_alert=int(last_alert),
+        )
+
+    def advance(self, outcome: int, policy: AlertPolicy, now: float) -> list[AlertEvent]:
+        """Record one check outcome and return the alerts it should raise."""
+        now = int(now)
+        failed = outcome == FAIL
+        changed = self.checks > 0 and bool(self.fail_bits & 1) != failed
+
+        self.fail_bits = ((self.fail_bits << 1) | failed) & _HISTORY_MASK
+        self.slow_bits = ((self.slow_bits << 1) | (outcome == SLOW)) & _HISTORY_MASK
+        self.change_bits = ((self.change_bits << 1) | changed) & _HISTORY_MASK
+        self.checks = min(self.checks + 1, HISTORY_BITS)
+
+        window = (1 << policy.window) - 1
+        bad_bits = self.fail_bits | self.slow_bits
+        recent = (1 << policy.recovery) - 1
+
+        if (self.fail_bits & window).bit_count() >= policy.threshold:
+            new_state = DOWN
+        elif (bad_bits & window).bit_count() >= policy.threshold:
+            new_state = DEGRADED
+        elif self.checks >= policy.recovery and not bad_bits & recent:
+            new_state = UP
+        else:
+            new_state = self.state  # hysteresis: not bad enough, not yet recovered
+
+        events = []
+        previous = self.state
+        if new_state != self.state:
+            self.state, self.since = new_state, now
+
+        flap_ratio = (self.change_bits & ((1 << policy.flap_window) - 1)).bit_count() / policy.flap_window
+        if not self.flapping and flap_ratio >= policy.flap_high:
+            self.flapping = True
+            events.append(AlertEvent(ALERT_FLAPPING, self.state, previous))
+        elif self.flapping and flap_ratio <= policy.flap_low:
+            self.flapping = False
+            events.append(AlertEvent(ALERT_FLAP_END, self.state, self.notified))
+        elif not self.flapping and self.state != self.notified:
+            kind = {DOWN: ALERT_DOWN, DEGRADED: ALERT_DEGRADED, UP: ALERT_RECOVERED}[self.state]
+            events.append(AlertEvent(kind, self.state, self.notified))
+        elif (
+            not self.flapping
+            and self.state != UP
+            and policy.reminder_sec
+            and now - self.last_alert >= policy.reminder_sec
+        ):
+            events.append(AlertEvent(ALERT_REMINDER, self.state, self.state))
+
+        if events:
+            self.last_alert = now
+            if not self.flapping:
+                self.notified = self.state
+        return events
+
+
+class MemoryStateStore:
+    """Per-process state; fine for a single worker process or tests."""
+
+    def __init__(self):
+        self._states: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load_many(self, monitor_ids: list[str]) -> list[Optional[str]]:
+        with self._lock:
+            return [self._states.get(m) for m in monitor_ids]
+
+    def save_many(self, states: dict[str, str]):
+        with self._lock:
+            self._states.update(states)
+
+    def forget(self, monitor_id: str):
+        self.forget_many([monitor_id])
+
+    def forget_many(self, monitor_ids: list[str]):
+        with self._lock:
+            for monitor_id in monitor_ids:
+                self._states.pop(monitor_id, None)
+
+
+class RedisStateStore:
+    """All monitor states in one Redis hash; one round trip per batch each way."""
+
+    def __init__(self, redis_client, key: str = STATE_KEY):
+        self.redis = redis_client
+        self.key = key
+
+    def load_many(self, monitor_ids: list[str]) -> list[Optional[str]]:
+        return self.redis.hmget(self.key, monitor_ids) if monitor_ids else []
+
+    def save_many(self, states: dict[str, str]):
+        if states:
+            self.redis.hset(self.key, mapping=states)
+
+    def forget(self, monitor_id: str):
+        self.forget_many([monitor_id])
+
+    def forget_many(self, monitor_ids: list[str]):
+        if monitor_ids:
+            self.redis.hdel(self.key, *monitor_ids)
+
+
+class AlertTracker:
+    """
+    Turns probe results into alerts on state transitions only.
+
+    A monitor that stays DOWN raises one alert, then a reminder every
+    `reminder_sec`; a flapping monitor raises one "flapping" alert and
+    one when it settles. No database access is needed to decide.
+    """
+
+    def __init__(self, store, policy: AlertPolicy | None = None):
+        self.store = store
+        self.policy = policy or AlertPolicy()
+
+    def observe(self, pairs: list[tuple], now: float | None = None) -> list[tuple]:
+        """
+        Feed (monitor, result) pairs; returns (monitor, result, AlertEvent)
+        for every alert that should be sent.
+        """
+        if not pairs:
+            return []
+        now = time.time() if now is None else now
+        ids = [str(monitor.id) for monitor, _ in pairs]
+        states = {m: MonitorState.decode(raw) for m, raw in zip(ids, self.store.load_many(ids))}
+
+        alerts = []
+        for monitor_id, (monitor, result) in zip(ids, pairs):
+            state = states[monitor_id]
+            outcome = classify(monitor, result)
+            for event in state.advance(outcome, self.policy.for_monitor(monitor), now):
+                alerts.append((monitor, result, event))
+
+        self.store.save_many({m: s.encode() for m, s in states.items()})
+        return alerts
+
+    def forget(self, monitor_id):
+        self.store.forget(str(monitor_id))
+
+    def forget_many(self, monitor_ids):
+        self.store.forget_many([str(m) for m in monitor_ids])
+
+
+@lru_cache()
+def get_alert_tracker() -> AlertTracker:
+    if settings.ALERT_STATE_BACKEND == "redis":
+        from app.core.redis_client import get_redis
+
+        store = RedisStateStore(get_redis())
+    else:
+        store = MemoryStateStore()
+    return AlertTracker(store, AlertPolicy.from_settings())
+
+
+def forget_monitor(monitor_id):
+    """Drop a deleted monitor's alert state."""
+    try:
+        get_alert_tracker().forget(monitor_id)
+    except Exception as e:
+        logger.warning(f"Failed to drop alert state for monitor {monitor_id}: {e}")
+
+
+def forget_monitors(monitor_ids):
+    """Drop the alert state of many deleted monitors in one call."""
+    try:
+        get_alert_tracker().forget_many(monitor_ids)
+    except Exception as e:
+        logger.warning(f"Failed to drop alert state for {len(monitor_ids)} monitors: {e}")
@@ -0,0 +1,308 @@
+"""
+Vectorized latency analytics over many monitors at once.
+
+Metric windows are loaded from the rollups into a dense float32 matrix
+(monitors × time buckets, NaN where a bucket has no data) and every
+statistic is computed across all rows with NumPy: rolling percentiles,
+EWMA, robust z-scores of the recent window against the monitor's own
+baseline, and a single most-likely change-point per monitor.
+"""
+import math
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.rollup import MetricRollup
+from app.services.ring_buffer import get_ring_buffer
+from app.services.rollups import HOUR, MINUTE, floor_bucket
+
+MAD_SCALE = 1.4826  # MAD → standard deviation for normally distributed data
+
+
+# --- Loading ---
+
+def rollup_window_statement(monitor_ids: list, start: datetime, end: datetime, bucket_sec: int):
+    """Rollup rows (monitor_id, bucket_start, latency_sum, latency_count) covering [start, end)."""
+    level = HOUR if bucket_sec % HOUR == 0 else MINUTE
+    return (
+        select(MetricRollup.monitor_id, MetricRollup.bucket_start, MetricRollup.latency_sum, MetricRollup.latency_count)
+        .where(
+            MetricRollup.bucket_seconds == level,
+            MetricRollup.monitor_id.in_(monitor_ids),
+            MetricRollup.bucket_start >= start,
+            MetricRollup.bucket_start < end,
+        )
+    )
+
+
+def matrix_from_arrays(
+    monitor_idx: np.ndarray, bucket_idx: np.ndarray, sums: np.ndarray, counts: np.ndarray, monitors: int, buckets: int
+) -> np.ndarray:
+    """Mean latency per (monitor, bucket); several input rows may fall into one bucket."""
+    keep = (bucket_idx >= 0) & (bucket_idx < buckets)
+    flat = monitor_idx[keep] * buckets + bucket_idx[keep]
+    total = np.bincount(flat, weights=sums[keep], minlength=monitors * buckets)
+    n = np.bincount(flat, weights=counts[keep], minlength=monitors * buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (total / n).astype(np.float32)
+    out[n == 0] = np.nan
+    return out.reshape(monitors, buckets)
+
+
+def latency_matrix(monitor_ids: list, rows, start: datetime, bucket_sec: int, buckets: int) -> np.ndarray:
+    """Matrix for `monitor_ids` (row order) from `rollup_window_statement` rows."""
+    index = {str(m): i for i, m in enumerate(monitor_ids)}
+    rows = [r for r in rows if r.latency_count]
+    if not rows:
+        return np.full((len(monitor_ids), buckets), np.nan, dtype=np.float32)
+    offsets = np.array([r.bucket_start for r in rows], dtype="datetime64[s]") - np.datetime64(start, "s")
+    return matrix_from_arrays(
+        np.fromiter((index[str(r.monitor_id)] for r in rows), dtype=np.int64, count=len(rows)),
+        offsets.astype(np.int64) // bucket_sec,
+        np.fromiter((r.latency_sum for r in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((r.latency_count for r in rows), dtype=np.float64, count=len(rows)),
+        len(monitor_ids),
+        buckets,
+    )
+
+
+# --- Statistics (all vectorized across rows) ---
+
+@contextmanager
+def _all_nan_ok():
+    # All-NaN rows (monitors without data) are expected; they yield NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        yield
+
+
+def nan_percentile(a: np.ndarray, q: float) -> np.ndarray:
+    """
+    `np.nanpercentile(a, q, axis=-1)` (linear interpolation) from a single
+    sort. NumPy's version falls back to a Python-level loop over rows as
+    soon as they contain NaNs, which is most rows here.
+    """
+    a = np.sort(a, axis=-1)  # NaNs sort last
+    n = (~np.isnan(a)).sum(axis=-1, keepdims=True)
+    pos = (n - 1) * (q / 100.0)
+    lo = np.clip(np.floor(pos).astype(np.int64), 0, None)
+    hi = np.clip(np.minimum(lo + 1, n - 1), 0, None)
+    v_lo = np.take_along_axis(a, lo, axis=-1)
+    v_hi = np.take_along_axis(a, hi, axis=-1)
+    out = np.where(n > 0, v_lo + (v_hi - v_lo) * (pos - lo), np.nan)
+    return out[..., 0]
+
+
+def rolling_percentile(x: np.ndarray, window: int, q: float, step: int | None = None) -> np.ndarray:
+    """
+    q-th percentile of each `window`-bucket window, every `step` buckets
+    (default: non-overlapping windows, which keeps memory at O(x)).
+    """
+    step = step or window
+    return nan_percentile(sliding_window_view(x, window, axis=1)[:, ::step], q)
+
+
+def ewma(x: np.ndarray, alpha: float) -> np.ndarray:
+    """Exponentially weighted moving average along time; gaps carry the last value."""
+    out = np.empty_like(x)
+    state = np.full(x.shape[0], np.nan, dtype=x.dtype)
+    for t in range(x.shape[1]):
+        col = x[:, t]
+        has = ~np.isnan(col)
+        blended = alpha * col + (1 - alpha) * state
+        state = np.where(has, np.where(np.isnan(state), col, blended), state)
+        out[:, t] = state
+    return out
+
+
+def robust_zscore(values: np.ndarray, baseline: np.ndarray, floor_ms: float = 1.0) -> np.ndarray:
+    """
+    (value - median) / (1.4826 × MAD) of each row's baseline. The scale is
+    floored at `floor_ms` and 1% of the median so that a perfectly flat
+    baseline does not turn a 1 ms wobble into an anomaly.
+    """
+    median = nan_percentile(baseline, 50)
+    mad = nan_percentile(np.abs(baseline - median[:, None]), 50)
+    scale = np.maximum(MAD_SCALE * mad, np.maximum(0.01 * median, floor_ms))
+    return (values - median) / scale
+
+
+def change_points(x: np.ndarray, min_size: int = 6) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Most likely single mean shift per row (binary segmentation, one step).
+
+    For every split t the score is |mean(after) - mean(before)| scaled by
+    sqrt(n_before × n_after / n) / std, i.e. a two-sample t-like statistic,
+    computed for all splits at once from cumulative sums. Returns (index of
+    the first bucket after the shift, score, shift in ms); -1 / 0 where
+    there is not enough data.
+    """
+    rows = np.arange(x.shape[0])
+    if x.shape[1] < 2:
+        return np.full(x.shape[0], -1), np.zeros(x.shape[0]), np.zeros(x.shape[0])
+
+    valid = ~np.isnan(x)
+    values = np.where(valid, x, 0.0).astype(np.float64)
+    cum_sum = np.cumsum(values, axis=1)[:, :-1]
+    cum_n = np.cumsum(valid, axis=1)[:, :-1].astype(np.float64)
+    total_sum = values.sum(axis=1, keepdims=True)
+    total_n = valid.sum(axis=1, keepdims=True).astype(np.float64)
+
+    with _all_nan_ok(), np.errstate(invalid="ignore", divide="ignore"):
+        before = cum_sum / cum_n
+        after = (total_sum - cum_sum) / (total_n - cum_n)
+        std = np.maximum(np.nanstd(x, axis=1, keepdims=True), 1.0)
+        score = np.abs(after - before) * np.sqrt(cum_n * (total_n - cum_n) / total_n) / std
+    score[(cum_n < min_size) | (total_n - cum_n < min_size) | np.isnan(score)] = -np.inf
+
+    best = np.argmax(score, axis=1)
+    found = np.isfinite(score[rows, best])
+    best_score = np.where(found, score[rows, best], 0.0)
+    shift = np.where(found, after[rows, best] - before[rows, best], 0.0)
+    return np.where(found, best + 1, -1), best_score, shift
+
+
+# --- Detection ---
+
+@dataclass
+class LatencyAnalysis:
+    """Per-monitor statistics, one array element per matrix row."""
+    recent_ms: np.ndarray
+    ewma_ms: np.ndarray
+    baseline_p50_ms: np.ndarray
+    baseline_p95_ms: np.ndarray
+    zscore: np.ndarray
+    samples: np.ndarray
+    change_index: np.ndarray
+    change_score: np.ndarray
+    change_shift_ms: np.ndarray
+    anomalous: np.ndarray
+
+
+def analyze_latency(
+    x: np.ndarray,
+    recent_buckets: int,
+    z_threshold: float = 4.0,
+    min_samples: int = 24,
+    alpha: float = 0.3,
+    change_min_size: int = 6,
+    percentile_window: int = 12,
+    recent_ms: np.ndarray | None = None,
+) -> LatencyAnalysis:
+    """
+    Compare the last `recent_buckets` of every row with the buckets before
+    them. A monitor is anomalous when its recent mean latency has a robust
+    z-score of at least `z_threshold` against its own baseline and is also
+    above the baseline p95 (regressions only; getting faster is fine).
+
+    The baseline p95 is the median of the p95s of `percentile_window`-bucket
+    windows, so one bad hour in the baseline does not mask a regression.
+    `recent_ms` (e.g. from the ring buffer) replaces the recent mean taken
+    from the matrix wherever it is not NaN.
+    """
+    baseline, recent = x[:, :-recent_buckets], x[:, -recent_buckets:]
+    window = max(1, min(percentile_window, baseline.shape[1]))
+    with _all_nan_ok():
+        recent_mean = np.nanmean(recent, axis=1)
+        if recent_ms is not None:
+            recent_mean = np.where(np.isnan(recent_ms), recent_mean, recent_ms)
+        recent_ms = recent_mean
+        p50 = nan_percentile(baseline, 50)
+        p95 = nan_percentile(rolling_percentile(baseline, window, 95), 50)
+    zscore = robust_zscore(recent_ms, baseline)
+    samples = (~np.isnan(baseline)).sum(axis=1)
+    change_index, change_score, change_shift = change_points(x, change_min_size)
+
+    with np.errstate(invalid="ignore"):
+        anomalous = (zscore >= z_threshold) & (recent_ms > p95) & (samples >= min_samples)
+    return LatencyAnalysis(
+        recent_ms=recent_ms,
+        ewma_ms=ewma(x, alpha)[:, -1],
+        baseline_p50_ms=p50,
+        baseline_p95_ms=p95,
+        zscore=zscore,
+        samples=samples,
+        change_index=change_index,
+        change_score=change_score,
+        change_shift_ms=change_shift,
+        anomalous=anomalous,
+    )
+
+
+def _num(value, digits: int = 1):
+    value = float(value)
+    return None if math.isnan(value) or math.isinf(value) else round(value, digits)
+
+
+def anomaly_reports(
+    monitor_ids: list,
+    analysis: LatencyAnalysis,
+    start: datetime,
+    bucket_sec: int,
+    only_anomalies: bool = True,
+    change_threshold: float = 4.0,
+) -> list[dict]:
+    """Plain dicts for the API / alerting (the change-point only when significant)."""
+    rows = np.flatnonzero(analysis.anomalous) if only_anomalies else range(len(monitor_ids))
+    reports = []
+    for i in rows:
+        significant = analysis.change_index[i] >= 0 and analysis.change_score[i] >= change_threshold
+        reports.append({
+            "monitor_id": monitor_ids[i],
+            "is_anomaly": bool(analysis.anomalous[i]),
+            "recent_ms": _num(analysis.recent_ms[i]),
+            "ewma_ms": _num(analysis.ewma_ms[i]),
+            "baseline_p50_ms": _num(analysis.baseline_p50_ms[i]),
+            "baseline_p95_ms": _num(analysis.baseline_p95_ms[i]),
+            "zscore": _num(analysis.zscore[i], 2),
+            "samples": int(analysis.samples[i]),
+            "change_point_at": (
+                start + timedelta(seconds=int(analysis.change_index[i]) * bucket_sec) if significant else None
+            ),
+            "change_shift_ms": _num(analysis.change_shift_ms[i]) if significant else None,
+        })
+    return reports
+
+
+def recent_means_from_buffer(
+    monitor_ids: list, since: datetime, bucket_sec: int, buckets: int, min_per_bucket: int = 1
+) -> np.ndarray:
+    """
+    Mean latency since `since` from this process's ring buffer, for the
+    monitors whose buffer covers the whole window with at least
+    `min_per_bucket` samples in each of the `buckets` buckets (NaN for the
+    others, which keep the rollup mean). Unlike the rollups this includes
+    checks from the current bucket.
+
+    Only meaningful where the buffer sees every check (API processes fed
+    by the status events); a worker's buffer holds its own checks only.
+    """
+    out = np.full(len(monitor_ids), np.nan)
+    if not settings.RING_BUFFER_ENABLED:
+        return out
+    buffer = get_ring_buffer()
+    since_ms = int((since - datetime(1970, 1, 1)).total_seconds() * 1000)
+    for i, monitor_id in enumerate(monitor_ids):
+        if not buffer.covers(monitor_id, since_ms=since_ms):
+            continue
+        samples = buffer.read(monitor_id, since_ms=since_ms)
+        per_bucket = np.bincount((samples.timestamps_ms - since_ms) // (bucket_sec * 1000), minlength=buckets)
+        if per_bucket[:buckets].min() < min_per_bucket:
+            continue
+        if np.any(~np.isnan(samples.response_ms)):
+            out[i] = np.nanmean(samples.response_ms)
+    return out
+
+
+def window_bounds(end: datetime, baseline_hours: float, recent_minutes: float, bucket_sec: int):
+    """(start, end, total buckets, recent buckets) aligned to `bucket_sec`."""
+    aligned_end = floor_bucket(end, bucket_sec)
+    recent = max(1, math.ceil(recent_minutes * 60 / bucket_sec))
+    total = recent + max(1, math.ceil(baseline_hours * 3600 / bucket_sec))
+    return aligned_end - timedelta(seconds=total * bucket_sec), aligned_end, total, recent
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from functools import lru_cache
+from uuid import UUID
+
+from app.config import settings
+from app.models.user import User
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+USER_KEY_PREFIX = "auth:user:"
+
+
+def token_key(token: str) -> str:
+    # Never keep raw bearer tokens as dict keys / in memory dumps
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def user_to_record(user: User) -> dict:
+    return {
+        "id": str(user.id),
+        "email": user.email,
+        "is_active": bool(user.is_active),
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+    }
+
+
+def user_from_record(record: dict) -> User:
+    """Detached User built from a cached record (no password hash is cached)."""
+    return User(
+        id=UUID(record["id"]),
+        email=record["email"],
+        is_active=record["is_active"],
+        created_at=datetime.fromisoformat(record["created_at"]) if record["created_at"] else None,
+    )
+
+
+class AuthCache:
+    """
+    Caches what `get_current_user` needs on every request.
+
+    - Decoded JWT payloads, keyed by a hash of the token, in-process only
+      and never past the token's own `exp`.
+    - User records, keyed by user id, in an in-process LRU with a short
+      TTL and optionally a shared Redis tier behind it.
+
+    `invalidate_user()` drops the local entry and the Redis entry; other
+    API processes stop serving their local copy within the local TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        local_ttl: float = 30.0,
+        redis_ttl: float = 300.0,
+        redis_client=None,
+    ):
+        self.tokens = TTLCache(max_entries, local_ttl)
+        self.users = TTLCache(max_entries, local_ttl)
+        self.redis = redis_client
+        self.redis_ttl = redis_ttl
+
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+        self.invalidations = 0
+
+    # --- tokens ---
+
+    def get_payload(self, token: str) -> dict | None:
+        return self.tokens.get(token_key(token))
+
+    def set_payload(self, token: str, payload: dict):
+        ttl = self.tokens.ttl
+        if payload.get("exp"):
+            ttl = float(payload["exp"]) - time.time()
+        self.tokens.set(token_key(token), payload, ttl)
+
+    # --- users ---
+
+    async def get_user(self, user_id: str) -> User | None:
+        record = self.users.get(user_id)
+        if record is None and self.redis is not None:
+            record = await self._redis_get(user_id)
+            if record is not None:
+                self.users.set(user_id, record)
+        return user_from_record(record) if record is not None else None
+
+    async def set_user(self, user: User):
+        record = user_to_record(user)
+        self.users.set(record["id"], record)
+        if self.redis is not None:
+            try:
+                await self.redis.set(
+                    USER_KEY_PREFIX + record["id"], json.dumps(record), ex=int(self.redis_ttl)
+                )
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"Auth cache: Redis write failed: {e}")
+
+    async def invalidate_user(self, user_id):
+        user_id = str(user_id)
+        self.users.delete(user_id)
+        self.invalidations += 1
+        if self.redis is not None:
+            try:
+                await self.redis.delete(USER_KEY_PREFIX + user_id)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.error(f"Auth cache: failed to invalidate user {user_id} in Redis: {e}")
+
+    async def _redis_get(self, user_id: str) -> dict | None:
+        try:
+            raw = await self.redis.get(USER_KEY_PREFIX + user_id)
+        except Exception as e:
+            # Redis is only a cache; fall through to the database
+            self.redis_errors += 1
+            logger.warning(f"Auth cache: Redis read failed: {e}")
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        return json.loads(raw)
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens.stats(),
+            "users": self.users.stats(),
+            "redis": {
+                "enabled": self.redis is not None,
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "errors": self.redis_errors,
+            },
+            "invalidations": self.invalidations,
+        }
+
+
+@lru_cache()
+def get_auth_cache() -> AuthCache | None:
+    """Process-wide auth cache, or None when AUTH_CACHE_ENABLED is off."""
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    redis_client = None
+    if settings.AUTH_CACHE_USE_REDIS and settings.REDIS_URL:
+        from app.core.redis_client import get_async_redis
+
+        redis_client = get_async_redis()
+    return AuthCache(
+        max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+        local_ttl=settings.AUTH_CACHE_LOCAL_TTL_SEC,
+        redis_ttl=settings.AUTH_CACHE_REDIS_TTL_SEC,
+        redis_client=redis_client,
+    )
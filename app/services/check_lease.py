@@ -0,0 +1,117 @@
+"""
+Single-flight checks: at most one probe per monitor in flight.
+
+Before probing, a batch takes a lease on each monitor (`SET
+probe:lease:<id> <token> NX PX <ttl>`, all in one pipeline) and skips
+the monitors whose lease is held elsewhere: a redelivered task, an
+overlapping batch while shards rebalance, a manual check. The TTL is the
+monitor's probe timeout (its frequency) plus a grace period, so a
+crashed worker only holds a monitor back until then. Leases are released
+with one compare-and-delete script call once the results are recorded.
+
+Batches that arrive after a newer check already ran (see `superseded`)
+are dropped before any lease is taken, which is what keeps a backlog of
+stale batches from re-probing the same monitors.
+"""
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import timezone
+from functools import lru_cache
+
+from app.config import settings
+from app.core.instrumentation import PROBE_SKIPPED
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "probe:lease:"
+
+# Delete every key still holding our token; leases that expired and were
+# taken over by another worker are left alone.
+_RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('get', key) == ARGV[1] then
+        released = released + redis.call('del', key)
+    end
+end
+return released
+"""
+
+
+def lease_key(monitor_id) -> str:
+    return f"{KEY_PREFIX}{monitor_id}"
+
+
+def superseded(monitor, scheduled_for: float | None) -> bool:
+    """Whether the monitor was already checked after this run was scheduled."""
+    if scheduled_for is None or monitor.last_checked_at is None:
+        return False
+    checked = monitor.last_checked_at
+    if checked.tzinfo is None:
+        checked = checked.replace(tzinfo=timezone.utc)
+    return checked.timestamp() >= scheduled_for
+
+
+class CheckLeases:
+    def __init__(self, redis, grace_sec: float = 5.0):
+        self.redis = redis
+        self.grace_sec = grace_sec
+        self._release = redis.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self, monitors: list, token: str) -> list:
+        """Take the leases of these monitors; returns the ones we got."""
+        pipe = self.redis.pipeline(transaction=False)
+        for monitor in monitors:
+            ttl_ms = int((monitor.frequency_sec + self.grace_sec) * 1000)
+            pipe.set(lease_key(monitor.id), token, nx=True, px=ttl_ms)
+        return [m for m, acquired in zip(monitors, pipe.execute()) if acquired]
+
+    def release(self, monitor_ids: list, token: str) -> int:
+        if not monitor_ids:
+            return 0
+        return self._release(keys=[lease_key(m) for m in monitor_ids], args=[token])
+
+
+@lru_cache()
+def get_check_leases() -> CheckLeases:
+    from app.core.redis_client import get_redis
+
+    return CheckLeases(get_redis(), settings.CHECK_LEASE_GRACE_SEC)
+
+
+@contextmanager
+def single_flight(monitors: list, scheduled_for: float | None = None):
+    """
+    Yield the monitors this caller may probe now and release their leases
+    on exit. If Redis is unavailable the checks run without leases.
+    """
+    fresh = [m for m in monitors if not superseded(m, scheduled_for)]
+    if len(fresh) < len(monitors):
+        PROBE_SKIPPED.labels("superseded").inc(len(monitors) - len(fresh))
+        logger.info(f"⏭️ Dropped {len(monitors) - len(fresh)} checks already superseded by a newer run")
+    if not settings.CHECK_LEASE_ENABLED or not fresh:
+        yield fresh
+        return
+
+    token = uuid.uuid4().hex
+    leases = held = None
+    try:
+        leases = get_check_leases()
+        held = leases.acquire(fresh, token)
+    except Exception as exc:
+        logger.warning(f"Check leases unavailable ({exc}); probing {len(fresh)} monitors without them")
+    if held is None:
+        yield fresh
+        return
+
+    if len(held) < len(fresh):
+        PROBE_SKIPPED.labels("in_flight").inc(len(fresh) - len(held))
+        logger.info(f"⏭️ Skipped {len(fresh) - len(held)} monitors with a check already in flight")
+    try:
+        yield held
+    finally:
+        try:
+            leases.release([m.id for m in held], token)
+        except Exception as exc:
+            logger.warning(f"Failed to release {len(held)} check leases (they expire on their own): {exc}")
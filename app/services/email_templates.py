@@ -0,0 +1,174 @@
+import hashlib
+import html
+import re
+import time
+import uuid
+from base64 import encodebytes
+from dataclasses import dataclass
+from email.header import Header
+from email.utils import formatdate
+from pathlib import Path
+
+from app.utils.cache import TTLCache
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+_FIELD_RE = re.compile(r"\{\{\s*(\w+)(\|raw)?\s*\}\}")
+_MAX_LINE = 990  # RFC 5322 caps lines at 998 octets; longer bodies fall back to base64
+
+
+class CompiledTemplate:
+    """
+    A template parsed once into static byte segments and field slots.
+
+    `{{ name }}` is substituted (HTML-escaped for .html templates) and
+    `{{ name|raw }}` is inserted as is. Rendering only encodes the field
+    values; the static segments are pre-encoded and joined as bytes.
+    """
+
+    def __init__(self, source: str, escape: bool = True):
+        parts = _FIELD_RE.split(source)
+        self._static = [p.encode() for p in parts[0::3]]
+        self._slots = list(zip(parts[1::3], (bool(raw) for raw in parts[2::3])))
+        self.escape = escape
+        self.fields = frozenset(name for name, _ in self._slots)
+
+    @classmethod
+    def load(cls, name: str) -> "CompiledTemplate":
+        return cls((TEMPLATE_DIR / name).read_text(encoding="utf-8"), escape=name.endswith(".html"))
+
+    def render(self, values: dict) -> bytes:
+        out = [self._static[0]]
+        for (name, raw), static in zip(self._slots, self._static[1:]):
+            value = values.get(name)
+            value = "" if value is None else str(value)
+            if self.escape and not raw:
+                value = html.escape(value)
+            out.append(value.encode())
+            out.append(static)
+        return b"".join(out)
+
+
+TEMPLATES = {
+    name: CompiledTemplate.load(name)
+    for name in ("alert.html", "alert.txt", "digest.html", "digest_row.html", "digest.txt")
+}
+
+STATE_COLORS = {"DOWN": "#dc2626", "DEGRADED": "#f59e0b", "UP": "#16a34a"}
+STATE_LABELS = {"DOWN": "❌ DOWN", "DEGRADED": "⚠️ Degraded", "UP": "✅ UP"}
+
+
+def _crlf(data: bytes) -> bytes:
+    return data.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+def _mime_part(content_type: str, body: bytes) -> bytes:
+    body = _crlf(body)
+    if max(map(len, body.split(b"\r\n"))) > _MAX_LINE:
+        encoding, body = "base64", _crlf(encodebytes(body))
+    else:
+        encoding = "8bit"
+    return (
+        f'Content-Type: {content_type}; charset="utf-8"\r\n'
+        f"Content-Transfer-Encoding: {encoding}\r\n\r\n"
+    ).encode() + body
+
+
+@dataclass
+class PreparedEmail:
+    """A fully serialized message for one recipient, ready for SMTP sendmail."""
+    sender: str
+    recipient: str
+    data: bytes
+
+
+class RenderedEmail:
+    """
+    Subject and multipart body rendered and serialized once. Addressing
+    it to a recipient only prepends the per-recipient headers, so one
+    alert sent to many people is rendered a single time.
+    """
+
+    def __init__(self, sender: str, subject: str, text: bytes, html_body: bytes):
+        self.sender = sender
+        self.subject = subject
+        boundary = f"=={uuid.uuid4().hex}=="
+        self._headers = (
+            f"From: {sender}\r\n"
+            f"Subject: {Header(subject, 'utf-8').encode()}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+        ).encode()
+        delimiter = f"\r\n--{boundary}\r\n".encode()
+        self._body = (
+            b"\r\n"
+            + delimiter.lstrip(b"\r\n")
+            + _mime_part("text/plain", text)
+            + delimiter
+            + _mime_part("text/html", html_body)
+            + f"\r\n--{boundary}--\r\n".encode()
+        )
+
+    def to(self, recipient: str) -> PreparedEmail:
+        headers = (
+            f"To: {recipient}\r\n"
+            f"Date: {formatdate(time.time(), usegmt=True)}\r\n"
+            f"Message-ID: <{uuid.uuid4().hex}@{self.sender.rpartition('@')[2]}>\r\n"
+        ).encode()
+        return PreparedEmail(self.sender, recipient, self._headers + headers + self._body)
+
+
+def alert_fields(subject: str, alert_data: dict) -> dict:
+    state = alert_data.get("state") or ("DOWN" if not alert_data.get("is_up") else "DEGRADED")
+    return {
+        "subject": subject,
+        "status_color": STATE_COLORS.get(state, "#f59e0b"),
+        "status_text": STATE_LABELS.get(state, state),
+        "monitor_name": alert_data.get("monitor_name"),
+        "url": alert_data.get("url"),
+        "status_code": alert_data.get("status_code") or "N/A",
+        "response_time": alert_data.get("response_time") or "N/A",
+        "timestamp": alert_data.get("timestamp"),
+        "error": alert_data.get("error") or "None",
+        "message": alert_data.get("message") or "An alert was triggered.",
+    }
+
+
+_render_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def _cache_key(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def render_alert(sender: str, subject: str, alert_data: dict) -> RenderedEmail:
+    """Render (or reuse) the alert email for this alert's content."""
+    fields = alert_fields(subject, alert_data)
+    key = _cache_key("alert", sender, sorted(fields.items()))
+    rendered = _render_cache.get(key)
+    if rendered is None:
+        rendered = RenderedEmail(
+            sender, subject, TEMPLATES["alert.txt"].render(fields), TEMPLATES["alert.html"].render(fields)
+        )
+        _render_cache.set(key, rendered)
+    return rendered
+
+
+def render_digest(sender: str, alerts: list[tuple[str, dict]]) -> RenderedEmail:
+    """Render one digest for several (subject, alert_data) pairs."""
+    rows = [alert_fields(subject, data) for subject, data in alerts]
+    values = {
+        "count": len(rows),
+        "rows": b"".join(TEMPLATES["digest_row.html"].render(r) for r in rows).decode(),
+        "lines": "\n".join(f"- [{r['timestamp']}] {r['message']}" for r in rows),
+    }
+    return RenderedEmail(
+        sender,
+        f"🚨 {len(rows)} monitor alerts",
+        TEMPLATES["digest.txt"].render(values),
+        TEMPLATES["digest.html"].render(values),
+    )
+
+
+def render_cache_stats() -> dict:
+    return _render_cache.stats()
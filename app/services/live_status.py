@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "status:events:"
+
+
+def status_channel(user_id) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+class Subscription:
+    """
+    One client's view of a user's status stream.
+
+    Updates are coalesced per monitor: a client that falls behind only
+    ever holds the newest status of each monitor, so its backlog is
+    bounded by the user's monitor count no matter how slowly it reads.
+    `changed` stays set if any coalesced update flipped is_up.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._pending: dict[str, dict] = {}
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, items: list[dict]):
+        for item in items:
+            monitor_id = item["monitor_id"]
+            previous = self._pending.get(monitor_id)
+            if previous is not None:
+                self.coalesced += 1
+                item = {**item, "changed": item.get("changed") or previous.get("changed", False)}
+            self._pending[monitor_id] = item
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> list[dict]:
+        """Wait up to `timeout` for updates; returns them all (possibly none)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        items, self._pending = list(self._pending.values()), {}
+        return items
+
+
+class StatusHub:
+    """
+    Per-process fan-out of status events from Redis pub/sub.
+
+    The probe path publishes each batch once per user on
+    `status:events:<user_id>`. Every API process holds one pub/sub
+    connection, subscribed only to the users that have a stream open
+    there, and hands each message to all of that user's subscriptions.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._subs: dict[str, set[Subscription]] = {}
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, user_id) -> Subscription:
+        user_id = str(user_id)
+        sub = Subscription(user_id)
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            if user_id not in self._subs:
+                self._subs[user_id] = set()
+                await self._pubsub.subscribe(status_channel(user_id))
+            self._subs[user_id].add(sub)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        return sub
+
+    async def unsubscribe(self, sub: Subscription):
+        async with self._lock:
+            subs = self._subs.get(sub.user_id)
+            if subs is None:
+                return
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.user_id]
+                try:
+                    await self._pubsub.unsubscribe(status_channel(sub.user_id))
+                except Exception as exc:
+                    logger.warning(f"Status stream unsubscribe failed: {exc}")
+
+    async def _read(self):
+        while self._subs:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Status stream connection lost: {exc}; resubscribing")
+                await asyncio.sleep(1.0)
+                await self._resubscribe()
+                continue
+            if message is None:
+                continue
+            user_id = message["channel"][len(CHANNEL_PREFIX):]
+            items = json.loads(message["data"])
+            for sub in list(self._subs.get(user_id, ())):
+                sub.push(items)
+
+    async def _resubscribe(self):
+        async with self._lock:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            if self._subs:
+                try:
+                    await self._pubsub.subscribe(*(status_channel(u) for u in self._subs))
+                except Exception as exc:
+                    logger.warning(f"Status stream resubscribe failed: {exc}")
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        self._subs.clear()
+
+
+@lru_cache()
+def get_status_hub() -> StatusHub:
+    from app.core.redis_client import get_async_redis
+
+    return StatusHub(get_async_redis())
+
+
+def sse_event(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+async def stream_status(request, hub: StatusHub, user_id, snapshot: list[dict]):
+    """SSE body: a snapshot, then coalesced `status` events and keep-alives."""
+    sub = await hub.subscribe(user_id)
+    try:
+        yield sse_event("snapshot", snapshot)
+        while not await request.is_disconnected():
+            items = await sub.next_batch(settings.STATUS_STREAM_KEEPALIVE_SEC)
+            if items:
+                yield sse_event("status", items)
+            else:
+                yield b": keep-alive\n\n"
+    finally:
+        await hub.unsubscribe(sub)
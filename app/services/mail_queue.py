@@ -0,0 +1,149 @@
+"""
+Durable alert email queue in Redis.
+
+The alert task only appends the email to `mail:queue` and returns, so it
+is acknowledged as soon as the alert is safe in Redis and never holds a
+worker process while SMTP is slow. A single `send_alert_emails` run then
+claims up to MAIL_BATCH_MAX queued alerts and hands them to the mail
+dispatcher as one batch, which is what lets alerts raised by many tasks
+share pooled SMTP sessions and collapse into per-recipient digests.
+
+Claiming moves the alerts (in one script call) into a list of their own,
+registered in `mail:inflight` with a deadline; the list is deleted once
+the batch was sent. A run that dies mid-send leaves it behind, and the
+first run after the deadline puts those alerts back on the queue, so an
+alert may be sent twice but is not lost. Alerts that fail on a broken
+SMTP connection go back on the queue with their attempt count, up to
+MAIL_MAX_RETRIES.
+"""
+import json
+import logging
+import time
+import uuid
+from functools import lru_cache
+
+from app.config import settings
+from app.core import instrumentation
+from app.services.mail_transport import MailDispatcher, OutgoingAlert
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "mail:queue"
+INFLIGHT_KEY = "mail:inflight"  # sorted set: batch list key -> deadline
+BATCH_PREFIX = "mail:batch:"
+
+# Take up to ARGV[1] alerts off the queue into the batch list and register it
+_CLAIM_SCRIPT = """
+local items = redis.call('lrange', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('ltrim', KEYS[1], #items, -1)
+for i = 1, #items, 1000 do
+    redis.call('rpush', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+end
+redis.call('zadd', KEYS[3], ARGV[2], KEYS[2])
+return items
+"""
+
+# Put an abandoned batch back on the queue; only the caller that unregisters it does
+_REQUEUE_SCRIPT = """
+if redis.call('zrem', KEYS[3], KEYS[1]) == 0 then
+    return 0
+end
+local items = redis.call('lrange', KEYS[1], 0, -1)
+for i = 1, #items, 1000 do
+    redis.call('rpush', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+end
+redis.call('del', KEYS[1])
+return #items
+"""
+
+
+class MailQueue:
+    def __init__(self, redis, claim_timeout_sec: float = 300.0):
+        self.redis = redis
+        self.claim_timeout_sec = claim_timeout_sec
+        self._claim = redis.register_script(_CLAIM_SCRIPT)
+        self._requeue = redis.register_script(_REQUEUE_SCRIPT)
+
+    def __len__(self) -> int:
+        return self.redis.llen(QUEUE_KEY)
+
+    def push(self, email: str, subject: str, alert_data: dict, attempts: int = 0, queued_at: float | None = None):
+        self.redis.rpush(QUEUE_KEY, json.dumps({
+            "email": email,
+            "subject": subject,
+            "alert_data": alert_data,
+            "attempts": attempts,
+            "queued_at": queued_at or time.time(),
+        }, default=str))
+
+    def claim(self, limit: int) -> tuple[str, list[dict]]:
+        """(batch key, alerts) of up to `limit` queued alerts, oldest first."""
+        batch_key = f"{BATCH_PREFIX}{uuid.uuid4().hex}"
+        items = self._claim(
+            keys=[QUEUE_KEY, batch_key, INFLIGHT_KEY], args=[limit, time.time() + self.claim_timeout_sec]
+        )
+        return batch_key, [json.loads(item) for item in items]
+
+    def done(self, batch_key: str):
+        pipe = self.redis.pipeline()
+        pipe.zrem(INFLIGHT_KEY, batch_key)
+        pipe.delete(batch_key)
+        pipe.execute()
+
+    def requeue_expired(self) -> int:
+        """Put the alerts of batches claimed by runs that died back on the queue."""
+        requeued = 0
+        for batch_key in self.redis.zrangebyscore(INFLIGHT_KEY, "-inf", time.time()):
+            requeued += self._requeue(keys=[batch_key, QUEUE_KEY, INFLIGHT_KEY])
+        if requeued:
+            logger.warning(f"📧 Re-queued {requeued} alert emails from an interrupted send")
+        return requeued
+
+
+def send_queued(mail_queue: MailQueue, dispatcher: MailDispatcher, batch_size: int) -> dict:
+    """
+    Send queued alerts batch by batch until the queue is drained. Returns
+    counts of alerts handed to SMTP (sent or refused), retried later and
+    given up on.
+    """
+    mail_queue.requeue_expired()
+    stats = {"processed": 0, "retried": 0, "failed": 0}
+    while True:
+        batch_key, items = mail_queue.claim(batch_size)
+        if not items:
+            return stats
+        now_wall, now_mono = time.time(), time.monotonic()
+        alerts = [
+            OutgoingAlert(
+                item["email"], item["subject"], item["alert_data"], item["attempts"],
+                queued_at=now_mono - (now_wall - item["queued_at"]),  # latency since the task queued it
+            )
+            for item in items
+        ]
+        failed = dispatcher.send(alerts)
+        for alert in failed:
+            alert.attempts += 1
+            if alert.attempts > dispatcher.max_retries:
+                stats["failed"] += 1
+                instrumentation.ALERT_EMAILS.labels("failed").inc()
+                logger.error(f"❌ Giving up on alert email to {alert.email} after {alert.attempts} attempts")
+                continue
+            stats["retried"] += 1
+            mail_queue.push(
+                alert.email, alert.subject, alert.alert_data, alert.attempts,
+                queued_at=now_wall - (now_mono - alert.queued_at),
+            )
+        mail_queue.done(batch_key)
+        stats["processed"] += len(alerts) - len(failed)
+        if len(items) < batch_size or failed:
+            return stats  # failures wait for the next run instead of spinning on a broken server
+
+
+@lru_cache()
+def get_mail_queue() -> MailQueue:
+    from app.core.redis_client import get_redis
+
+    return MailQueue(get_redis(), settings.MAIL_CLAIM_TIMEOUT_SEC)
@@ -0,0 +1,401 @@
+import atexit
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from functools import lru_cache
+from typing import Callable
+
+from app.config import settings
+from app.core import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """
+    Small pool of connected (and, if offered, authenticated) SMTP sessions.
+
+    Connections are reused across messages instead of paying for
+    connect + STARTTLS + AUTH on every send. Idle connections older than
+    `max_idle_sec` are dropped rather than reused, since providers close
+    them on their side; a connection that errors is discarded.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = True,
+        size: int = 2,
+        timeout: float = 30.0,
+        max_idle_sec: float = 60.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.max_idle_sec = max_idle_sec
+        self._idle: queue.LifoQueue = queue.LifoQueue()  # (smtp, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+
+        self.connects = 0
+        self.discards = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.ehlo()
+            if self.starttls:
+                conn.starttls()
+                conn.ehlo()
+            if self.username and self.password and conn.has_extn("auth"):
+                conn.login(self.username, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        self.connects += 1
+        return conn
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used <= self.max_idle_sec:
+                return conn
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; blocks while all `size` connections are in use."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except smtplib.SMTPRecipientsRefused:
+            raise  # per-message problem; the session itself is fine
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
+
+    def _discard(self, conn: smtplib.SMTP):
+        self.discards += 1
+        self._close(conn)
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+@dataclass
+class OutgoingAlert:
+    email: str
+    subject: str
+    alert_data: dict
+    attempts: int = 0
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class MailDispatcher:
+    """
+    Batches alert emails and sends them over an `SMTPPool`.
+
+    `submit()` only queues. A background thread collects everything that
+    arrives within `batch_window` seconds of the first message, groups it
+    by recipient and sends it over the pooled connections. A recipient
+    with `digest_threshold` or more alerts in one window (an incident
+    storm) gets a single digest instead. Messages that fail on a broken
+    connection are retried in a later batch, up to `max_retries` times.
+
+    `send()` runs the same grouping and delivery for a batch the caller
+    already collected (e.g. from the durable queue in `mail_queue`) and
+    hands the failures back instead of re-queueing them in memory.
+    """
+
+    def __init__(
+        self,
+        pool: SMTPPool,
+        build_message: Callable,  # (email, subject, alert_data) -> PreparedEmail | EmailMessage
+        build_digest: Callable,  # (email, list[OutgoingAlert]) -> PreparedEmail | EmailMessage
+        batch_window: float = 2.0,
+        digest_threshold: int = 5,
+        max_queue: int = 10_000,
+        max_retries: int = 3,
+        stats_interval: float = 60.0,
+    ):
+        self.pool = pool
+        self.build_message = build_message
+        self.build_digest = build_digest
+        self.batch_window = batch_window
+        self.digest_threshold = digest_threshold
+        self.max_retries = max_retries
+        self.stats_interval = stats_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="smtp")
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_stats = time.monotonic()
+
+        self.queued = 0
+        self.sent = 0
+        self.alerts_sent = 0  # alerts delivered, counting each one inside a digest
+        self.digests = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.send_seconds = 0.0
+
+    # --- producer side ---
+
+    def submit(self, email: str, subject: str, alert_data: dict, timeout: float = 5.0) -> bool:
+        """Queue one alert email. Returns False if the queue stayed full."""
+        if not self.running:
+            self.start()
+        try:
+            self._queue.put(OutgoingAlert(email, subject, alert_data), timeout=timeout)
+        except queue.Full:
+            self.dropped += 1
+            instrumentation.ALERT_EMAILS.labels("dropped").inc()
+            logger.error(f"📧 Mail queue full ({self._queue.qsize()}); dropped alert for {email}")
+            return False
+        self.queued += 1
+        instrumentation.MAIL_QUEUE_DEPTH.set(self.depth)
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    # --- consumer side ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the dispatcher thread, send whatever is still queued and close the pool."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        while self.depth and self.flush():
+            pass
+        self._executor.shutdown(wait=True)
+        self.pool.close()
+        if self.depth:
+            logger.error(f"📧 Mail dispatcher stopped with {self.depth} unsent alerts")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                self._maybe_log_stats()
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            batch.extend(self._drain())
+            instrumentation.MAIL_QUEUE_DEPTH.set(self.depth)
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                logger.error(f"📧 Mail batch failed: {e}", exc_info=True)
+            self._maybe_log_stats()
+
+    def _drain(self) -> list[OutgoingAlert]:
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def flush(self) -> int:
+        """Send everything queued right now (synchronously). Returns messages sent."""
+        before = self.sent
+        items = self._drain()
+        if items:
+            self._send_batch(items)
+        return self.sent - before
+
+    def send(self, items: list[OutgoingAlert]) -> list[OutgoingAlert]:
+        """
+        Send a batch now, in the caller's thread (digests included). Returns
+        the alerts that failed on a broken connection, for the caller to
+        retry; refused recipients are counted as failed and not returned.
+        """
+        failed: list[OutgoingAlert] = []
+        self._send_batch(items, retry=failed.extend)
+        return failed
+
+    def _send_batch(self, items: list[OutgoingAlert], retry: Callable | None = None):
+        by_recipient: dict[str, list[OutgoingAlert]] = {}
+        for item in items:
+            by_recipient.setdefault(item.email, []).append(item)
+
+        # One unit per email to send: either a single alert or a digest
+        units = []
+        for email, alerts in by_recipient.items():
+            if len(alerts) >= self.digest_threshold:
+                units.append(alerts)
+            else:
+                units.extend([alert] for alert in alerts)
+
+        chunks = [units[i::self.pool.size] for i in range(self.pool.size)]
+        started = time.monotonic()
+        retry = retry or self._retry
+        list(self._executor.map(lambda chunk: self._send_chunk(chunk, retry), [c for c in chunks if c]))
+        self.send_seconds += time.monotonic() - started
+        self.batches += 1
+
+    def _send_chunk(self, units: list[list[OutgoingAlert]], retry: Callable):
+        pending = list(units)
+        try:
+            with self.pool.connection() as conn:
+                while pending:
+                    unit = pending[0]
+                    try:
+                        self._deliver(conn, self._build(unit))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        self.failed += len(unit)
+                        instrumentation.ALERT_EMAILS.labels("failed").inc()
+                        logger.error(f"📧 Recipient refused for {unit[0].email}: {e}")
+                    else:
+                        self.sent += 1
+                        self.alerts_sent += len(unit)
+                        self.digests += len(unit) > 1
+                        self._observe_sent(unit)
+                    pending.pop(0)
+        except Exception as e:
+            logger.warning(f"📧 SMTP connection failed with {len(pending)} emails pending: {e}")
+            for unit in pending:
+                retry(unit)
+
+    @staticmethod
+    def _deliver(conn: smtplib.SMTP, message):
+        if isinstance(message, EmailMessage):
+            conn.send_message(message)
+            return
+        # Pre-serialized bytes (see email_templates.PreparedEmail)
+        options = ("BODY=8BITMIME",) if conn.has_extn("8bitmime") else ()
+        conn.sendmail(message.sender, [message.recipient], message.data, mail_options=options)
+
+    def _build(self, unit: list[OutgoingAlert]):
+        if len(unit) == 1:
+            alert = unit[0]
+            return self.build_message(alert.email, alert.subject, alert.alert_data)
+        return self.build_digest(unit[0].email, unit)
+
+    @staticmethod
+    def _observe_sent(unit: list[OutgoingAlert]):
+        now = time.monotonic()
+        kind = "digest" if len(unit) > 1 else "single"
+        instrumentation.ALERT_EMAILS.labels("sent").inc()
+        for alert in unit:
+            instrumentation.ALERT_SEND_LATENCY.labels(kind).observe(now - alert.queued_at)
+
+    def _retry(self, unit: list[OutgoingAlert]):
+        for alert in unit:
+            alert.attempts += 1
+            if alert.attempts > self.max_retries:
+                self.failed += 1
+                instrumentation.ALERT_EMAILS.labels("failed").inc()
+                logger.error(f"❌ Giving up on alert email to {alert.email} after {alert.attempts} attempts")
+                continue
+            try:
+                self._queue.put_nowait(alert)
+            except queue.Full:
+                self.dropped += 1
+                instrumentation.ALERT_EMAILS.labels("dropped").inc()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "queued": self.queued,
+            "sent": self.sent,
+            "alerts_sent": self.alerts_sent,
+            "digests": self.digests,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "smtp_connects": self.pool.connects,
+            "emails_per_sec": round(self.sent / self.send_seconds, 1) if self.send_seconds else None,
+        }
+
+    def _maybe_log_stats(self):
+        if time.monotonic() - self._last_stats >= self.stats_interval:
+            self._last_stats = time.monotonic()
+            if self.queued:
+                logger.info(f"📧 Mail transport | {self.stats()}")
+
+
+@lru_cache()
+def get_mail_dispatcher() -> MailDispatcher:
+    from app.services.alerts import build_alert_email, build_digest_email
+
+    pool = SMTPPool(
+        settings.SMTP_SERVER,
+        settings.SMTP_PORT,
+        username=settings.SMTP_USERNAME,
+        password=settings.SMTP_PASSWORD,
+        starttls=settings.SMTP_STARTTLS,
+        size=settings.SMTP_POOL_SIZE,
+        timeout=settings.SMTP_TIMEOUT_SEC,
+        max_idle_sec=settings.SMTP_MAX_IDLE_SEC,
+    )
+    dispatcher = MailDispatcher(
+        pool,
+        build_alert_email,
+        build_digest_email,
+        batch_window=settings.MAIL_BATCH_WINDOW_SEC,
+        digest_threshold=settings.MAIL_DIGEST_THRESHOLD,
+        max_queue=settings.MAIL_MAX_QUEUE,
+        max_retries=settings.MAIL_MAX_RETRIES,
+    )
+    atexit.register(dispatcher.stop)
+    return dispatcher
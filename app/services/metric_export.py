@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.metric import PHASE_COLUMNS, Metric
+from app.models.monitor import Monitor
+from app.services.rollups import to_naive_utc
+
+EXPORT_COLUMNS = ("id", "monitor_id", "timestamp", "response_ms", "status_code", "is_up", "error", "region") + PHASE_COLUMNS
+CHUNK_ROWS = 1000
+
+
+def export_statement(user_id: UUID, monitor_id: Optional[UUID], start: Optional[datetime], end: Optional[datetime]):
+    stmt = (
+        select(*(getattr(Metric, c) for c in EXPORT_COLUMNS))
+        .join(Monitor, Monitor.id == Metric.monitor_id)
+        .where(Monitor.user_id == user_id)
+    )
+    if monitor_id:
+        stmt = stmt.where(Metric.monitor_id == monitor_id)
+    if start:
+        stmt = stmt.where(Metric.timestamp >= to_naive_utc(start))
+    if end:
+        stmt = stmt.where(Metric.timestamp < to_naive_utc(end))
+    return stmt.order_by(Metric.timestamp, Metric.id)
+
+
+async def iter_metric_chunks(user_id, monitor_id=None, start=None, end=None) -> AsyncIterator[list]:
+    """
+    Stream metric rows through a server-side cursor, CHUNK_ROWS at a time.
+    Opens its own session because the response outlives the request's.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            export_statement(user_id, monitor_id, start, end),
+            execution_options={"yield_per": CHUNK_ROWS},
+        )
+        async for partition in result.partitions():
+            yield partition
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value) if isinstance(value, UUID) else value
+
+
+async def ndjson_stream(chunks: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        yield "".join(
+            json.dumps({c: _jsonable(v) for c, v in zip(EXPORT_COLUMNS, row)}) + "\n"
+            for row in rows
+        ).encode()
+
+
+async def csv_stream(chunks: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
@@ -0,0 +1,263 @@
+import atexit
+import csv
+import io
+import logging
+import queue
+import threading
+import time
+import uuid
+from functools import lru_cache
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.config import settings
+from app.core import instrumentation
+from app.db import SessionLocal
+from app.models.metric import PHASE_COLUMNS, Metric
+from app.services.rollups import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("id", "monitor_id", "timestamp", "response_ms", "status_code", "is_up", "error", "region") + PHASE_COLUMNS
+
+
+class MetricSink:
+    """
+    Write-behind buffer for Metric rows.
+
+    Probes `put()` plain row dicts; a background thread writes them in
+    multi-row INSERTs (or COPY) once `batch_size` rows are buffered or
+    `flush_interval` seconds have passed. `put()` blocks when the buffer
+    is full, which pushes back on the probe path instead of growing memory.
+
+    A batch the database rejects for its data (constraint violation, bad
+    value) is bisected so the good rows are written and only the bad ones
+    dropped. Other failures are retried with the same batch up to
+    `max_attempts` times, then the batch is dropped, so one bad batch can
+    never stall the sink.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        max_buffer: int = 50_000,
+        use_copy: bool = False,
+        session_factory=SessionLocal,
+        max_attempts: int = 10,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.use_copy = use_copy
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self._queue: queue.Queue = queue.Queue(maxsize=max_buffer)
+        self._retry: list[dict] = []  # rows from a failed flush
+        self._attempts = 0  # failed writes of the batch in `_retry`
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self.rows_written = 0
+        self.flushes = 0
+
+    # --- producer side ---
+
+    def put(self, row: dict, timeout: float | None = None):
+        """Buffer one row; blocks (up to `timeout`) while the buffer is full."""
+        if not self.running:
+            self.start()
+        row.setdefault("id", uuid.uuid4())
+        self._queue.put(row, timeout=timeout)
+
+    def put_many(self, rows: list[dict], timeout: float | None = None) -> int:
+        """
+        Buffer rows with one deadline for the whole call. Returns how many
+        were buffered; fewer than `len(rows)` means the buffer stayed full.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for queued, row in enumerate(rows):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                self.put(row, remaining)
+            except queue.Full:
+                return queued
+        return len(rows)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + len(self._retry)
+
+    # --- consumer side ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metric-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop the flush thread and write everything still buffered."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        while self.depth and self.flush():
+            pass
+        if self.depth:
+            logger.error(f"Metric sink stopped with {self.depth} unwritten rows")
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue.qsize() < self.batch_size and time.monotonic() < deadline:
+                if self._stop.wait(0.05):
+                    break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Metric sink flush failed: {e}", exc_info=True)
+
+    def _drain(self) -> list[dict]:
+        rows, self._retry = self._retry, []
+        if rows:
+            return rows  # retry the failed batch as it was, so attempts count per batch
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def flush(self) -> int:
+        """Write one batch. Returns the number of rows written."""
+        with self._flush_lock:
+            rows = self._drain()
+            instrumentation.SINK_DEPTH.set(self.depth + len(rows))
+            if not rows:
+                return 0
+            started = time.perf_counter()
+            try:
+                self._write(rows)
+                written = len(rows)
+            except Exception as e:
+                instrumentation.SINK_FLUSH_FAILURES.inc()
+                if _is_data_error(e):
+                    logger.warning(f"Database rejected {len(rows)} metrics ({e.__class__.__name__}); isolating bad rows")
+                    written = self._write_isolating(rows)
+                else:
+                    self._fail(rows, e)
+                    return 0
+            if not self._retry:
+                self._attempts = 0
+
+            instrumentation.SINK_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            instrumentation.SINK_FLUSH_ROWS.observe(written)
+            instrumentation.SINK_DEPTH.set(self.depth)
+            self.rows_written += written
+            self.flushes += 1
+            logger.debug(f"Metric sink flushed {written} rows")
+            return written
+
+    def _fail(self, rows: list[dict], exc: Exception):
+        """Keep a batch that failed for a non-data reason for the next flush, up to `max_attempts`."""
+        self._attempts += 1
+        if self._attempts < self.max_attempts:
+            self._retry = rows
+            logger.error(
+                f"Failed to write {len(rows)} metrics (attempt {self._attempts}/{self.max_attempts}), will retry: {exc}"
+            )
+            return
+        self._attempts = 0
+        _drop(rows, "retries_exhausted", exc)
+
+    def _write_isolating(self, rows: list[dict]) -> int:
+        """Bisect a rejected batch: write the good rows, drop the rows rejected on their own."""
+        written = 0
+        pending = [rows]
+        while pending:
+            chunk = pending.pop()
+            try:
+                self._write(chunk)
+                written += len(chunk)
+            except Exception as e:
+                if not _is_data_error(e):
+                    # The database went away meanwhile; retry what is left
+                    self._fail(chunk + [row for rest in pending for row in rest], e)
+                    break
+                if len(chunk) == 1:
+                    _drop(chunk, "invalid", e)
+                else:
+                    mid = len(chunk) // 2
+                    pending += [chunk[mid:], chunk[:mid]]
+        return written
+
+    def _write(self, rows: list[dict]):
+        write_metrics(rows, self.session_factory, self.use_copy)
+
+
+def _is_data_error(exc: Exception) -> bool:
+    """Constraint violations and invalid values: writing the same rows again cannot succeed."""
+    if isinstance(exc, (IntegrityError, DataError)):
+        return True
+    code = getattr(getattr(exc, "orig", exc), "pgcode", None) or ""  # COPY raises psycopg2 errors directly
+    return code[:2] in ("22", "23")
+
+
+def _drop(rows: list[dict], reason: str, exc: Exception):
+    instrumentation.SINK_DROPPED_ROWS.labels(reason).inc(len(rows))
+    sample = {k: rows[0].get(k) for k in ("monitor_id", "timestamp")}
+    logger.error(f"Dropped {len(rows)} metrics ({reason}), e.g. {sample}: {exc}")
+
+
+def write_metrics(rows: list[dict], session_factory=SessionLocal, use_copy: bool = False, rollups: bool = True):
+    """Write metric rows (and, unless `rollups` is False, their rollups) in one transaction."""
+    db = session_factory()
+    try:
+        if use_copy:
+            _copy(db, rows)
+        else:
+            # executemany → batched multi-row INSERT (insertmanyvalues)
+            db.execute(insert(Metric), rows)
+        if rollups and settings.ROLLUPS_ENABLED:
+            apply_rollups(db, rows)  # same transaction as the raw rows
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _copy(db, rows: list[dict]):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([
+            "" if row.get(col) is None else row[col] for col in COLUMNS
+        ])
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY metrics ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf
+    )
+
+
+@lru_cache()
+def get_metric_sink() -> MetricSink:
+    sink = MetricSink(
+        batch_size=settings.METRIC_SINK_BATCH_SIZE,
+        flush_interval=settings.METRIC_SINK_FLUSH_SEC,
+        max_buffer=settings.METRIC_SINK_MAX_BUFFER,
+        use_copy=settings.METRIC_SINK_USE_COPY,
+        max_attempts=settings.METRIC_SINK_MAX_ATTEMPTS,
+    )
+    atexit.register(sink.stop)
+    return sink
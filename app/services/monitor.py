@@ -1,102 +1,184 @@
-import httpx
 import logging
+import queue
 from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
-from app.models.metric import Metric
+from app.config import settings
+from app.core.http_clients import ClientRegistry
+from app.core.instrumentation import SINK_DROPPED_ROWS, observe_probes
+from app.core.profiling import CheckTimer, span
+from app.models.monitor import Monitor
+from app.services import alert_state
+from app.services.alert_state import AlertEvent, get_alert_tracker
+from app.services.metric_sink import get_metric_sink
+from app.services.probes import ProbeResult, probe_monitor
+from app.services.status_cache import record_latest_status
 from app.tasks.alerts import send_alert
 from app.utils.user_monitor_query import get_monitor_with_user
 
 logger = logging.getLogger(__name__)
 
 
-async def check_single_monitor(db: Session, monitor):
-    """
-    Perform health check for a single monitor and store result.
-    Always writes a Metric, even for failed checks.
-    """
-    if not hasattr(monitor, "user"):
-        monitor = get_monitor_with_user(db, monitor.id)
+ALERT_SUBJECTS = {
+    alert_state.ALERT_DOWN: "🚨 Monitor DOWN",
+    alert_state.ALERT_DEGRADED: "⚠️ Monitor DEGRADED",
+    alert_state.ALERT_RECOVERED: "✅ Monitor RECOVERED",
+    alert_state.ALERT_FLAPPING: "🔁 Monitor FLAPPING",
+    alert_state.ALERT_FLAP_END: "🔁 Monitor stopped flapping",
+    alert_state.ALERT_REMINDER: "🔔 Reminder: monitor still {state}",
+    alert_state.ALERT_ANOMALY: "📈 Latency anomaly",
+}
 
-    start_time = datetime.now(timezone.utc)
-    response_time_ms = None
-    status_code = None
-    is_up = False
-    error_message = None
 
-    try:
-        async with httpx.AsyncClient(timeout=monitor.frequency_sec) as client:
-            response = await client.get(monitor.url)
-            response_time_ms = response.elapsed.total_seconds() * 1000
-            status_code = response.status_code
-            is_up = status_code == 200
+def alert_message(monitor, result: ProbeResult, event: AlertEvent) -> str:
+    if event.kind == alert_state.ALERT_RECOVERED:
+        return f"Monitor RECOVERED: {monitor.url} is UP again (was {event.previous})"
+    if event.kind == alert_state.ALERT_FLAPPING:
+        return f"Monitor FLAPPING: {monitor.url} keeps changing state; alerts are paused until it settles"
+    if event.kind == alert_state.ALERT_FLAP_END:
+        return f"Monitor stopped flapping: {monitor.url} is {event.state}"
+    if not result.is_up:
+        return f"Monitor {event.state}: {monitor.url} (Error: {result.error})"
+    return f"Monitor {event.state}: {monitor.url} ({result.response_ms}ms > {monitor.max_latency_ms}ms)"
 
-            if not is_up:
-                error_message = f"Unexpected status code {status_code}"
 
-    except httpx.TimeoutException:
-        error_message = f"Request timed out after {monitor.frequency_sec}s"
-        logger.warning(f"[Monitor {monitor.id}] Timeout: {monitor.url}")
+def trigger_alert(monitor, result: ProbeResult, event: AlertEvent, message: Optional[str] = None):
+    """Queue the alert for a monitor state transition (or reminder)."""
+    logger.warning(
+        f"[Monitor {monitor.id}] Alert {event.kind}: {event.previous} -> {event.state} "
+        f"(status={result.status_code}, response_time={result.response_ms}ms, error={result.error})"
+    )
+    send_alert.delay(
+        {
+            "monitor_id": monitor.id,
+            "monitor_name": monitor.name,
+            "url": monitor.url,
+            "status_code": result.status_code,
+            "response_time": result.response_ms,
+            "is_up": result.is_up,
+            "state": event.state,
+            "event": event.kind,
+            "error": result.error,
+            "timestamp": result.timestamp.strftime("%b %d, %Y — %I:%M %p %Z"),
+            "email": monitor.user.email,
+            "subject": ALERT_SUBJECTS[event.kind].format(state=event.state),
+            "message": message or alert_message(monitor, result, event),
+        }
+    )
 
-    except httpx.ConnectError as exc:
-        error_message = f"Connection failed: {exc!s}"
-        logger.warning(f"[Monitor {monitor.id}] Connection error: {exc}")
 
-    except httpx.RequestError as exc:
-        error_message = f"Request failed: {exc.__class__.__name__} - {exc!s}"
-        logger.warning(f"[Monitor {monitor.id}] Request error: {exc}")
+def trigger_anomaly_alert(monitor, report: dict) -> bool:
+    """
+    Alert on a latency regression found by the analytics task, at most
+    once per ALERT_REMINDER_SEC (or hour) per monitor. Returns True if sent.
+    """
+    from app.core.redis_client import get_redis
 
-    except Exception as exc:
-        error_message = f"Unexpected error: {exc.__class__.__name__} - {exc!s}"
-        logger.error(f"[Monitor {monitor.id}] Unexpected error: {exc}", exc_info=True)
+    ttl = int(settings.ALERT_REMINDER_SEC or 3600)
+    if not get_redis().set(f"alerts:anomaly:{monitor.id}", 1, nx=True, ex=ttl):
+        return False
+
+    result = ProbeResult(
+        monitor_id=monitor.id,
+        timestamp=datetime.now(timezone.utc),
+        is_up=True,
+        response_ms=report["recent_ms"],
+    )
+    message = (
+        f"Latency anomaly: {monitor.url} averaged {report['recent_ms']}ms recently vs a baseline "
+        f"p50 of {report['baseline_p50_ms']}ms / p95 of {report['baseline_p95_ms']}ms (z={report['zscore']})"
+    )
+    if report.get("change_point_at"):
+        message += f"; shift of {report['change_shift_ms']:+}ms since {report['change_point_at']:%b %d, %H:%M} UTC"
+    event = AlertEvent(alert_state.ALERT_ANOMALY, alert_state.DEGRADED, alert_state.UP)
+    trigger_alert(monitor, result, event, message=message)
+    return True
 
-    # Persist metric
+
+def process_alerts(monitors: dict, results: list[ProbeResult]):
+    """Run results through the alert state machine; only transitions are sent."""
     try:
-        metric = Metric(
-            monitor_id=monitor.id,
-            status_code=status_code,
-            is_up=is_up,
-            response_ms=response_time_ms,
-            error=error_message,
-            timestamp=start_time,
-        )
-        db.add(metric)
-        db.commit()
-        logger.info(
-            f"[Monitor {monitor.id}] Metric saved | status={status_code}, "
-            f"is_up={is_up}, response_time={response_time_ms}ms"
+        alerts = get_alert_tracker().observe(
+            [(monitors[r.monitor_id], r) for r in results]
         )
     except Exception as exc:
-        db.rollback()
-        logger.error(f"[Monitor {monitor.id}] Failed to save metric: {exc}")
-        return  # do not trigger alert if metric persistence failed
-
-    # Trigger alert if needed
-    if (not is_up) or (
-        monitor.max_latency_ms
-        and response_time_ms
-        and response_time_ms > monitor.max_latency_ms
-    ):
-        logger.warning(
-            f"[Monitor {monitor.id}] Alert triggered (status={status_code}, "
-            f"response_time={response_time_ms}ms, error={error_message})"
-        )
-        send_alert.delay(
-            {
-                "monitor_id": monitor.id,
-                "monitor_name": monitor.name,
-                "url": monitor.url,
-                "status_code": metric.status_code,
-                "response_time": metric.response_ms,
-                "is_up": metric.is_up,
-                "error": metric.error,
-                "timestamp": metric.timestamp.strftime("%b %d, %Y — %I:%M %p %Z"),
-                "email": monitor.user.email,
-                "subject": "🚨 Monitor DOWN" if not metric.is_up else "⚠️ High Latency",
-                "message": (
-                    f"Monitor DOWN: {monitor.url} (Error: {metric.error})"
-                    if not metric.is_up
-                    else f"Latency Alert: {monitor.url} ({metric.response_ms}ms > {monitor.max_latency_ms}ms)"
-                ),
-            }
+        logger.error(f"Alert state update failed for {len(results)} results: {exc}", exc_info=True)
+        return
+    for monitor, result, event in alerts:
+        trigger_alert(monitor, result, event)
+
+
+def record_probe_results(
+    db: Session, monitors: dict, results: list[ProbeResult], timer: Optional[CheckTimer] = None
+):
+    """
+    Hand a batch of probe results to the metric sink, refresh the
+    dashboard status cache, bump `last_checked_at` in one statement and
+    raise alerts for state changes.
+    `monitors` maps monitor id -> Monitor.
+    """
+    observe_probes(results)
+    with span(timer, "metric_enqueue"):
+        queued = get_metric_sink().put_many(
+            [result.to_row() for result in results],
+            timeout=settings.METRIC_SINK_PUT_TIMEOUT,
         )
+    if queued < len(results):
+        # Keep going: the status cache, last_checked_at and alerts don't depend on the sink
+        SINK_DROPPED_ROWS.labels("buffer_full").inc(len(results) - queued)
+        logger.error(f"Metric sink full: dropped {len(results) - queued} of {len(results)} metrics")
+    with span(timer, "status_cache"):
+        record_latest_status(monitors, results)
+
+    with span(timer, "db_update"):
+        try:
+            db.execute(
+                update(Monitor),
+                [{"id": r.monitor_id, "last_checked_at": r.timestamp} for r in results],
+            )
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.error(f"Failed to update last_checked_at for {len(results)} monitors: {exc}")
+
+    with span(timer, "alerts"):
+        process_alerts(monitors, results)
+
+
+async def check_single_monitor(
+    db: Session,
+    monitor,
+    clients: Optional[ClientRegistry] = None,
+    timer: Optional[CheckTimer] = None,
+):
+    """
+    Perform health check for a single monitor and store result.
+    Always writes a Metric, even for failed checks.
+    """
+    if not hasattr(monitor, "user"):
+        with span(timer, "db_load"):
+            monitor = get_monitor_with_user(db, monitor.id)
+
+    with span(timer, "probe"):
+        result = await probe_monitor(monitor, clients)
+    observe_probes([result])
+
+    # Buffer the metric; the sink writes it with the next batch
+    with span(timer, "metric_enqueue"):
+        try:
+            get_metric_sink().put(result.to_row(), timeout=settings.METRIC_SINK_PUT_TIMEOUT)
+        except queue.Full:
+            SINK_DROPPED_ROWS.labels("buffer_full").inc()
+            logger.error(f"[Monitor {monitor.id}] Metric sink full: dropped this metric")
+    with span(timer, "status_cache"):
+        record_latest_status({monitor.id: monitor}, [result])
+    logger.info(
+        f"[Monitor {monitor.id}] Metric queued | status={result.status_code}, "
+        f"is_up={result.is_up}, response_time={result.response_ms}ms"
+    )
+
+    # Alert only if this check changes the monitor's state
+    with span(timer, "alerts"):
+        process_alerts({monitor.id: monitor}, [result])
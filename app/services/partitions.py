@@ -0,0 +1,115 @@
+import logging
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "metrics"
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def partition_start(moment: datetime, interval: str) -> datetime:
+    """Start of the daily/weekly partition that contains `moment` (naive UTC)."""
+    day = datetime(moment.year, moment.month, moment.day)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())  # weeks start on Monday
+    return day
+
+
+def partition_step(interval: str) -> timedelta:
+    return timedelta(weeks=1) if interval == "week" else timedelta(days=1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT_TABLE}_p{start:%Y%m%d}"
+
+
+def list_partitions(conn) -> list[tuple[str, datetime | None, datetime | None]]:
+    """(name, lower, upper) for every partition of `metrics`; bounds are None for DEFAULT."""
+    rows = conn.execute(text(
+        """
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :parent
+        ORDER BY c.relname
+        """
+    ), {"parent": PARENT_TABLE}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound or "")
+        if match:
+            lower, upper = (datetime.fromisoformat(v) for v in match.groups())
+            partitions.append((name, lower, upper))
+        else:
+            partitions.append((name, None, None))
+    return partitions
+
+
+def ensure_partitions(
+    conn,
+    since: datetime | None = None,
+    ahead: int = settings.METRICS_PARTITIONS_AHEAD,
+    interval: str = settings.METRICS_PARTITION_INTERVAL,
+) -> list[str]:
+    """
+    Create the partitions from `since` (default: now) up to `ahead`
+    intervals into the future. Existing ranges are left alone.
+    """
+    now = datetime.utcnow()
+    step = partition_step(interval)
+    start = partition_start(since or now, interval)
+    end = partition_start(now, interval) + step * (ahead + 1)
+
+    covered = [(lo, hi) for _, lo, hi in list_partitions(conn) if lo is not None]
+    created = []
+    while start < end:
+        upper = start + step
+        if not any(lo < upper and start < hi for lo, hi in covered):
+            name = partition_name(start)
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+                f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{upper.isoformat(sep=' ')}')"
+            ))
+            created.append(name)
+        start = upper
+
+    if created:
+        logger.info(f"Created metric partitions: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(
+    conn, retention_days: int = settings.METRICS_RETENTION_DAYS
+) -> list[str]:
+    """Detach and drop partitions whose whole range is older than the retention window."""
+    if not retention_days:
+        return []
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    dropped = []
+    for name, _, upper in list_partitions(conn):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+            conn.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+
+    if dropped:
+        logger.info(f"Dropped expired metric partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def manage_partitions(engine) -> dict:
+    """Create upcoming partitions and drop expired ones, each in its own transaction."""
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    with engine.begin() as conn:
+        dropped = drop_expired_partitions(conn)
+    return {"created": created, "dropped": dropped}
@@ -0,0 +1,411 @@
+"""
+Probe types.
+
+Every monitor has a `probe_type` and an optional `probe_config` (see the
+models in app.schemas.probe). A probe coroutine fills in the ProbeResult
+of one monitor without touching the database; all types run on the
+worker's probe engine loop and record per-phase timings. A new type is a
+config model in PROBE_CONFIGS plus a function registered here with
+`@register_probe`.
+"""
+import asyncio
+import logging
+import ssl
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+import dns.asyncresolver
+import dns.exception
+import httpx
+import ijson
+
+from app.core.http_clients import ClientRegistry
+from app.core.phase_timing import PhaseTimer, PhaseTimings, resolve
+from app.schemas.probe import PROBE_CONFIGS, DnsProbeConfig, HttpProbeConfig, TlsExpiryProbeConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of a single monitor probe, before it is persisted."""
+    monitor_id: object
+    timestamp: datetime
+    status_code: Optional[int] = None
+    is_up: bool = False
+    response_ms: Optional[float] = None
+    error: Optional[str] = None
+    timings: Optional[PhaseTimings] = None
+
+    def to_row(self) -> dict:
+        """Column values for a `metrics` row, as written by the metric sink."""
+        row = {
+            "monitor_id": self.monitor_id,
+            "status_code": self.status_code,
+            "is_up": self.is_up,
+            "response_ms": round(self.response_ms) if self.response_ms is not None else None,
+            "error": self.error,
+            "timestamp": self.timestamp,
+        }
+        for column, value in (self.timings or PhaseTimings()).as_dict().items():
+            row[column] = round(value) if value is not None else None
+        return row
+
+
+ProbeFunc = Callable[..., Awaitable[None]]  # (monitor, config, clients, result, timer)
+PROBES: dict[str, ProbeFunc] = {}
+
+
+def register_probe(name: str):
+    if name not in PROBE_CONFIGS:
+        raise ValueError(f"Probe type {name!r} has no config model in PROBE_CONFIGS")
+
+    def decorator(func: ProbeFunc) -> ProbeFunc:
+        PROBES[name] = func
+        return func
+    return decorator
+
+
+def _target(url: str, default_port: int) -> tuple[str, int]:
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or default_port
+
+
+# --- HTTP ---
+
+def status_expected(status_code: int, expected: list) -> bool:
+    return any(
+        status_code == code if isinstance(code, int) else status_code // 100 == int(code[0])
+        for code in expected
+    )
+
+
+class KeywordMatcher:
+    """Finds a keyword in a streamed body, including across chunk boundaries."""
+
+    def __init__(self, keyword: str):
+        self.needle = keyword.encode()
+        self.done = False
+        self._tail = b""
+
+    def feed(self, chunk: bytes):
+        data = self._tail + chunk
+        if self.needle in data:
+            self.done = True
+        keep = len(self.needle) - 1
+        self._tail = data[-keep:] if keep else b""
+
+    def close(self):
+        pass
+
+    def failure(self) -> Optional[str]:
+        if self.done:
+            return None
+        return f"Keyword {self.needle.decode()!r} not found in response body"
+
+
+_CONTAINER = object()
+
+# Body left unread after the checks is drained up to this size so the
+# keep-alive connection can go back to the pool; larger rests close it
+DRAIN_MAX_BYTES = 64 * 1024
+
+
+def parse_json_path(path: str) -> list:
+    """`$.a['b'][0][*]` -> ["a", "b", 0, "*"] (validated by HttpProbeConfig)."""
+    parts, i = [], 1
+    while i < len(path):
+        if path[i] == ".":
+            end = i + 1
+            while end < len(path) and path[end] not in ".[":
+                end += 1
+            parts.append(path[i + 1:end])
+        else:
+            end = (path.index("']", i) + 1 if path[i + 1] == "'" else path.index("]", i)) + 1
+            inner = path[i + 1:end - 1]
+            parts.append(inner[1:-1] if inner.startswith("'") else "*" if inner == "*" else int(inner))
+        i = end
+    return parts
+
+
+class JsonPathMatcher:
+    """
+    Evaluates a JSONPath over a streamed JSON body with ijson's push
+    parser, keeping only the current path in memory. Stops at the first
+    match, so the rest of the body is never read.
+    """
+
+    def __init__(self, path: str, expected=None):
+        self.path_text = path
+        self.path = parse_json_path(path)
+        self.expected = expected
+        self.done = False
+        self.found = False
+        self.value = None
+        self.error: Optional[str] = None
+        self._stack: list[list] = []  # [kind, current key or index] per open container
+        self._events = ijson.sendable_list()
+        self._parser = ijson.basic_parse_coro(self._events, use_float=True)
+
+    def feed(self, chunk: bytes):
+        try:
+            self._parser.send(chunk)
+        except ijson.JSONError as exc:
+            self.error, self.done = str(exc), True
+            return
+        self._consume()
+
+    def close(self):
+        if self.done:
+            return
+        try:
+            self._parser.close()
+        except ijson.JSONError as exc:
+            self.error = str(exc)
+        else:
+            self._consume()
+        self.done = True
+
+    def _consume(self):
+        for event, value in self._events:
+            if self._on_event(event, value):
+                self.done = True
+                break
+        del self._events[:]
+
+    def _on_event(self, event: str, value) -> bool:
+        if event == "map_key":
+            self._stack[-1][1] = value
+            return False
+        if event in ("end_map", "end_array"):
+            self._stack.pop()
+            return False
+        # A value (scalar or container) starts at the current position
+        if self._stack and self._stack[-1][0] == "array":
+            self._stack[-1][1] += 1
+        if len(self._stack) == len(self.path) and all(
+            want == "*" or want == frame[1] for want, frame in zip(self.path, self._stack)
+        ):
+            self.found = True
+            self.value = _CONTAINER if event in ("start_map", "start_array") else value
+            return True
+        if event == "start_map":
+            self._stack.append(["map", None])
+        elif event == "start_array":
+            self._stack.append(["array", -1])
+        return False
+
+    def failure(self) -> Optional[str]:
+        if self.error:
+            return f"Response body is not valid JSON: {self.error}"
+        if not self.found:
+            return f"JSONPath {self.path_text} not found in response body"
+        if self.expected is not None:
+            if self.value is _CONTAINER:
+                return f"JSONPath {self.path_text} matched an object or array, not a value"
+            if self.value != self.expected:
+                return f"JSONPath {self.path_text} is {self.value!r}, expected {self.expected!r}"
+        return None
+
+
+async def check_body(chunks: AsyncIterator[bytes], config: HttpProbeConfig) -> Optional[str]:
+    """
+    Run the body assertions on the (decoded) body `chunks` as they stream
+    in; returns the first failure, if any. Reading stops once every
+    assertion is settled or after `max_body_bytes`, so large bodies are
+    never buffered. The rest stays in `chunks` for the caller to drain.
+    """
+    matchers = []
+    if config.keyword:
+        matchers.append(KeywordMatcher(config.keyword))
+    if config.json_path:
+        matchers.append(JsonPathMatcher(config.json_path, config.json_equals))
+    if not matchers:
+        return None
+
+    read = 0
+    async for chunk in chunks:
+        read += len(chunk)
+        for matcher in matchers:
+            if not matcher.done:
+                matcher.feed(chunk)
+        if all(m.done for m in matchers):
+            break
+        if read >= config.max_body_bytes:
+            return f"Assertion unresolved after max_body_bytes ({config.max_body_bytes}) of the response body"
+    else:
+        for matcher in matchers:
+            matcher.close()
+
+    for matcher in matchers:
+        failure = matcher.failure()
+        if failure:
+            return failure
+    return None
+
+
+async def _http_exchange(client, monitor, config: HttpProbeConfig, result: ProbeResult, timer: PhaseTimer):
+    async with client.stream(
+        config.method,
+        monitor.url,
+        headers=config.headers,
+        content=config.body,
+        timeout=monitor.frequency_sec,
+        extensions={"trace": timer.trace},
+    ) as response:
+        result.status_code = response.status_code
+        if not status_expected(response.status_code, config.expected_status):
+            result.error = f"Unexpected status code {response.status_code}"
+            chunks = response.aiter_raw()
+        elif config.keyword or config.json_path:
+            chunks = response.aiter_bytes()
+            result.error = await check_body(chunks, config)
+        else:
+            chunks = response.aiter_raw()
+        await _drain(chunks, DRAIN_MAX_BYTES)
+    result.is_up = result.error is None
+
+
+async def _drain(chunks: AsyncIterator[bytes], limit: int) -> bool:
+    """
+    Read and discard the rest of a body, up to `limit` bytes. A fully
+    read response releases its connection to the pool; leaving the
+    stream early makes httpx close it instead.
+    """
+    read = 0
+    async for chunk in chunks:
+        read += len(chunk)
+        if read > limit:
+            return False
+    return True
+
+
+@register_probe("http")
+async def probe_http(monitor, config: HttpProbeConfig, clients, result: ProbeResult, timer: PhaseTimer):
+    """
+    HTTP request with the configured method, headers and body. Reuses a
+    pooled keep-alive connection unless the monitor asks for a cold one.
+    """
+    if clients is None or getattr(monitor, "force_cold_connection", False):
+        cold = clients.cold_client() if clients else httpx.AsyncClient()
+        async with cold as client:
+            await _http_exchange(client, monitor, config, result, timer)
+    else:
+        async with clients.use(monitor.url) as client:
+            await _http_exchange(client, monitor, config, result, timer)
+
+
+# --- Socket-level probes ---
+
+@register_probe("tcp")
+async def probe_tcp(monitor, config, clients, result: ProbeResult, timer: PhaseTimer):
+    host, port = _target(monitor.url, 0)
+    addresses = await resolve(host, port, timer)
+    with timer.measure("connect_ms"):
+        _, writer = await asyncio.open_connection(addresses[0], port)
+    writer.close()
+    result.is_up = True
+
+
+@lru_cache()
+def _tls_context() -> ssl.SSLContext:
+    return ssl.create_default_context()
+
+
+@register_probe("tls_expiry")
+async def probe_tls_expiry(monitor, config: TlsExpiryProbeConfig, clients, result: ProbeResult, timer: PhaseTimer):
+    host, port = _target(monitor.url, 443)
+    addresses = await resolve(host, port, timer)
+    loop = asyncio.get_running_loop()
+    with timer.measure("connect_ms"):
+        transport, protocol = await loop.create_connection(asyncio.Protocol, addresses[0], port)
+    try:
+        with timer.measure("tls_ms"):
+            transport = await loop.start_tls(transport, protocol, _tls_context(), server_hostname=host)
+        cert = transport.get_extra_info("peercert")
+    finally:
+        transport.close()
+
+    days_left = (ssl.cert_time_to_seconds(cert["notAfter"]) - time.time()) / 86400
+    result.is_up = days_left >= config.min_days_valid
+    if not result.is_up:
+        result.error = f"Certificate expires in {days_left:.1f} days ({cert['notAfter']})"
+
+
+@lru_cache()
+def _resolver() -> dns.asyncresolver.Resolver:
+    return dns.asyncresolver.Resolver()
+
+
+def _record_text(record_type: str, text: str) -> str:
+    text = text.strip('"').rstrip(".")
+    return text if record_type == "TXT" else text.lower()
+
+
+@register_probe("dns")
+async def probe_dns(monitor, config: DnsProbeConfig, clients, result: ProbeResult, timer: PhaseTimer):
+    host = urlsplit(monitor.url).hostname
+    with timer.measure("dns_ms"):
+        answer = await _resolver().resolve(host, config.record_type, lifetime=monitor.frequency_sec)
+    values = {_record_text(config.record_type, r.to_text()) for r in answer}
+    missing = [v for v in config.expected if _record_text(config.record_type, v) not in values]
+    result.is_up = not missing
+    if missing:
+        result.error = f"{config.record_type} answer {sorted(values)} is missing {missing}"
+
+
+# --- Dispatch ---
+
+async def probe_monitor(monitor, clients: Optional[ClientRegistry] = None) -> ProbeResult:
+    """
+    Run the check for a monitor (by its probe type) without touching the
+    database. Safe to run many of these concurrently on one event loop.
+    """
+    result = ProbeResult(monitor_id=monitor.id, timestamp=datetime.now(timezone.utc))
+    timer = PhaseTimer()
+    result.timings = timer.timings
+
+    try:
+        probe_type = getattr(monitor, "probe_type", None) or "http"
+        config = PROBE_CONFIGS[probe_type].model_validate(getattr(monitor, "probe_config", None) or {})
+        with timer.active():
+            await asyncio.wait_for(PROBES[probe_type](monitor, config, clients, result, timer), monitor.frequency_sec)
+        result.response_ms = timer.finish()
+
+    except (httpx.TimeoutException, asyncio.TimeoutError, dns.exception.Timeout):
+        result.error = f"Request timed out after {monitor.frequency_sec}s"
+        logger.warning(f"[Monitor {monitor.id}] Timeout: {monitor.url}")
+
+    except httpx.ConnectError as exc:
+        result.error = f"Connection failed: {exc!s}"
+        logger.warning(f"[Monitor {monitor.id}] Connection error: {exc}")
+
+    except httpx.RequestError as exc:
+        result.error = f"Request failed: {exc.__class__.__name__} - {exc!s}"
+        logger.warning(f"[Monitor {monitor.id}] Request error: {exc}")
+
+    except ssl.SSLError as exc:
+        result.error = f"TLS handshake failed: {exc!s}"
+        logger.warning(f"[Monitor {monitor.id}] TLS error: {exc}")
+
+    except OSError as exc:
+        result.error = f"Connection failed: {exc!s}"
+        logger.warning(f"[Monitor {monitor.id}] Connection error: {exc}")
+
+    except dns.exception.DNSException as exc:
+        result.error = f"DNS query failed: {exc!s}"
+        logger.warning(f"[Monitor {monitor.id}] DNS error: {exc}")
+
+    except ValueError as exc:
+        result.error = f"Invalid probe configuration: {exc!s}"
+        logger.error(f"[Monitor {monitor.id}] Invalid probe configuration: {exc}")
+
+    except Exception as exc:
+        result.error = f"Unexpected error: {exc.__class__.__name__} - {exc!s}"
+        logger.error(f"[Monitor {monitor.id}] Unexpected error: {exc}", exc_info=True)
+
+    return result
@@ -0,0 +1,237 @@
+"""
+Per-process columnar ring buffer of recent probe results.
+
+Each monitor gets a fixed-size slot in a handful of preallocated NumPy
+arrays, so "last N checks" / "last hour" reads are array slices instead
+of Postgres queries materializing ORM rows. Per sample:
+
+    timestamp   int64 (epoch ms)   8 bytes
+    response_ms float32 (NaN=none) 4 bytes
+    status_code uint16 (0=none)    2 bytes
+    is_up       1 bit              0.125 bytes
+                                   -------------
+                                   14.125 bytes/sample
+
+plus 8 bytes of head/count per slot (and the id → slot map). The arrays are sized once from
+RING_BUFFER_MEMORY_MB and RING_BUFFER_CAPACITY; when every slot is taken
+the least recently written monitor is evicted.
+
+Only API processes keep one (it serves `/metrics/recent` and the
+anomaly endpoint), filled from the live status events that the probe
+path publishes (see `feed_from_status_events`). Workers don't allocate
+it: each would only ever see its own checks.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_SAMPLE = 8 + 4 + 2 + 1 / 8
+SLOT_OVERHEAD_BYTES = 8  # int32 head + count
+
+
+@dataclass
+class RecentSamples:
+    """Samples of one monitor, oldest first."""
+    timestamps_ms: np.ndarray  # int64
+    response_ms: np.ndarray  # float32, NaN when the check had no response
+    status_code: np.ndarray  # uint16, 0 when there was no HTTP status
+    is_up: np.ndarray  # bool
+
+    def __len__(self):
+        return len(self.timestamps_ms)
+
+
+class MetricRingBuffer:
+    def __init__(self, capacity: int = 360, memory_mb: float = 64.0):
+        self.capacity = capacity
+        slot_bytes = capacity * BYTES_PER_SAMPLE + SLOT_OVERHEAD_BYTES
+        self.slots = max(1, int(memory_mb * 2**20 // slot_bytes))
+
+        self._ts = np.zeros((self.slots, capacity), dtype=np.int64)
+        self._latency = np.full((self.slots, capacity), np.nan, dtype=np.float32)
+        self._status = np.zeros((self.slots, capacity), dtype=np.uint16)
+        self._up = np.zeros((self.slots, (capacity + 7) // 8), dtype=np.uint8)
+        self._head = np.zeros(self.slots, dtype=np.int32)  # next write position
+        self._count = np.zeros(self.slots, dtype=np.int32)
+
+        self._slot_of: OrderedDict[str, int] = OrderedDict()  # LRU by last write
+        self._free = list(range(self.slots - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.complete_since_ms = 0  # samples older than this may be missing (feed gap)
+        self.appends = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self._ts, self._latency, self._status, self._up, self._head, self._count))
+
+    def _slot_for_write(self, monitor_id: str) -> int:
+        slot = self._slot_of.get(monitor_id)
+        if slot is not None:
+            self._slot_of.move_to_end(monitor_id)
+            return slot
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slot_of.popitem(last=False)
+            self.evictions += 1
+        self._head[slot] = 0
+        self._count[slot] = 0
+        self._slot_of[monitor_id] = slot
+        return slot
+
+    def append(self, monitor_id, timestamp_ms: int, response_ms, status_code, is_up: bool):
+        with self._lock:
+            self._append(str(monitor_id), timestamp_ms, response_ms, status_code, is_up)
+
+    def _append(self, monitor_id: str, timestamp_ms: int, response_ms, status_code, is_up: bool):
+        slot = self._slot_for_write(monitor_id)
+        pos = int(self._head[slot])
+        self._ts[slot, pos] = timestamp_ms
+        self._latency[slot, pos] = np.nan if response_ms is None else response_ms
+        self._status[slot, pos] = status_code or 0
+        byte, bit = pos >> 3, np.uint8(1 << (pos & 7))
+        if is_up:
+            self._up[slot, byte] |= bit
+        else:
+            self._up[slot, byte] &= ~bit
+        self._head[slot] = (pos + 1) % self.capacity
+        self._count[slot] = min(int(self._count[slot]) + 1, self.capacity)
+        self.appends += 1
+
+    def append_many(self, rows):
+        """Append (monitor_id, timestamp_ms, response_ms, status_code, is_up) rows under one lock."""
+        with self._lock:
+            for monitor_id, timestamp_ms, response_ms, status_code, is_up in rows:
+                self._append(str(monitor_id), timestamp_ms, response_ms, status_code, is_up)
+
+    def _positions(self, slot: int) -> np.ndarray:
+        count, head = int(self._count[slot]), int(self._head[slot])
+        return (head - count + np.arange(count)) % self.capacity
+
+    def read(self, monitor_id, n: int | None = None, since_ms: int | None = None) -> RecentSamples | None:
+        """The last `n` samples and/or those at or after `since_ms`; None if the monitor is not buffered."""
+        with self._lock:
+            slot = self._slot_of.get(str(monitor_id))
+            if slot is None:
+                return None
+            pos = self._positions(slot)
+            if since_ms is not None:
+                pos = pos[self._ts[slot, pos] >= since_ms]
+            if n is not None:
+                pos = pos[-n:] if n > 0 else pos[:0]
+            up = (self._up[slot, pos >> 3] >> (pos & 7).astype(np.uint8)) & 1
+            return RecentSamples(
+                self._ts[slot, pos], self._latency[slot, pos], self._status[slot, pos], up.astype(bool)
+            )
+
+    def covers(self, monitor_id, n: int | None = None, since_ms: int | None = None) -> bool:
+        """
+        Whether the buffer alone can answer the read: it holds at least `n`
+        samples, its oldest retained sample is not after `since_ms`
+        (otherwise older samples may exist only in the database), and the
+        read does not reach back past the last feed gap.
+        """
+        with self._lock:
+            slot = self._slot_of.get(str(monitor_id))
+            if slot is None:
+                return False
+            count = int(self._count[slot])
+            head = int(self._head[slot])
+            if n is not None:
+                if count < n:
+                    return False
+                if n > 0 and self._ts[slot, (head - n) % self.capacity] < self.complete_since_ms:
+                    return False
+            if since_ms is not None:
+                if since_ms < self.complete_since_ms:
+                    return False
+                oldest = self._ts[slot, (head - count) % self.capacity]
+                return count > 0 and oldest <= since_ms
+            return True
+
+    def mark_gap(self, timestamp_ms: int):
+        """Record that samples before `timestamp_ms` may be missing (e.g. the feed reconnected)."""
+        with self._lock:
+            self.complete_since_ms = max(self.complete_since_ms, timestamp_ms)
+
+    def forget(self, monitor_id):
+        with self._lock:
+            slot = self._slot_of.pop(str(monitor_id), None)
+            if slot is not None:
+                self._free.append(slot)
+
+    def stats(self) -> dict:
+        return {
+            "monitors": len(self._slot_of),
+            "slots": self.slots,
+            "capacity": self.capacity,
+            "bytes": self.nbytes,
+            "bytes_per_sample": BYTES_PER_SAMPLE,
+            "appends": self.appends,
+            "evictions": self.evictions,
+            "complete_since_ms": self.complete_since_ms,
+        }
+
+
+@lru_cache()
+def get_ring_buffer() -> MetricRingBuffer:
+    buffer = MetricRingBuffer(settings.RING_BUFFER_CAPACITY, settings.RING_BUFFER_MEMORY_MB)
+    logger.info(
+        f"Metric ring buffer: {buffer.slots} monitors × {buffer.capacity} samples "
+        f"({buffer.nbytes / 2**20:.1f} MiB, {BYTES_PER_SAMPLE} bytes/sample)"
+    )
+    return buffer
+
+
+async def feed_from_status_events(buffer: MetricRingBuffer, redis):
+    """
+    Keep an API process's buffer filled from the live status events that
+    the probe path publishes (one pattern subscription per process).
+    Events published while not subscribed are lost, so every
+    (re)subscription marks a gap: reads reaching back before it go to the
+    database.
+    """
+    from app.services.live_status import CHANNEL_PREFIX
+
+    while True:
+        pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            buffer.mark_gap(int(time.time() * 1000))
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                buffer.append_many(
+                    (
+                        item["monitor_id"],
+                        int(datetime.fromisoformat(item["last_checked_at"]).timestamp() * 1000),
+                        item["response_ms"],
+                        item["status_code"],
+                        item["is_up"],
+                    )
+                    for item in json.loads(message["data"])
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"Ring buffer feed lost: {exc}; reconnecting")
+            await asyncio.sleep(1.0)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
@@ -0,0 +1,314 @@
+import logging
+from dataclasses import dataclass, field
+from itertools import groupby
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.metric import PHASE_COLUMNS, Metric
+from app.models.rollup import MetricRollup
+from app.utils.sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+
+
+def to_naive_utc(ts: datetime) -> datetime:
+    """The DB stores naive UTC timestamps."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def floor_bucket(ts: datetime, seconds: int) -> datetime:
+    ts = to_naive_utc(ts)
+    epoch = int(ts.replace(tzinfo=timezone.utc).timestamp())
+    return datetime.utcfromtimestamp(epoch - epoch % seconds)
+
+
+def ceil_bucket(ts: datetime, seconds: int) -> datetime:
+    floored = floor_bucket(ts, seconds)
+    return floored if floored == to_naive_utc(ts) else floored + timedelta(seconds=seconds)
+
+
+@dataclass
+class RollupAggregate:
+    count: int = 0
+    up_count: int = 0
+    latency_count: int = 0
+    latency_min: Optional[int] = None
+    latency_max: Optional[int] = None
+    latency_sum: int = 0
+    sketch: LatencySketch = field(default_factory=LatencySketch)
+    phase_sum: list = field(default_factory=lambda: [0] * len(PHASE_COLUMNS))
+    phase_count: list = field(default_factory=lambda: [0] * len(PHASE_COLUMNS))
+
+    def add(self, is_up: bool, response_ms: Optional[float], phases: Iterable = ()):
+        """`phases`: per-phase ms in PHASE_COLUMNS order (None for phases that didn't happen)."""
+        for i, ms in enumerate(phases):
+            if ms is not None:
+                self.phase_sum[i] += int(round(ms))
+                self.phase_count[i] += 1
+        self.count += 1
+        self.up_count += int(bool(is_up))
+        if response_ms is not None:
+            ms = int(round(response_ms))
+            self.latency_count += 1
+            self.latency_sum += ms
+            self.latency_min = ms if self.latency_min is None else min(self.latency_min, ms)
+            self.latency_max = ms if self.latency_max is None else max(self.latency_max, ms)
+            self.sketch.add(ms)
+
+    def merge(self, other: "RollupAggregate"):
+        self.count += other.count
+        self.up_count += other.up_count
+        self.latency_count += other.latency_count
+        self.latency_sum += other.latency_sum
+        for attr, pick in (("latency_min", min), ("latency_max", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.sketch.merge(other.sketch)
+        self.phase_sum = [a + b for a, b in zip(self.phase_sum, other.phase_sum)]
+        self.phase_count = [a + b for a, b in zip(self.phase_count, other.phase_count)]
+
+    @classmethod
+    def from_row(cls, row: MetricRollup) -> "RollupAggregate":
+        return cls(
+            count=row.count or 0,
+            up_count=row.up_count or 0,
+            latency_count=row.latency_count or 0,
+            latency_min=row.latency_min,
+            latency_max=row.latency_max,
+            latency_sum=row.latency_sum or 0,
+            sketch=LatencySketch.from_bytes(row.latency_sketch),
+            phase_sum=_phase_list(row.phase_sum),
+            phase_count=_phase_list(row.phase_count),
+        )
+
+    def values(self) -> dict:
+        return {
+            "count": self.count,
+            "up_count": self.up_count,
+            "latency_count": self.latency_count,
+            "latency_min": self.latency_min,
+            "latency_max": self.latency_max,
+            "latency_sum": self.latency_sum,
+            "latency_sketch": self.sketch.to_bytes(),
+            "phase_sum": self.phase_sum,
+            "phase_count": self.phase_count,
+        }
+
+    def phase_averages(self) -> dict:
+        return {
+            column[:-3]: round(total / count, 2) if count else None
+            for column, total, count in zip(PHASE_COLUMNS, self.phase_sum, self.phase_count)
+        }
+
+
+def _phase_list(values) -> list:
+    """Stored phase array, padded for buckets written before a phase existed."""
+    values = list(values or ())
+    return values + [0] * (len(PHASE_COLUMNS) - len(values))
+
+
+def aggregate(rows: Iterable) -> dict[tuple, RollupAggregate]:
+    """
+    Fold metric rows (dicts or Row objects with monitor_id, timestamp,
+    is_up, response_ms and optionally the PHASE_COLUMNS) into aggregates keyed by
+    (monitor_id, bucket_seconds, bucket_start).
+    """
+    aggregates: dict[tuple, RollupAggregate] = {}
+    for row in rows:
+        get = row.get if isinstance(row, dict) else row._mapping.get
+        for seconds in RESOLUTIONS:
+            key = (get("monitor_id"), seconds, floor_bucket(get("timestamp"), seconds))
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = RollupAggregate()
+            agg.add(get("is_up"), get("response_ms"), [get(c) for c in PHASE_COLUMNS])
+    return aggregates
+
+
+def _key_columns():
+    return tuple_(MetricRollup.monitor_id, MetricRollup.bucket_seconds, MetricRollup.bucket_start)
+
+
+def apply_rollups(db: Session, rows: list[dict]):
+    """
+    Add freshly ingested metric rows to their rollup buckets. Runs inside
+    the caller's transaction, so rollups commit together with the raw rows.
+    """
+    aggregates = aggregate(rows)
+    if not aggregates:
+        return
+    keys = sorted(aggregates, key=lambda k: (str(k[0]), k[1], k[2]))  # stable lock order
+
+    # Make sure every bucket exists, then lock them; concurrent flushes
+    # from other workers serialize on these row locks instead of racing.
+    db.execute(
+        pg_insert(MetricRollup)
+        .values([
+            {"monitor_id": m, "bucket_seconds": s, "bucket_start": b, "count": 0,
+             "up_count": 0, "latency_count": 0, "latency_sum": 0}
+            for m, s, b in keys
+        ])
+        .on_conflict_do_nothing()
+    )
+    existing = (
+        db.query(MetricRollup)
+        .filter(_key_columns().in_(keys))
+        .order_by(MetricRollup.monitor_id, MetricRollup.bucket_seconds, MetricRollup.bucket_start)
+        .with_for_update()
+        .all()
+    )
+    for row in existing:
+        merged = RollupAggregate.from_row(row)
+        merged.merge(aggregates[(row.monitor_id, row.bucket_seconds, row.bucket_start)])
+        for column, value in merged.values().items():
+            setattr(row, column, value)
+    db.flush()
+
+
+def _overwrite_rollups(db: Session, aggregates: dict[tuple, RollupAggregate], chunk_size: int = 5000):
+    items = list(aggregates.items())
+    for i in range(0, len(items), chunk_size):
+        stmt = pg_insert(MetricRollup).values([
+            {"monitor_id": m, "bucket_seconds": s, "bucket_start": b, **agg.values()}
+            for (m, s, b), agg in items[i:i + chunk_size]
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["monitor_id", "bucket_seconds", "bucket_start"],
+            set_={c: stmt.excluded[c] for c in RollupAggregate().values()},
+        ))
+
+
+def backfill_rollups(db: Session, start: datetime, end: datetime, monitor_id=None) -> int:
+    """
+    Recompute rollups from raw metrics for whole days in [start, end).
+    Buckets are overwritten, so the job is safe to re-run. Rows are
+    streamed one day at a time, ordered by monitor, so only one
+    monitor-day of aggregates is held in memory.
+    Returns the number of buckets written.
+    """
+    cursor = floor_bucket(start, DAY)
+    end = ceil_bucket(end, DAY)
+    written = 0
+
+    while cursor < end:
+        upper = cursor + timedelta(days=1)
+        query = (
+            db.query(
+                Metric.monitor_id, Metric.timestamp, Metric.is_up, Metric.response_ms,
+                *(getattr(Metric, c) for c in PHASE_COLUMNS),
+            )
+            .filter(Metric.timestamp >= cursor, Metric.timestamp < upper)
+            .filter(Metric.region.is_(None))  # central checks only, like the live rollups
+            .order_by(Metric.monitor_id, Metric.timestamp)
+            .execution_options(yield_per=10_000)
+        )
+        if monitor_id:
+            query = query.filter(Metric.monitor_id == monitor_id)
+
+        day_buckets = 0
+        for _, monitor_rows in groupby(query, key=lambda row: row.monitor_id):
+            aggregates = aggregate(monitor_rows)
+            _overwrite_rollups(db, aggregates)
+            day_buckets += len(aggregates)
+        db.commit()
+
+        written += day_buckets
+        logger.info(f"Backfilled rollups for {cursor:%Y-%m-%d} ({day_buckets} buckets)")
+        cursor = upper
+
+    return written
+
+
+def prune_rollups(db: Session, retention_days: dict[int, int]) -> int:
+    """Delete fine-grained buckets past their retention ({bucket_seconds: days})."""
+    deleted = 0
+    now = datetime.utcnow()
+    for seconds, days in retention_days.items():
+        if days:
+            result = db.execute(
+                delete(MetricRollup).where(
+                    MetricRollup.bucket_seconds == seconds,
+                    MetricRollup.bucket_start < now - timedelta(days=days),
+                )
+            )
+            deleted += result.rowcount
+    db.commit()
+    return deleted
+
+
+def plan_buckets(start: datetime, end: datetime, levels=(DAY, HOUR, MINUTE)) -> list[tuple]:
+    """
+    Cover [start, end) with the fewest rollup buckets: whole days in
+    the middle, then hours, then minutes at the edges.
+    Returns (bucket_seconds, first_bucket_start, end_exclusive) ranges.
+    """
+    start, end = to_naive_utc(start), to_naive_utc(end)
+    if start >= end:
+        return []
+    size = levels[0]
+    if len(levels) == 1:
+        lo, hi = floor_bucket(start, size), ceil_bucket(end, size)
+        return [(size, lo, hi)]
+    lo, hi = ceil_bucket(start, size), floor_bucket(end, size)
+    if lo >= hi:
+        return plan_buckets(start, end, levels[1:])
+    return plan_buckets(start, lo, levels[1:]) + [(size, lo, hi)] + plan_buckets(hi, end, levels[1:])
+
+
+def summary_statement(monitor_id, start: datetime, end: datetime):
+    """Single SELECT of every rollup bucket that covers [start, end), or None if empty."""
+    plan = plan_buckets(start, end)
+    if not plan:
+        return None
+    return select(MetricRollup).where(
+        MetricRollup.monitor_id == monitor_id,
+        or_(*(
+            and_(
+                MetricRollup.bucket_seconds == seconds,
+                MetricRollup.bucket_start >= lo,
+                MetricRollup.bucket_start < hi,
+            )
+            for seconds, lo, hi in plan
+        )),
+    )
+
+
+def merge_rows(rows: Iterable[MetricRollup]) -> RollupAggregate:
+    total = RollupAggregate()
+    for row in rows:
+        total.merge(RollupAggregate.from_row(row))
+    return total
+
+
+def summarize(db: Session, monitor_id, start: datetime, end: datetime) -> dict:
+    """Uptime and latency percentiles for a monitor over [start, end), from rollups only."""
+    stmt = summary_statement(monitor_id, start, end)
+    rows = db.scalars(stmt).all() if stmt is not None else []
+    return summary_from_aggregate(monitor_id, start, end, merge_rows(rows))
+
+
+def summary_from_aggregate(monitor_id, start, end, total: RollupAggregate) -> dict:
+    return {
+        "monitor_id": monitor_id,
+        "start": start,
+        "end": end,
+        "checks": total.count,
+        "up_checks": total.up_count,
+        "uptime_pct": round(100.0 * total.up_count / total.count, 4) if total.count else None,
+        "latency_avg_ms": total.latency_sum / total.latency_count if total.latency_count else None,
+        "latency_min_ms": total.latency_min,
+        "latency_max_ms": total.latency_max,
+        "latency_p50_ms": total.sketch.quantile(0.50),
+        "latency_p95_ms": total.sketch.quantile(0.95),
+        "latency_p99_ms": total.sketch.quantile(0.99),
+        "phase_avg_ms": total.phase_averages(),
+    }
@@ -0,0 +1,150 @@
+import json
+import logging
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.metric import Metric
+from app.services.live_status import status_channel
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "status:user:"
+
+
+def status_key(user_id) -> str:
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _next_status(previous: dict | None, result) -> dict:
+    """Latest status for a monitor, carrying the up/down streak forward."""
+    up_streak = down_streak = 0
+    if result.is_up:
+        up_streak = (previous or {}).get("up_streak", 0) + 1
+    else:
+        down_streak = (previous or {}).get("down_streak", 0) + 1
+    return {
+        "is_up": result.is_up,
+        "status_code": result.status_code,
+        "response_ms": round(result.response_ms) if result.response_ms is not None else None,
+        "error": result.error,
+        "last_checked_at": result.timestamp.isoformat(),
+        "up_streak": up_streak,
+        "down_streak": down_streak,
+    }
+
+
+def write_latest_status(redis, monitors: dict, results: list):
+    """
+    Store the latest result of each monitor in its owner's status hash
+    (`status:user:<user_id>`, field = monitor id) and publish the new
+    statuses to the user's live stream channel. Two round trips per
+    batch: read the previous statuses for the streaks, then write.
+    """
+    if not results:
+        return
+    fields: dict[str, list[str]] = {}
+    for result in results:
+        fields.setdefault(str(monitors[result.monitor_id].user_id), []).append(str(result.monitor_id))
+
+    pipe = redis.pipeline(transaction=False)
+    for user_id, monitor_ids in fields.items():
+        pipe.hmget(status_key(user_id), monitor_ids)
+    previous = {}
+    for (user_id, monitor_ids), values in zip(fields.items(), pipe.execute()):
+        for monitor_id, raw in zip(monitor_ids, values):
+            previous[monitor_id] = json.loads(raw) if raw else None
+
+    updates: dict[str, dict[str, str]] = {}
+    events: dict[str, list[dict]] = {}
+    for result in results:
+        monitor_id = str(result.monitor_id)
+        before = previous.get(monitor_id)
+        status = _next_status(before, result)
+        previous[monitor_id] = status
+        user_id = str(monitors[result.monitor_id].user_id)
+        updates.setdefault(user_id, {})[monitor_id] = json.dumps(status)
+        events.setdefault(user_id, []).append(
+            {"monitor_id": monitor_id, "changed": before is None or before["is_up"] != status["is_up"], **status}
+        )
+
+    pipe = redis.pipeline(transaction=False)
+    for user_id, mapping in updates.items():
+        pipe.hset(status_key(user_id), mapping=mapping)
+        pipe.expire(status_key(user_id), settings.STATUS_CACHE_TTL_SEC)
+        pipe.publish(status_channel(user_id), json.dumps(events[user_id]))
+    pipe.execute()
+
+
+def record_latest_status(monitors: dict, results: list):
+    """Probe-path hook; a Redis outage only costs the dashboards a DB fallback."""
+    if not settings.STATUS_CACHE_ENABLED:
+        return
+    from app.core.redis_client import get_redis
+
+    try:
+        write_latest_status(get_redis(), monitors, results)
+    except Exception as exc:
+        logger.warning(f"Failed to update status cache for {len(results)} results: {exc}")
+
+
+async def read_latest_status(redis, user_id, monitor_ids: list[str]) -> dict[str, dict]:
+    """Cached statuses for these monitors (missing ones are simply absent)."""
+    if not monitor_ids or redis is None:
+        return {}
+    try:
+        values = await redis.hmget(status_key(user_id), monitor_ids)
+    except Exception as exc:
+        logger.warning(f"Status cache read failed for user {user_id}: {exc}")
+        return {}
+    return {m: json.loads(raw) for m, raw in zip(monitor_ids, values) if raw}
+
+
+async def latest_status_from_db(db: AsyncSession, monitors: list) -> dict[str, dict]:
+    """
+    Latest central check (region NULL) of each monitor in one `DISTINCT ON`
+    query. The scan starts just before the oldest `last_checked_at` so only
+    recent partitions are touched.
+    """
+    checked = [m for m in monitors if m.last_checked_at is not None]
+    if not checked:
+        return {}
+    since = min(m.last_checked_at for m in checked).replace(tzinfo=None) - timedelta(hours=1)
+    rows = await db.execute(
+        select(Metric.monitor_id, Metric.timestamp, Metric.is_up, Metric.status_code, Metric.response_ms, Metric.error)
+        .where(
+            Metric.monitor_id.in_([m.id for m in checked]), Metric.timestamp >= since, Metric.region.is_(None)
+        )
+        .distinct(Metric.monitor_id)
+        .order_by(Metric.monitor_id, Metric.timestamp.desc())
+    )
+    return {
+        str(row.monitor_id): {
+            "is_up": row.is_up,
+            "status_code": row.status_code,
+            "response_ms": row.response_ms,
+            "error": row.error,
+            "last_checked_at": row.timestamp.isoformat(),
+        }
+        for row in rows
+    }
+
+
+async def forget_monitor_status(redis, user_id, monitor_id):
+    if redis is None:
+        return
+    try:
+        await redis.hdel(status_key(user_id), str(monitor_id))
+    except Exception as exc:
+        logger.warning(f"Failed to drop cached status of monitor {monitor_id}: {exc}")
+
+
+async def forget_monitor_statuses(redis, user_id, monitor_ids):
+    if redis is None or not monitor_ids:
+        return
+    try:
+        await redis.hdel(status_key(user_id), *(str(m) for m in monitor_ids))
+    except Exception as exc:
+        logger.warning(f"Failed to drop cached status of {len(monitor_ids)} monitors: {exc}")
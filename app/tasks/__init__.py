@@ -1 +1 @@
-from . import alerts, monitor
\ No newline at end of file
+from . import alerts, analytics, maintenance, monitor
\ No newline at end of file
@@ -1,10 +1,24 @@
 import logging
+import math
+from celery.signals import worker_process_shutdown
 
+from app.config import settings
 from app.core.celery_app import celery_app
+from app.core.redis_client import get_redis
 from app.services.alerts import send_alert_message
 
 logger = logging.getLogger(__name__)
 
+FLUSH_SCHEDULED_KEY = "mail:flush_scheduled"
+
+
+@worker_process_shutdown.connect
+def stop_mail_dispatcher(**kwargs):
+    """Send queued alert emails before the worker process exits."""
+    from app.services.mail_transport import get_mail_dispatcher
+
+    get_mail_dispatcher().stop()
+
 
 @celery_app.task(
   name="app.tasks.alerts.send_alert",
@@ -23,10 +37,42 @@ def send_alert(alert_data: dict):
           f"[Celery] Processing alert task for monitor_id={alert_data.get('monitor_id')}"
         )
         send_alert_message(alert_data)
+        schedule_alert_emails()
         logger.info(
-          f"[Celery] ✅ Alert task completed (monitor_id={alert_data.get('monitor_id')})"
+          f"[Celery] ✅ Alert queued (monitor_id={alert_data.get('monitor_id')})"
         )
 
     except Exception as exc:
         logger.error(f"[Celery] ❌ Failed to send alert: {exc}", exc_info=True)
         raise  # triggers Celery retry mechanism
+
+
+def schedule_alert_emails():
+    """
+    Run send_alert_emails once MAIL_BATCH_WINDOW_SEC from now, unless a run
+    is already scheduled: alerts raised meanwhile go out in the same batch.
+    """
+    window = settings.MAIL_BATCH_WINDOW_SEC
+    # The flag expires on its own in case the scheduled run is lost
+    if get_redis().set(FLUSH_SCHEDULED_KEY, 1, nx=True, ex=math.ceil(window) + 60):
+        send_alert_emails.apply_async(countdown=window)
+
+
+@celery_app.task(
+  name="app.tasks.alerts.send_alert_emails",
+  acks_late=True,
+  reject_on_worker_lost=True,
+)
+def send_alert_emails():
+    """Send the queued alert emails in batches (also run by beat as a safety net)."""
+    from app.services.mail_queue import get_mail_queue, send_queued
+    from app.services.mail_transport import get_mail_dispatcher
+
+    get_redis().delete(FLUSH_SCHEDULED_KEY)  # alerts queued from now on schedule the next run
+    mail_queue = get_mail_queue()
+    stats = send_queued(mail_queue, get_mail_dispatcher(), settings.MAIL_BATCH_MAX)
+    if stats["retried"] or len(mail_queue):
+        schedule_alert_emails()
+    if any(stats.values()):
+        logger.info(f"[Celery] 📧 Alert emails: {stats}")
+    return stats
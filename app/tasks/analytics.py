@@ -0,0 +1,61 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy.orm import joinedload
+
+from app.config import settings
+from app.core.celery_app import celery_app
+from app.db import SessionLocal
+from app.models.monitor import Monitor
+from app.services.analytics import (
+    analyze_latency,
+    anomaly_reports,
+    latency_matrix,
+    rollup_window_statement,
+    window_bounds,
+)
+from app.services.monitor import trigger_anomaly_alert
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.analytics.detect_latency_anomalies")
+def detect_latency_anomalies_task():
+    """Alert on latency regressions of monitors whose latency_rule is baseline or both."""
+    db = SessionLocal()
+    try:
+        monitors = (
+            db.query(Monitor)
+            .options(joinedload(Monitor.user))
+            .filter(Monitor.is_active == True, Monitor.latency_rule.in_(["baseline", "both"]))
+            .all()
+        )
+        start, end, buckets, recent = window_bounds(
+            datetime.utcnow(),
+            settings.ANOMALY_BASELINE_HOURS,
+            settings.ANOMALY_RECENT_MINUTES,
+            settings.ANOMALY_BUCKET_SEC,
+        )
+
+        found = alerted = 0
+        for i in range(0, len(monitors), settings.ANOMALY_CHUNK_SIZE):
+            chunk = monitors[i:i + settings.ANOMALY_CHUNK_SIZE]
+            ids = [m.id for m in chunk]
+            rows = db.execute(rollup_window_statement(ids, start, end, settings.ANOMALY_BUCKET_SEC)).all()
+            matrix = latency_matrix(ids, rows, start, settings.ANOMALY_BUCKET_SEC, buckets)
+            analysis = analyze_latency(
+                matrix,
+                recent,
+                z_threshold=settings.ANOMALY_Z_THRESHOLD,
+                min_samples=settings.ANOMALY_MIN_SAMPLES,
+                alpha=settings.ANOMALY_EWMA_ALPHA,
+            )  # rollups only: a worker's ring buffer holds just its own checks
+            by_id = {m.id: m for m in chunk}
+            for report in anomaly_reports(ids, analysis, start, settings.ANOMALY_BUCKET_SEC):
+                found += 1
+                alerted += trigger_anomaly_alert(by_id[report["monitor_id"]], report)
+
+        logger.info(f"[Celery] Latency anomalies: {found} of {len(monitors)} monitors ({alerted} alerted)")
+        return {"monitors": len(monitors), "anomalies": found, "alerted": alerted}
+    finally:
+        db.close()
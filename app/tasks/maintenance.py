@@ -0,0 +1,63 @@
+import logging
+from datetime import datetime
+
+from app.config import settings
+from app.core.celery_app import celery_app
+from app.db import SessionLocal, engine
+from app.services.agent_ingest import prune_batches
+from app.services.partitions import manage_partitions
+from app.services.rollups import HOUR, MINUTE, backfill_rollups, prune_rollups
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.maintenance.manage_metric_partitions")
+def manage_metric_partitions_task():
+    """Create upcoming metric partitions and drop the ones past retention."""
+    result = manage_partitions(engine)
+    logger.info(
+        f"[Celery] Metric partitions: created={len(result['created'])}, "
+        f"dropped={len(result['dropped'])}"
+    )
+    return result
+
+
+@celery_app.task(name="app.tasks.maintenance.prune_metric_rollups")
+def prune_metric_rollups_task():
+    """Drop 1m/1h rollup buckets past their retention (1d buckets are kept)."""
+    db = SessionLocal()
+    try:
+        deleted = prune_rollups(db, {
+            MINUTE: settings.ROLLUP_MINUTE_RETENTION_DAYS,
+            HOUR: settings.ROLLUP_HOUR_RETENTION_DAYS,
+        })
+        logger.info(f"[Celery] Pruned {deleted} rollup buckets")
+        return deleted
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.maintenance.prune_agent_batches")
+def prune_agent_batches_task():
+    """Forget ingested agent batch ids past the dedupe window."""
+    db = SessionLocal()
+    try:
+        deleted = prune_batches(db, settings.AGENT_BATCH_DEDUPE_TTL_SEC)
+        logger.info(f"[Celery] Pruned {deleted} agent batch ids")
+        return deleted
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.maintenance.backfill_metric_rollups")
+def backfill_metric_rollups_task(start: str, end: str, monitor_id: str | None = None):
+    """Rebuild rollups from raw metrics between two ISO timestamps (whole days)."""
+    db = SessionLocal()
+    try:
+        written = backfill_rollups(
+            db, datetime.fromisoformat(start), datetime.fromisoformat(end), monitor_id
+        )
+        logger.info(f"[Celery] Backfilled {written} rollup buckets ({start} → {end})")
+        return written
+    finally:
+        db.close()
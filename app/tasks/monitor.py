@@ -1,67 +1,125 @@
-import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from celery.result import AsyncResult
+import os
+import time
+from datetime import datetime, timezone
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from sqlalchemy.orm import joinedload
 
 from app.core.celery_app import celery_app
+from app.core.instrumentation import mark_process_dead, observe_queue_lag, start_worker_exporter
+from app.core.logging_config import configure_logging
+from app.core.profiling import CheckTimer, maybe_profile
+from app.core.probe_engine import get_probe_engine
 from app.db import SessionLocal
 from app.models.monitor import Monitor
-from app.services.monitor import check_single_monitor
+from app.services.check_lease import single_flight
+from app.services.metric_sink import get_metric_sink
+from app.services.monitor import check_single_monitor, record_probe_results
+from app.utils.user_monitor_query import get_monitor_with_user
 
 logger = logging.getLogger(__name__)
 
 
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    """Prometheus exporter in the main worker process (aggregates children in multiprocess mode)."""
+    start_worker_exporter()
+
+
+@worker_process_init.connect
+def start_probe_engine(**kwargs):
+    """Each forked worker process gets its own long-lived probe loop and metric sink."""
+    configure_logging()
+    get_probe_engine().start()
+    get_metric_sink().start()
+
+
+@worker_process_shutdown.connect
+def stop_probe_engine(**kwargs):
+    get_probe_engine().stop()
+    get_metric_sink().stop()  # flushes buffered metrics
+    mark_process_dead(os.getpid())
+
+
+@celery_app.task(name="app.tasks.monitor.check_monitor_batch")
+def check_monitor_batch_task(monitor_ids: list[str], scheduled_for: float | None = None):
+    """Probe a batch of monitors concurrently and store all results in one commit."""
+    run_check_batch(monitor_ids, scheduled_for)
+
+
+def run_check_batch(monitor_ids: list[str], scheduled_for: float | None = None, task: str = "check_monitor_batch"):
+    """Body of the batch task; shard nodes call it directly on their own probe engine."""
+    observe_queue_lag(task, scheduled_for)
+    timer = CheckTimer(task, monitors=len(monitor_ids))
+    if scheduled_for is not None:
+        timer.record("queue_lag", max(0.0, time.time() - scheduled_for))
+
+    db = SessionLocal()
+    try:
+        with maybe_profile(task, monitors=len(monitor_ids)):
+            with timer.span("db_load"):
+                monitors = (
+                    db.query(Monitor)
+                    .options(joinedload(Monitor.user))
+                    .filter(Monitor.id.in_(monitor_ids), Monitor.is_active == True)
+                    .all()
+                )
+            if not monitors:
+                logger.info(f"No active monitors in batch of {len(monitor_ids)} — skipping.")
+                return
+
+            with single_flight(monitors, scheduled_for) as monitors:
+                if not monitors:
+                    return
+                engine = get_probe_engine()
+                with timer.span("probe"):
+                    results = engine.run_batch(monitors)
+                record_probe_results(db, {m.id: m for m in monitors}, results, timer)
+                logger.info(f"✅ Checked {len(results)} monitors | {engine.stats()}")
+
+    except Exception as exc:
+        db.rollback()
+        logger.exception(f"Error checking monitor batch: {exc}")
+    finally:
+        db.close()
+        timer.emit()
+
+
 @celery_app.task(name="app.tasks.monitor.check_single_monitor")
 def check_single_monitor_task(monitor_id: str):
+    """
+    Run one check right away. Recurring checks are dispatched in batches
+    by the scheduler service, so this task never reschedules itself.
+    """
+    timer = CheckTimer("check_single_monitor", monitor_id=str(monitor_id))
     db = SessionLocal()
     try:
-        monitor = db.get(Monitor, monitor_id)
-        if not monitor:
-            logger.warning(f"Monitor {monitor_id} not found — skipping.")
-            return
-
-        if not monitor.is_active:
-            logger.info(f"Monitor {monitor.url} is inactive — skipping reschedule.")
-            return
-
-        # --- Run the monitor check ---
-        try:
-            asyncio.run(check_single_monitor(db, monitor))
-        except RuntimeError:
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(check_single_monitor(db, monitor))
-
-        monitor.last_checked_at = datetime.now(timezone.utc)
-
-        # --- Schedule next run safely ---
-        # Only revoke if there is a still-pending task
-        if monitor.celery_task_id:
-            prev_task = AsyncResult(monitor.celery_task_id)
-            if prev_task.state in ("PENDING", "RECEIVED", "SCHEDULED"):
-                try:
-                    prev_task.revoke(terminate=False)
-                    logger.debug(
-                        f"Revoked pending task {monitor.celery_task_id} for {monitor.url}"
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to revoke pending task: {e}")
-
-        try:
-            next_task = check_single_monitor_task.apply_async(
-                args=[monitor_id],
-                countdown=monitor.frequency_sec,
-            )
-            monitor.celery_task_id = next_task.id
-        except Exception as e:
-            logger.error(f"⚠️ Failed to schedule next task for {monitor.url}: {e}")
-
-        db.commit()
-        logger.info(
-            f"✅ Monitor {monitor.url} checked in {monitor.frequency_sec}sec - (task={monitor.celery_task_id})."
-        )
+        with maybe_profile("check_single_monitor", monitor_id=str(monitor_id)):
+            with timer.span("db_load"):
+                monitor = get_monitor_with_user(db, monitor_id)
+            if not monitor:
+                logger.warning(f"Monitor {monitor_id} not found — skipping.")
+                return
+
+            if not monitor.is_active:
+                logger.info(f"Monitor {monitor.url} is inactive — skipping.")
+                return
+
+            with single_flight([monitor]) as held:
+                if not held:
+                    return
+                # --- Run the monitor check on the worker's shared event loop ---
+                engine = get_probe_engine()
+                engine.submit(check_single_monitor(db, monitor, engine.clients, timer))
+
+                with timer.span("db_update"):
+                    monitor.last_checked_at = datetime.now(timezone.utc)
+                    db.commit()
+            logger.info(f"✅ Monitor {monitor.url} checked.")
 
     except Exception as exc:
         db.rollback()
         logger.exception(f"Error checking monitor {monitor_id}: {exc}")
     finally:
         db.close()
+        timer.emit()
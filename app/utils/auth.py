@@ -3,11 +3,13 @@ from typing import Optional
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import get_async_db
 from app.models.user import User
 from app.config import settings
+from app.services.auth_cache import get_auth_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -59,12 +61,18 @@ def decode_token(token: str) -> dict:
         )
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """Extract and return the currently authenticated user from the token."""
-    payload = decode_token(token)
+    cache = get_auth_cache()
+
+    payload = cache.get_payload(token) if cache else None
+    if payload is None:
+        payload = decode_token(token)
+        if cache:
+            cache.set_payload(token, payload)
 
     if payload.get("type") != "access":
         raise HTTPException(
@@ -79,8 +87,13 @@ def get_current_user(
             detail="Token missing user identifier",
         )
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user = await cache.get_user(user_id) if cache else None
+    if user is None:
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if user and cache:
+            await cache.set_user(user)
+
+    if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
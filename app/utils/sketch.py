@@ -0,0 +1,73 @@
+import math
+import struct
+
+
+class LatencySketch:
+    """
+    Mergeable latency quantile sketch (DDSketch-style).
+
+    Values are counted in logarithmic buckets so that any quantile is
+    returned within `relative_accuracy` of the true value. Two sketches
+    with the same accuracy merge by adding bucket counts, which is what
+    lets rollups of any size be combined.
+    """
+
+    _HEADER = struct.Struct("<fI")  # relative_accuracy, zero_count
+    _BIN = struct.Struct("<hI")  # bucket index, count
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0  # values <= 0 (sub-millisecond rounding)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float, count: int = 1):
+        if value <= 0:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + count
+
+    def merge(self, other: "LatencySketch"):
+        if abs(other.relative_accuracy - self.relative_accuracy) > 1e-9:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate q-quantile (0 <= q <= 1), or None if empty."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (1 + self.gamma)
+        return 2 * self.gamma ** max(self.bins) / (1 + self.gamma)
+
+    def to_bytes(self) -> bytes:
+        parts = [self._HEADER.pack(self.relative_accuracy, self.zero_count)]
+        parts.extend(self._BIN.pack(i, c) for i, c in sorted(self.bins.items()))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None) -> "LatencySketch":
+        if not data:
+            return cls()
+        relative_accuracy, zero_count = cls._HEADER.unpack_from(data, 0)
+        sketch = cls(round(relative_accuracy, 6))
+        sketch.zero_count = zero_count
+        for index, count in cls._BIN.iter_unpack(data[cls._HEADER.size:]):
+            sketch.bins[index] = count
+        return sketch
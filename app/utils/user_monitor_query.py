@@ -1,5 +1,7 @@
 from sqlalchemy.orm import joinedload
 
+from app.models.monitor import Monitor
+
 def get_monitor_with_user(db, monitor_id):
     return (
         db.query(Monitor)
@@ -0,0 +1,101 @@
+"""
+API load benchmark: sync SessionLocal handlers vs. async AsyncSession handlers.
+
+Serves the same read query (a user's monitors) through a sync `def` route
+backed by psycopg2 and an async route backed by asyncpg. Each stack runs
+in its own uvicorn process; the load generator reports requests/sec and
+p50/p99 latency. Needs a real Postgres at DATABASE_URL.
+
+    python -m benchmarks.bench_api_stacks --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+os.environ.setdefault("SMTP_USERNAME", "bench@example.com")
+os.environ.setdefault("SMTP_PASSWORD", "bench")
+
+QUERY_LIMIT = 50
+
+
+def build_app(stack: str):
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import select
+
+    from app.db import get_async_db, get_db
+    from app.models import Monitor
+
+    app = FastAPI()
+
+    if stack == "sync":
+        @app.get("/monitors")
+        def list_monitors(db=Depends(get_db)):
+            rows = db.scalars(select(Monitor).limit(QUERY_LIMIT)).all()
+            return [str(m.id) for m in rows]
+    else:
+        @app.get("/monitors")
+        async def list_monitors(db=Depends(get_async_db)):
+            rows = (await db.scalars(select(Monitor).limit(QUERY_LIMIT))).all()
+            return [str(m.id) for m in rows]
+
+    return app
+
+
+def serve(stack: str, port: int):
+    import uvicorn
+
+    uvicorn.run(build_app(stack), host="127.0.0.1", port=port, log_level="warning")
+
+
+async def load(url: str, concurrency: int, duration: float) -> list[float]:
+    import httpx
+
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=18100)
+    args = parser.parse_args()
+
+    for offset, stack in enumerate(("sync", "async")):
+        port = args.port + offset
+        server = multiprocessing.Process(target=serve, args=(stack, port), daemon=True)
+        server.start()
+        time.sleep(2.0)
+        try:
+            url = f"http://127.0.0.1:{port}/monitors"
+            asyncio.run(load(url, 10, 2.0))  # warm up pools
+            latencies = sorted(asyncio.run(load(url, args.concurrency, args.duration)))
+        finally:
+            server.terminate()
+            server.join()
+
+        p99 = latencies[int(0.99 * (len(latencies) - 1))]
+        print(
+            f"{stack:<6} {len(latencies) / args.duration:>9.1f} req/s   "
+            f"p50 {statistics.median(latencies) * 1000:>7.1f} ms   p99 {p99 * 1000:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
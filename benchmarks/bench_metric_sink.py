@@ -0,0 +1,92 @@
+"""
+Metric ingestion benchmark: per-row commit vs. the buffered metric sink.
+
+Needs a real Postgres at DATABASE_URL with the schema migrated. A
+throwaway user and monitor are created for the run and deleted after
+(metrics cascade).
+
+    python -m benchmarks.bench_metric_sink --rows 20000
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+os.environ.setdefault("SMTP_USERNAME", "bench@example.com")
+os.environ.setdefault("SMTP_PASSWORD", "bench")
+
+from app.db import SessionLocal  # noqa: E402
+from app.models import Metric, Monitor, User  # noqa: E402
+from app.services.metric_sink import MetricSink  # noqa: E402
+
+
+def make_rows(monitor_id, count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "monitor_id": monitor_id,
+            "timestamp": now,
+            "response_ms": 100 + i % 50,
+            "status_code": 200,
+            "is_up": True,
+            "error": None,
+        }
+        for i in range(count)
+    ]
+
+
+def per_row_commit(rows: list[dict]):
+    db = SessionLocal()
+    try:
+        for row in rows:
+            db.add(Metric(**row))
+            db.commit()
+    finally:
+        db.close()
+
+
+def sink(rows: list[dict], use_copy: bool):
+    metric_sink = MetricSink(batch_size=1000, flush_interval=0.2, use_copy=use_copy)
+    metric_sink.start()
+    metric_sink.put_many(rows)
+    metric_sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--per-row-rows", type=int, default=2_000,
+                        help="rows for the (slow) per-row commit baseline")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    monitor = Monitor(user_id=user.id, name="bench", url="http://127.0.0.1/", frequency_sec=60)
+    db.add(monitor)
+    db.commit()
+
+    try:
+        cases = [
+            ("per-row commit", lambda r: per_row_commit(r), args.per_row_rows),
+            ("sink executemany", lambda r: sink(r, use_copy=False), args.rows),
+            ("sink COPY", lambda r: sink(r, use_copy=True), args.rows),
+        ]
+        for name, run, count in cases:
+            rows = make_rows(monitor.id, count)
+            start = time.perf_counter()
+            run(rows)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<18} {count:>8} rows  {count / elapsed:>10.0f} rows/sec")
+    finally:
+        db.delete(monitor)
+        db.delete(user)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
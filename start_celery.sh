@@ -3,5 +3,25 @@
 # Start a tiny HTTP server so Render sees the service as healthy
 python -m http.server 8000 &
 
+# Prometheus multiprocess mode: worker processes write here and the main
+# worker process serves the aggregate on WORKER_METRICS_PORT (default 9101)
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-celery}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start a probe shard node when SCHEDULER_MODE=sharded (one per machine).
+# Otherwise the scheduler service (dispatches due monitors in batches) must
+# be a single instance: only the container started with RUN_SCHEDULER=true runs it
+if [ "${SCHEDULER_MODE:-single}" = "sharded" ]; then
+  python -m app.core.sharding &
+elif [ "${RUN_SCHEDULER:-false}" = "true" ]; then
+  python -m app.core.scheduler &
+fi
+
+# Start celery beat (periodic maintenance such as metric partitions). Exactly
+# one beat may run, so only the container started with RUN_BEAT=true runs it
+if [ "${RUN_BEAT:-false}" = "true" ]; then
+  celery -A app.core.celery_app.celery_app beat -l info &
+fi
+
 # Start celery worker
 celery -A app.core.celery_app.celery_app worker -l info -Q monitoring,alerts
\ No newline at end of file